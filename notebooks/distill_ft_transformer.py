@@ -0,0 +1,264 @@
+"""Distill the tuned FT-Transformer into low-latency tree students.
+
+The transformer beats XGBoost on test F1 macro, but costs far more CPU per
+flow. This script transfers its decision function to gradient-boosted and
+shallow tree students that the inference server can serve directly:
+
+- teacher: the best sweep checkpoint (unified_ft_transformer.pt) with the
+  scaler baked in, producing logits on raw features;
+- targets: ALPHA * softmax(teacher_logits / TEMPERATURE) + (1 - ALPHA) * one-hot
+  label, on the training split only;
+- XGBoost students minimise the cross-entropy to those soft targets through a
+  custom objective (gradient p - q), with the same sqrt-inverse class weights
+  as the teacher; decision-tree students, which cannot take soft targets,
+  fit the teacher's argmax instead;
+- every student and both references (teacher, XGBoost baseline) are scored on
+  the same test split for F1 macro and single-flow / batch CPU latency, and
+  the non-dominated (latency, F1 macro) points form the Pareto table;
+- the most accurate Pareto student within LATENCY_BUDGET_MS per flow is
+  logged and registered in MLflow as an sklearn model with feature_names_in_
+  set to the CICFlowMeter names of feature_mapping.json, i.e. the schema
+  ModelManager already serves. Students train on raw (nan_to_num) features:
+  trees do not need the scaler.
+"""
+import json
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import mlflow
+import mlflow.sklearn
+import numpy as np
+import pandas as pd
+import torch
+from mlflow.models import infer_signature
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+from xgboost import XGBClassifier
+
+from ft_transformer_model import ServingFTTransformer, load_checkpoint
+
+warnings.filterwarnings('ignore')
+
+REPO = Path('/home/roberto/repos/ML-IDS')
+DATA_DIR = REPO / 'data/CIC-IDS2017'
+OUT_DIR = REPO / 'models/unified'
+FEATURE_MAPPING_PATH = REPO / 'src/inference_server/feature_mapping.json'
+SEED = 42
+DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+TRACKING_URI = 'http://192.168.1.147:5050'
+EXPERIMENT = 'ml-ids-unified'
+REGISTERED_MODEL = 'ML_IDS_Model_v1'
+
+TEMPERATURE = 2.0
+ALPHA = 0.7
+LATENCY_BUDGET_MS = 1.0
+SINGLE_CALLS = 300
+BATCH_ROWS = 1024
+
+XGB_STUDENTS = [
+    {'n_estimators': 50, 'max_depth': 4},
+    {'n_estimators': 100, 'max_depth': 6},
+    {'n_estimators': 200, 'max_depth': 6},
+    {'n_estimators': 400, 'max_depth': 8},
+]
+TREE_STUDENTS = [8, 12, 16]
+
+# ---- Data: same split as training ----
+print('Loading data...')
+X_df = pd.read_csv(DATA_DIR / 'Data.csv')
+y_df = pd.read_csv(DATA_DIR / 'Label.csv')
+FEATURE_NAMES = X_df.columns.tolist()
+with open(FEATURE_MAPPING_PATH) as f:
+    served = set(json.load(f).values())
+missing = [c for c in FEATURE_NAMES if c not in served]
+assert not missing, f'features not served by the inference server: {missing}'
+
+X = np.nan_to_num(X_df.values.astype(np.float32), nan=0.0, posinf=1e9, neginf=-1e9)
+y = y_df.values.ravel().astype(np.int64)
+X_trainval, X_test, y_trainval, y_test = train_test_split(
+    X, y, test_size=0.15, stratify=y, random_state=SEED)
+X_train, X_val, y_train, y_val = train_test_split(
+    X_trainval, y_trainval, test_size=0.15/0.85, stratify=y_trainval, random_state=SEED)
+X_train_df = pd.DataFrame(X_train, columns=FEATURE_NAMES)
+X_test_df = pd.DataFrame(X_test, columns=FEATURE_NAMES)
+
+classes_unique, counts = np.unique(y_train, return_counts=True)
+N_CLASSES = len(classes_unique)
+class_weight = np.sqrt(len(y_train) / (N_CLASSES * counts)).astype(np.float32)
+
+# ---- Teacher logits ----
+scaler = joblib.load(OUT_DIR / 'unified_scaler.pkl')
+model, ckpt = load_checkpoint(OUT_DIR / 'unified_ft_transformer.pt', map_location=DEVICE)
+teacher = ServingFTTransformer(model, scaler).to(DEVICE).eval()
+
+
+def teacher_logits(X_raw, batch_size=4096):
+    out = []
+    with torch.no_grad():
+        for i in range(0, len(X_raw), batch_size):
+            xb = torch.from_numpy(X_raw[i:i + batch_size]).to(DEVICE)
+            out.append(teacher(xb).float().cpu().numpy())
+    return np.concatenate(out)
+
+
+print(f'Teacher logits on {DEVICE}...')
+t0 = time.time()
+logits_train = teacher_logits(X_train)
+print(f'  {len(logits_train)} rows in {time.time()-t0:.1f}s')
+
+
+def softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+targets = ALPHA * softmax(logits_train / TEMPERATURE) + (1 - ALPHA) * np.eye(N_CLASSES, dtype=np.float32)[y_train]
+row_weight = class_weight[y_train][:, None]
+
+
+def soft_cross_entropy(y_true, margin):
+    """Gradient and Hessian of the weighted cross-entropy to ``targets``."""
+    p = softmax(margin)
+    grad = (p - targets) * row_weight
+    hess = np.maximum(2.0 * p * (1.0 - p), 1e-6) * row_weight
+    return grad, hess
+
+
+# ---- Students ----
+students = {}
+for cfg in XGB_STUDENTS:
+    name = f"xgb_student_{cfg['n_estimators']}x{cfg['max_depth']}"
+    print(f'Training {name}...')
+    t0 = time.time()
+    student = XGBClassifier(**cfg, learning_rate=0.1, tree_method='hist',
+                            objective=soft_cross_entropy, random_state=SEED)
+    student.fit(X_train_df, y_train)
+    # The custom objective only drives training; serve (and pickle) as softprob
+    student.set_params(objective='multi:softprob')
+    students[name] = (student, time.time() - t0, cfg)
+
+teacher_labels = logits_train.argmax(1)
+for depth in TREE_STUDENTS:
+    name = f'tree_student_d{depth}'
+    print(f'Training {name}...')
+    t0 = time.time()
+    student = DecisionTreeClassifier(max_depth=depth, random_state=SEED)
+    student.fit(X_train_df, teacher_labels, sample_weight=class_weight[y_train])
+    students[name] = (student, time.time() - t0, {'max_depth': depth})
+
+
+# ---- Evaluation ----
+def latency(predict, X_eval, rows, calls):
+    rng = np.random.default_rng(SEED)
+    starts = rng.integers(0, len(X_eval) - rows, size=calls)
+    for s in starts[:5]:
+        predict(X_eval[s:s + rows])
+    times = []
+    for s in starts:
+        t0 = time.perf_counter()
+        predict(X_eval[s:s + rows])
+        times.append((time.perf_counter() - t0) * 1000)
+    return float(np.percentile(times, 50)), float(np.percentile(times, 99))
+
+
+def score(name, predict, X_eval):
+    preds = np.concatenate([predict(X_eval[i:i + 4096]) for i in range(0, len(X_eval), 4096)])
+    single_p50, single_p99 = latency(predict, X_eval, 1, SINGLE_CALLS)
+    batch_p50, _ = latency(predict, X_eval, BATCH_ROWS, 20)
+    row = {
+        'model': name,
+        'test_f1_macro': float(f1_score(y_test, preds, average='macro')),
+        'test_f1_weighted': float(f1_score(y_test, preds, average='weighted')),
+        'single_row_p50_ms': single_p50,
+        'single_row_p99_ms': single_p99,
+        f'batch_{BATCH_ROWS}_p50_ms': batch_p50,
+    }
+    print(f"  {name:<26} F1 macro={row['test_f1_macro']:.4f}  1 row p50={single_p50:.3f}ms  "
+          f"p99={single_p99:.3f}ms")
+    return row, preds
+
+
+print('\nScoring on test (CPU, single thread for latency)...')
+torch.set_num_threads(1)
+teacher_cpu = teacher.to('cpu')
+rows = []
+
+
+def teacher_predict(xb):
+    with torch.no_grad():
+        return teacher_cpu(torch.from_numpy(xb)).argmax(1).numpy()
+
+
+row, teacher_test_preds = score('ft_transformer_teacher', teacher_predict, X_test)
+rows.append(row)
+
+baseline = XGBClassifier()
+baseline.load_model(str(OUT_DIR / 'unified_xgboost.json'))
+baseline.set_params(n_jobs=1)
+row, _ = score('xgboost_baseline', lambda xb: baseline.predict(scaler.transform(xb)), X_test)
+rows.append(row)
+
+for name, (student, train_time, cfg) in students.items():
+    if hasattr(student, 'n_jobs'):
+        student.set_params(n_jobs=1)
+    # Students are served from DataFrames, like ModelManager does
+    row, preds = score(name, lambda xb, m=student: m.predict(pd.DataFrame(xb, columns=FEATURE_NAMES)), X_test)
+    row.update({'train_time_s': train_time, 'params': cfg,
+                'agreement_with_teacher': float(np.mean(preds == teacher_test_preds))})
+    rows.append(row)
+
+table = pd.DataFrame(rows).sort_values('single_row_p50_ms').reset_index(drop=True)
+best_f1 = -1.0
+pareto = []
+for f1 in table['test_f1_macro']:
+    pareto.append(bool(f1 > best_f1))
+    best_f1 = max(best_f1, f1)
+table['pareto'] = pareto
+
+print('\n===== LATENCY vs F1 MACRO (sorted by single-row latency) =====')
+print(table[['model', 'single_row_p50_ms', 'single_row_p99_ms', f'batch_{BATCH_ROWS}_p50_ms',
+             'test_f1_macro', 'test_f1_weighted', 'pareto']].to_string(index=False))
+
+with open(OUT_DIR / 'distill_pareto.json', 'w') as f:
+    json.dump({'temperature': TEMPERATURE, 'alpha': ALPHA,
+               'latency_budget_ms': LATENCY_BUDGET_MS,
+               'results': table.to_dict('records')}, f, indent=2, default=str)
+print(f'\nSaved: {OUT_DIR / "distill_pareto.json"}')
+
+# ---- Register the chosen student ----
+eligible = table[table['pareto'] & table['model'].isin(list(students))
+                 & (table['single_row_p50_ms'] <= LATENCY_BUDGET_MS)]
+if eligible.empty:
+    print(f'No Pareto student within {LATENCY_BUDGET_MS} ms per flow; nothing registered.')
+    raise SystemExit(0)
+chosen = eligible.sort_values('test_f1_macro', ascending=False).iloc[0]
+student, train_time, cfg = students[chosen['model']]
+print(f"\nRegistering {chosen['model']} (F1 macro {chosen['test_f1_macro']:.4f}, "
+      f"{chosen['single_row_p50_ms']:.3f} ms/flow) as {REGISTERED_MODEL}")
+
+mlflow.set_tracking_uri(TRACKING_URI)
+mlflow.set_experiment(EXPERIMENT)
+with mlflow.start_run(run_name=f"distilled_{chosen['model']}") as run:
+    mlflow.set_tags({'project': 'ml-ids', 'task': 'unified-supervised-multiclass-ids',
+                     'model_family': 'distilled_student', 'teacher': 'ft_transformer_tuned',
+                     'feature_schema': 'CICFlowMeter-76'})
+    mlflow.log_params({**cfg, 'temperature': TEMPERATURE, 'alpha': ALPHA,
+                       'teacher_epoch': ckpt['epoch'], 'class_weight': 'sqrt_inverse'})
+    mlflow.log_metrics({k: float(chosen[k]) for k in
+                        ('test_f1_macro', 'test_f1_weighted', 'single_row_p50_ms',
+                         'single_row_p99_ms', 'agreement_with_teacher')})
+    mlflow.log_metric('train_time_s', train_time)
+    example = X_test_df.iloc[:5]
+    mlflow.sklearn.log_model(
+        student, artifact_path='model',
+        signature=infer_signature(example, student.predict(example)),
+        input_example=example,
+        registered_model_name=REGISTERED_MODEL,
+    )
+    mlflow.log_artifact(str(OUT_DIR / 'distill_pareto.json'), artifact_path='metadata')
+    print(f'  run_id: {run.info.run_id}')
@@ -0,0 +1,214 @@
+"""Export the tuned FT-Transformer for CPU serving and benchmark it against XGBoost.
+
+The sweep trained on CUDA with bf16 autocast; the inference server is CPU only
+and loads sklearn flavors or ONNX graphs. This script:
+
+- rebuilds the best checkpoint (unified_ft_transformer.pt) on CPU with the
+  StandardScaler baked in (ServingFTTransformer: raw features -> logits);
+- exports it to ONNX (float32) and quantizes the weights of every MatMul/Gemm
+  to int8 with ONNX Runtime dynamic quantization (activations are quantized
+  per call, so no calibration data is needed);
+- also builds the TorchScript equivalent (torch dynamic quantization of
+  nn.Linear) for comparison;
+- writes a JSON sidecar next to each ONNX graph so the server can serve it
+  with MODEL_ONNX_PATH;
+- benchmarks test F1 and CPU latency (single flow on 1 thread, 1024-row batch
+  on 1 thread and on all cores) for float32, int8 and the XGBoost baseline,
+  saved to ft_cpu_benchmark.json.
+"""
+import json
+import os
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import onnxruntime as ort
+import pandas as pd
+import torch
+import torch.nn as nn
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from xgboost import XGBClassifier
+
+from ft_transformer_model import ServingFTTransformer, load_checkpoint
+
+warnings.filterwarnings('ignore')
+
+DATA_DIR = Path('/home/roberto/repos/ML-IDS/data/CIC-IDS2017')
+OUT_DIR = Path('/home/roberto/repos/ML-IDS/models/unified')
+SEED = 42
+
+CKPT_PATH = OUT_DIR / 'unified_ft_transformer.pt'
+SCALER_PATH = OUT_DIR / 'unified_scaler.pkl'
+XGB_PATH = OUT_DIR / 'unified_xgboost.json'
+ONNX_FP32_PATH = OUT_DIR / 'unified_ft_transformer.onnx'
+ONNX_INT8_PATH = OUT_DIR / 'unified_ft_transformer.int8.onnx'
+TS_INT8_PATH = OUT_DIR / 'unified_ft_transformer.int8.ts'
+BENCH_PATH = OUT_DIR / 'ft_cpu_benchmark.json'
+
+OPSET = 17
+SINGLE_CALLS = 500
+BATCH_ROWS = 1024
+BATCH_CALLS = 20
+N_CORES = os.cpu_count()
+
+# ---- Same test split as training ----
+print('Loading data...')
+X_df = pd.read_csv(DATA_DIR / 'Data.csv')
+y_df = pd.read_csv(DATA_DIR / 'Label.csv')
+FEATURE_NAMES = X_df.columns.tolist()
+# Same cleaning as the sweep: the XGBoost baseline's scaler rejects inf
+X = np.nan_to_num(X_df.values.astype(np.float32), nan=0.0, posinf=1e9, neginf=-1e9)
+y = y_df.values.ravel().astype(np.int64)
+_, X_test, _, y_test = train_test_split(X, y, test_size=0.15, stratify=y, random_state=SEED)
+X_test = np.ascontiguousarray(X_test)
+print(f'test={X_test.shape}')
+
+scaler = joblib.load(SCALER_PATH)
+
+# ---- Rebuild on CPU with preprocessing in the graph ----
+model, ckpt = load_checkpoint(CKPT_PATH)
+assert ckpt['feature_names'] == FEATURE_NAMES, 'checkpoint and data feature order differ'
+serving = ServingFTTransformer(model, scaler).eval()
+classes = list(range(ckpt['n_classes']))
+
+# The fused encoder fast path has no ONNX/TorchScript export; export the plain ops
+torch.backends.mha.set_fastpath_enabled(False)
+
+print('\nExporting ONNX (float32)...')
+example = torch.from_numpy(X_test[:8])
+torch.onnx.export(
+    serving, (example,), str(ONNX_FP32_PATH),
+    input_names=['input'], output_names=['logits'],
+    dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+    opset_version=OPSET, dynamo=False,
+)
+
+print('Quantizing ONNX weights to int8...')
+quantize_dynamic(str(ONNX_FP32_PATH), str(ONNX_INT8_PATH),
+                 weight_type=QuantType.QInt8, op_types_to_quantize=['MatMul', 'Gemm'])
+
+print('Building TorchScript int8 (torch dynamic quantization of nn.Linear)...')
+torch.backends.quantized.engine = 'x86' if 'x86' in torch.backends.quantized.supported_engines else 'qnnpack'
+serving_int8 = torch.ao.quantization.quantize_dynamic(serving, {nn.Linear}, dtype=torch.qint8)
+with torch.no_grad():
+    ts_int8 = torch.jit.trace(serving_int8, example)
+ts_int8 = torch.jit.freeze(ts_int8.eval())
+ts_int8.save(str(TS_INT8_PATH))
+
+for path, quantization in ((ONNX_FP32_PATH, None), (ONNX_INT8_PATH, 'dynamic-int8')):
+    sidecar = {
+        'model': 'ft_transformer',
+        'feature_names': FEATURE_NAMES,
+        'classes': classes,
+        'version': f"ft-{ckpt['epoch']}" + (f'-{quantization}' if quantization else ''),
+        'quantization': quantization,
+        'config': ckpt['config'],
+    }
+    with open(path.with_suffix('.json'), 'w') as f:
+        json.dump(sidecar, f, indent=2)
+
+
+# ---- Benchmark ----
+def ort_predictor(path, threads):
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+    return lambda xb: session.run(['logits'], {'input': xb})[0].argmax(1)
+
+
+def torchscript_predictor(module, threads):
+    def predict(xb):
+        torch.set_num_threads(threads)
+        with torch.no_grad():
+            return module(torch.from_numpy(xb)).argmax(1).numpy()
+    return predict
+
+
+xgb = XGBClassifier()
+xgb.load_model(str(XGB_PATH))
+
+
+def xgb_predictor(threads):
+    booster = xgb.get_booster()
+
+    def predict(xb):
+        booster.set_param({'nthread': threads})
+        scores = booster.inplace_predict(scaler.transform(xb).astype(np.float32))
+        return scores.argmax(1) if scores.ndim == 2 else scores.astype(np.int64)
+    return predict
+
+
+def latency_ms(predict, rows, calls):
+    rng = np.random.default_rng(SEED)
+    starts = rng.integers(0, len(X_test) - rows, size=calls)
+    for s in starts[:5]:
+        predict(X_test[s:s + rows])
+    times = []
+    for s in starts:
+        t0 = time.perf_counter()
+        predict(X_test[s:s + rows])
+        times.append((time.perf_counter() - t0) * 1000)
+    return {'p50': float(np.percentile(times, 50)), 'p99': float(np.percentile(times, 99))}
+
+
+def evaluate(make_predictor):
+    batch_all = make_predictor(N_CORES)
+    preds = np.concatenate([batch_all(X_test[i:i + 4096]) for i in range(0, len(X_test), 4096)])
+    return preds, {
+        'test_f1_macro': float(f1_score(y_test, preds, average='macro')),
+        'test_f1_weighted': float(f1_score(y_test, preds, average='weighted')),
+        'single_row_1_thread_ms': latency_ms(make_predictor(1), 1, SINGLE_CALLS),
+        f'batch_{BATCH_ROWS}_1_thread_ms': latency_ms(make_predictor(1), BATCH_ROWS, BATCH_CALLS),
+        f'batch_{BATCH_ROWS}_{N_CORES}_threads_ms': latency_ms(batch_all, BATCH_ROWS, BATCH_CALLS),
+    }
+
+
+candidates = {
+    'ft_onnx_fp32': (lambda t: ort_predictor(ONNX_FP32_PATH, t), ONNX_FP32_PATH),
+    'ft_onnx_int8': (lambda t: ort_predictor(ONNX_INT8_PATH, t), ONNX_INT8_PATH),
+    'ft_torchscript_int8': (lambda t: torchscript_predictor(ts_int8, t), TS_INT8_PATH),
+    'xgboost': (xgb_predictor, XGB_PATH),
+}
+results = {}
+predictions = {}
+for name, (make_predictor, path) in candidates.items():
+    print(f'\nBenchmarking {name}...')
+    predictions[name], results[name] = evaluate(make_predictor)
+    results[name]['size_mb'] = path.stat().st_size / 2 ** 20
+    r = results[name]
+    print(f"  F1 macro={r['test_f1_macro']:.4f}  weighted={r['test_f1_weighted']:.4f}  "
+          f"single p50={r['single_row_1_thread_ms']['p50']:.3f}ms  "
+          f"batch({N_CORES}t) p50={r[f'batch_{BATCH_ROWS}_{N_CORES}_threads_ms']['p50']:.1f}ms  "
+          f"size={r['size_mb']:.1f}MB")
+
+for name in ('ft_onnx_int8', 'ft_torchscript_int8'):
+    results[name]['agreement_with_fp32'] = float(np.mean(predictions[name] == predictions['ft_onnx_fp32']))
+
+bench = {
+    'cpu_count': N_CORES,
+    'torch_version': torch.__version__,
+    'onnxruntime_version': ort.__version__,
+    'test_rows': int(len(y_test)),
+    'checkpoint_epoch': int(ckpt['epoch']),
+    'results': results,
+}
+with open(BENCH_PATH, 'w') as f:
+    json.dump(bench, f, indent=2)
+
+print('\n===== CPU BENCHMARK =====')
+print(f"{'model':<22}{'F1 macro':>10}{'1 row p50':>12}{'1 row p99':>12}{'1024 rows p50':>15}")
+for name, r in results.items():
+    batch = r[f'batch_{BATCH_ROWS}_{N_CORES}_threads_ms']['p50']
+    print(f"{name:<22}{r['test_f1_macro']:>10.4f}{r['single_row_1_thread_ms']['p50']:>10.3f}ms"
+          f"{r['single_row_1_thread_ms']['p99']:>10.3f}ms{batch:>13.1f}ms")
+print(f'\nSaved: {ONNX_FP32_PATH}')
+print(f'Saved: {ONNX_INT8_PATH} (serve with MODEL_ONNX_PATH={ONNX_INT8_PATH.name})')
+print(f'Saved: {TS_INT8_PATH}')
+print(f'Saved: {BENCH_PATH}')
@@ -0,0 +1,69 @@
+"""FT-Transformer architecture shared by the training sweep and the CPU export.
+
+``FTTransformer`` is the model trained by ``ft_transformer_optuna_sweep.py``
+on standardized features. ``ServingFTTransformer`` wraps a trained one for
+inference on raw flow features: it applies the same NaN/inf cleanup as the
+training data load and the fitted StandardScaler inside the graph, so an
+exported model takes the 76 CICFlowMeter features exactly as the inference
+server receives them and returns class logits.
+"""
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+class FTTransformer(nn.Module):
+    def __init__(self, n_features, n_classes, d_token, n_blocks, n_heads,
+                 ff_factor, dropout):
+        super().__init__()
+        self.tokenizer_w = nn.Parameter(torch.empty(n_features, d_token))
+        self.tokenizer_b = nn.Parameter(torch.zeros(n_features, d_token))
+        nn.init.kaiming_uniform_(self.tokenizer_w, a=5 ** 0.5)
+        self.cls = nn.Parameter(torch.empty(1, 1, d_token))
+        nn.init.normal_(self.cls, std=0.02)
+        enc_layer = nn.TransformerEncoderLayer(
+            d_model=d_token, nhead=n_heads,
+            dim_feedforward=int(d_token * ff_factor),
+            dropout=dropout, activation='gelu',
+            batch_first=True, norm_first=True,
+        )
+        self.encoder = nn.TransformerEncoder(enc_layer, num_layers=n_blocks)
+        self.norm = nn.LayerNorm(d_token)
+        self.head = nn.Linear(d_token, n_classes)
+
+    def forward(self, x):
+        tokens = x.unsqueeze(-1) * self.tokenizer_w + self.tokenizer_b
+        cls = self.cls.expand(x.size(0), -1, -1)
+        z = torch.cat([cls, tokens], dim=1)
+        z = self.encoder(z)
+        return self.head(self.norm(z[:, 0]))
+
+
+class ServingFTTransformer(nn.Module):
+    """Raw features -> logits: input cleanup and scaling baked into the model."""
+
+    def __init__(self, model, scaler):
+        super().__init__()
+        self.model = model
+        scale = np.where(scaler.scale_ == 0, 1.0, scaler.scale_)
+        self.register_buffer('mean', torch.tensor(scaler.mean_, dtype=torch.float32))
+        self.register_buffer('inv_scale', torch.tensor(1.0 / scale, dtype=torch.float32))
+
+    def forward(self, x):
+        x = torch.nan_to_num(x, nan=0.0, posinf=1e9, neginf=-1e9)
+        return self.model((x - self.mean) * self.inv_scale)
+
+
+def load_checkpoint(path, map_location='cpu'):
+    """Rebuild the trained FTTransformer from a sweep checkpoint.
+
+    Returns ``(model, checkpoint)`` with the model in eval mode.
+    """
+    ckpt = torch.load(path, map_location=map_location, weights_only=False)
+    cfg = ckpt['config']
+    model = FTTransformer(ckpt['n_features'], ckpt['n_classes'], cfg['d_token'],
+                          cfg['n_blocks'], cfg['n_heads'], cfg['ff_factor'],
+                          cfg['dropout'])
+    model.load_state_dict(ckpt['state_dict'])
+    model.eval()
+    return model, ckpt
@@ -30,6 +30,8 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from torch.utils.data import DataLoader, TensorDataset
 
+from ft_transformer_model import FTTransformer
+
 warnings.filterwarnings('ignore')
 
 DATA_DIR = Path('/home/roberto/repos/ML-IDS/data/CIC-IDS2017')
@@ -76,33 +78,6 @@ X_test_t = torch.from_numpy(X_test_s)
 y_test_t = torch.from_numpy(y_test)
 
 
-class FTTransformer(nn.Module):
-    def __init__(self, n_features, n_classes, d_token, n_blocks, n_heads,
-                 ff_factor, dropout):
-        super().__init__()
-        self.tokenizer_w = nn.Parameter(torch.empty(n_features, d_token))
-        self.tokenizer_b = nn.Parameter(torch.zeros(n_features, d_token))
-        nn.init.kaiming_uniform_(self.tokenizer_w, a=5 ** 0.5)
-        self.cls = nn.Parameter(torch.empty(1, 1, d_token))
-        nn.init.normal_(self.cls, std=0.02)
-        enc_layer = nn.TransformerEncoderLayer(
-            d_model=d_token, nhead=n_heads,
-            dim_feedforward=int(d_token * ff_factor),
-            dropout=dropout, activation='gelu',
-            batch_first=True, norm_first=True,
-        )
-        self.encoder = nn.TransformerEncoder(enc_layer, num_layers=n_blocks)
-        self.norm = nn.LayerNorm(d_token)
-        self.head = nn.Linear(d_token, n_classes)
-
-    def forward(self, x):
-        tokens = x.unsqueeze(-1) * self.tokenizer_w + self.tokenizer_b
-        cls = self.cls.expand(x.size(0), -1, -1)
-        z = torch.cat([cls, tokens], dim=1)
-        z = self.encoder(z)
-        return self.head(self.norm(z[:, 0]))
-
-
 def make_class_weights(strategy):
     if strategy == 'none':
         return None
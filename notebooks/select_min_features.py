@@ -0,0 +1,148 @@
+"""Train a reduced-feature XGBoost model: the fewest features within an F1 budget.
+
+Many of the 76 CICFlowMeter features (bulk averages, URG/CWR/ECE counts) are
+almost always zero, but every /predict request still parses, validates and
+maps all of them. This script finds the smallest feature subset whose
+validation F1 macro stays within F1_LOSS_BUDGET of the all-feature model:
+
+- features are ranked by the gain importance of an all-feature model, with
+  near-constant features (> NEAR_CONSTANT_SHARE of one value) ranked last;
+- a binary search over the prefix size k retrains the model on the top-k
+  features and keeps the smallest k within the budget (assumes F1 grows
+  roughly monotonically with k; every evaluated k is reported);
+- the chosen model is trained on a DataFrame of just those columns, so its
+  feature_names_in_ publishes the subset. The inference server reads it from
+  there and parses requests for those fields only.
+
+The subset, the search trace and test metrics are written to
+reduced_features.json and the model is registered in MLflow.
+"""
+import json
+import time
+import warnings
+from pathlib import Path
+
+import mlflow
+import mlflow.sklearn
+import numpy as np
+import pandas as pd
+from mlflow.models import infer_signature
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from xgboost import XGBClassifier
+
+warnings.filterwarnings('ignore')
+
+DATA_DIR = Path('/home/roberto/repos/ML-IDS/data/CIC-IDS2017')
+OUT_DIR = Path('/home/roberto/repos/ML-IDS/models/unified')
+SEED = 42
+DEVICE = 'cuda'
+
+TRACKING_URI = 'http://192.168.1.147:5050'
+EXPERIMENT = 'ml-ids-unified'
+REGISTERED_MODEL = 'ML_IDS_Model_v1_reduced'
+
+F1_LOSS_BUDGET = 0.005
+NEAR_CONSTANT_SHARE = 0.999
+XGB_PARAMS = dict(n_estimators=400, max_depth=8, learning_rate=0.1, tree_method='hist',
+                  device=DEVICE, objective='multi:softmax', eval_metric='mlogloss',
+                  early_stopping_rounds=20, random_state=SEED)
+
+# ---- Same split as training ----
+print('Loading data...')
+X_df = pd.read_csv(DATA_DIR / 'Data.csv')
+y_df = pd.read_csv(DATA_DIR / 'Label.csv')
+FEATURE_NAMES = X_df.columns.tolist()
+X_df = pd.DataFrame(np.nan_to_num(X_df.values.astype(np.float32), nan=0.0, posinf=1e9, neginf=-1e9),
+                    columns=FEATURE_NAMES)
+y = y_df.values.ravel().astype(np.int64)
+X_trainval, X_test, y_trainval, y_test = train_test_split(
+    X_df, y, test_size=0.15, stratify=y, random_state=SEED)
+X_train, X_val, y_train, y_val = train_test_split(
+    X_trainval, y_trainval, test_size=0.15/0.85, stratify=y_trainval, random_state=SEED)
+
+
+def fit(features):
+    model = XGBClassifier(**XGB_PARAMS)
+    model.fit(X_train[features], y_train, eval_set=[(X_val[features], y_val)], verbose=False)
+    model.set_params(device='cpu')
+    f1 = f1_score(y_val, model.predict(X_val[features]), average='macro')
+    return model, float(f1)
+
+
+# ---- Rank features ----
+print('Training the all-feature reference...')
+t0 = time.time()
+full_model, full_f1 = fit(FEATURE_NAMES)
+print(f'  val F1 macro={full_f1:.4f} ({time.time()-t0:.0f}s)')
+
+gain = full_model.get_booster().get_score(importance_type='gain')
+top_share = X_train.apply(lambda col: col.value_counts(normalize=True).iloc[0])
+near_constant = set(top_share[top_share > NEAR_CONSTANT_SHARE].index)
+ranked = sorted(FEATURE_NAMES, key=lambda f: (f in near_constant, -gain.get(f, 0.0)))
+print(f'Near-constant features ({len(near_constant)}): {sorted(near_constant)}')
+
+# ---- Binary search for the smallest prefix within budget ----
+target = full_f1 - F1_LOSS_BUDGET
+trace = {len(FEATURE_NAMES): full_f1}
+models = {len(FEATURE_NAMES): full_model}
+lo, hi = 1, len(FEATURE_NAMES)
+while lo < hi:
+    k = (lo + hi) // 2
+    t0 = time.time()
+    models[k], trace[k] = fit(ranked[:k])
+    within = trace[k] >= target
+    print(f'  k={k:2d}  val F1 macro={trace[k]:.4f}  {"within" if within else "outside"} budget '
+          f'({time.time()-t0:.0f}s)')
+    if within:
+        hi = k
+    else:
+        lo = k + 1
+k = hi
+subset = ranked[:k]
+model = models[k]
+
+test_full = f1_score(y_test, full_model.predict(X_test[FEATURE_NAMES]), average='macro')
+test_reduced = f1_score(y_test, model.predict(X_test[subset]), average='macro')
+print(f'\nSelected {k} of {len(FEATURE_NAMES)} features (budget {F1_LOSS_BUDGET}):')
+print(f'  val  F1 macro: all={full_f1:.4f}  reduced={trace[k]:.4f}')
+print(f'  test F1 macro: all={test_full:.4f}  reduced={test_reduced:.4f}')
+print(f'  features: {subset}')
+
+meta = {
+    'features': subset,
+    'n_features': k,
+    'f1_loss_budget': F1_LOSS_BUDGET,
+    'val_f1_macro_all': full_f1,
+    'val_f1_macro_reduced': trace[k],
+    'test_f1_macro_all': float(test_full),
+    'test_f1_macro_reduced': float(test_reduced),
+    'ranking': ranked,
+    'near_constant': sorted(near_constant),
+    'search': {str(n): f1 for n, f1 in sorted(trace.items())},
+}
+meta_path = OUT_DIR / 'reduced_features.json'
+with open(meta_path, 'w') as f:
+    json.dump(meta, f, indent=2)
+print(f'Saved: {meta_path}')
+
+# ---- Register ----
+mlflow.set_tracking_uri(TRACKING_URI)
+mlflow.set_experiment(EXPERIMENT)
+with mlflow.start_run(run_name=f'xgboost_reduced_{k}_features') as run:
+    mlflow.set_tags({'project': 'ml-ids', 'task': 'unified-supervised-multiclass-ids',
+                     'model_family': 'gradient_boosting', 'model': 'xgboost',
+                     'feature_schema': f'CICFlowMeter-subset-{k}'})
+    mlflow.log_params({**{p: v for p, v in XGB_PARAMS.items() if p != 'device'},
+                       'n_features': k, 'f1_loss_budget': F1_LOSS_BUDGET})
+    mlflow.log_metrics({'val_f1_macro': trace[k], 'test_f1_macro': float(test_reduced),
+                        'val_f1_macro_all_features': full_f1})
+    example = X_test[subset].iloc[:5]
+    mlflow.sklearn.log_model(
+        model, artifact_path='model',
+        signature=infer_signature(example, model.predict(example)),
+        input_example=example,
+        registered_model_name=REGISTERED_MODEL,
+    )
+    mlflow.log_artifact(str(meta_path), artifact_path='metadata')
+    print(f'  run_id: {run.info.run_id}')
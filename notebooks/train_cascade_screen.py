@@ -0,0 +1,134 @@
+"""Train the benign screen for two-stage cascade inference.
+
+Over 90% of CIC-IDS2017 flows are benign. The screen is a binary
+(benign / attack) ExtraTrees model of a few shallow trees on the top
+features of the XGBoost baseline; the inference server runs it before the
+full model (MODEL_CASCADE_SCREEN_PATH) and passes flows it scores below
+the threshold as benign.
+
+The screen must not hide attacks, so the threshold is chosen for recall. For
+a grid of thresholds this script measures, on the validation split, the
+attack recall (attacks escalated to the full model) and the fraction of
+benign flows the screen decides alone. That table goes into the sidecar
+cascade_screen.json; the server picks the highest threshold whose recall
+meets MODEL_CASCADE_RECALL_FLOOR. The test split reports the same figures
+for a few floors, plus the end-to-end F1 macro of screen + XGBoost.
+"""
+import json
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from xgboost import XGBClassifier
+
+warnings.filterwarnings('ignore')
+
+DATA_DIR = Path('/home/roberto/repos/ML-IDS/data/CIC-IDS2017')
+OUT_DIR = Path('/home/roberto/repos/ML-IDS/models/unified')
+SEED = 42
+
+N_TOP_FEATURES = 12
+N_TREES = 8
+MAX_DEPTH = 6
+THRESHOLDS = np.round(np.concatenate([np.arange(0.001, 0.01, 0.001),
+                                      np.arange(0.01, 0.1, 0.005),
+                                      np.arange(0.1, 0.55, 0.05)]), 4)
+REPORT_FLOORS = [0.99, 0.995, 0.999, 0.9995]
+
+# ---- Same split as training ----
+print('Loading data...')
+X_df = pd.read_csv(DATA_DIR / 'Data.csv')
+y_df = pd.read_csv(DATA_DIR / 'Label.csv')
+FEATURE_NAMES = X_df.columns.tolist()
+X = np.nan_to_num(X_df.values.astype(np.float32), nan=0.0, posinf=1e9, neginf=-1e9)
+y = y_df.values.ravel().astype(np.int64)
+X_trainval, X_test, y_trainval, y_test = train_test_split(
+    X, y, test_size=0.15, stratify=y, random_state=SEED)
+X_train, X_val, y_train, y_val = train_test_split(
+    X_trainval, y_trainval, test_size=0.15/0.85, stratify=y_trainval, random_state=SEED)
+print(f'benign share (train): {np.mean(y_train == 0):.2%}')
+
+# ---- Top features from the XGBoost baseline ----
+xgb = XGBClassifier()
+xgb.load_model(str(OUT_DIR / 'unified_xgboost.json'))
+order = np.argsort(xgb.feature_importances_)[::-1][:N_TOP_FEATURES]
+SCREEN_FEATURES = [FEATURE_NAMES[i] for i in order]
+print(f'Screen features: {SCREEN_FEATURES}')
+
+
+def screen_frame(X_raw):
+    return pd.DataFrame(X_raw[:, order], columns=SCREEN_FEATURES)
+
+
+# ---- Train ----
+t0 = time.time()
+screen = ExtraTreesClassifier(n_estimators=N_TREES, max_depth=MAX_DEPTH,
+                              class_weight='balanced', n_jobs=-1, random_state=SEED)
+screen.fit(screen_frame(X_train), (y_train != 0).astype(int))
+screen.set_params(n_jobs=1)
+print(f'Trained screen in {time.time()-t0:.1f}s')
+
+
+def recall_table(X_raw, y_true):
+    p_attack = screen.predict_proba(screen_frame(X_raw))[:, 1]
+    attack = y_true != 0
+    rows = []
+    for t in THRESHOLDS:
+        escalated = p_attack >= t
+        rows.append({
+            'threshold': float(t),
+            'attack_recall': float(np.mean(escalated[attack])),
+            'benign_screened': float(np.mean(~escalated[~attack])),
+            'escalated_fraction': float(np.mean(escalated)),
+        })
+    return rows, p_attack
+
+
+val_table, _ = recall_table(X_val, y_val)
+test_table, p_test = recall_table(X_test, y_test)
+
+# ---- Report: end-to-end effect on the test split ----
+t0 = time.perf_counter()
+for i in range(500):
+    screen.predict_proba(screen_frame(X_test[i:i + 1]))
+screen_ms = (time.perf_counter() - t0) / 500 * 1000
+
+scaler = joblib.load(OUT_DIR / 'unified_scaler.pkl')
+full_preds = xgb.predict(scaler.transform(X_test))
+print(f'\nXGBoost alone: F1 macro={f1_score(y_test, full_preds, average="macro"):.4f}')
+print(f'Screen (sklearn predict_proba, 1 row): {screen_ms:.3f} ms')
+print(f"{'floor':>8}{'threshold':>11}{'val recall':>12}{'test recall':>13}"
+      f"{'benign screened':>17}{'cascade F1':>12}")
+for floor in REPORT_FLOORS:
+    eligible = [r for r in val_table if r['attack_recall'] >= floor]
+    if not eligible:
+        print(f'{floor:>8} no threshold reaches this recall')
+        continue
+    chosen = max(eligible, key=lambda r: r['threshold'])
+    test_row = next(r for r in test_table if r['threshold'] == chosen['threshold'])
+    cascade_preds = np.where(p_test >= chosen['threshold'], full_preds, 0)
+    print(f"{floor:>8}{chosen['threshold']:>11}{chosen['attack_recall']:>12.4%}"
+          f"{test_row['attack_recall']:>13.4%}{test_row['benign_screened']:>17.2%}"
+          f"{f1_score(y_test, cascade_preds, average='macro'):>12.4f}")
+
+# ---- Save ----
+screen_path = OUT_DIR / 'cascade_screen.joblib'
+joblib.dump(screen, screen_path)
+with open(screen_path.with_suffix('.json'), 'w') as f:
+    json.dump({
+        'features': SCREEN_FEATURES,
+        'benign_label': 0,
+        'n_trees': N_TREES,
+        'max_depth': MAX_DEPTH,
+        'measured_on': 'validation',
+        'thresholds': val_table,
+        'test_thresholds': test_table,
+    }, f, indent=2)
+print(f'\nSaved: {screen_path}')
+print(f'Saved: {screen_path.with_suffix(".json")}')
@@ -0,0 +1,116 @@
+"""Microbenchmark: latency added by API key authentication on /predict.
+
+Drives the ASGI stack directly (no sockets, no TestClient) so the numbers
+isolate middleware cost. Compares:
+
+- no middleware
+- the previous BaseHTTPMiddleware implementation (env re-parsed per request)
+- the pure ASGI APIKeyMiddleware with a precomputed digest set
+
+Usage:
+    python scripts/bench_auth_middleware.py [iterations]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+
+from src.inference_server.auth import APIKeyMiddleware, get_api_keys, is_auth_enabled
+
+API_KEY = "bench-key-0123456789abcdef"
+os.environ["ML_IDS_AUTH_ENABLED"] = "true"
+os.environ["ML_IDS_API_KEYS"] = ",".join([f"sensor-key-{i}" for i in range(8)] + [API_KEY])
+
+
+class LegacyAPIKeyMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware-based implementation this benchmark replaces."""
+
+    async def dispatch(self, request, call_next):
+        if not is_auth_enabled():
+            return await call_next(request)
+        keys = get_api_keys()
+        api_key = request.headers.get("X-API-Key")
+        if not api_key:
+            return JSONResponse(status_code=401, content={"detail": "Missing X-API-Key header"})
+        if api_key not in keys:
+            return JSONResponse(status_code=401, content={"detail": "Invalid API key"})
+        return await call_next(request)
+
+
+def make_app(middleware=None):
+    app = FastAPI()
+    if middleware is not None:
+        app.add_middleware(middleware)
+
+    @app.post("/predict")
+    async def predict():
+        return {"prediction": [0]}
+
+    return app
+
+
+async def run(app, iterations):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/predict",
+        "raw_path": b"/predict",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"content-type", b"application/json"),
+            (b"content-length", b"2"),
+            (b"x-api-key", API_KEY.encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    status = {}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    # Warm-up builds the middleware stack and fills caches
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+    assert status["code"] == 200, status
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    results = {}
+    for name, middleware in [
+        ("none", None),
+        ("BaseHTTPMiddleware (legacy)", LegacyAPIKeyMiddleware),
+        ("pure ASGI (current)", APIKeyMiddleware),
+    ]:
+        results[name] = asyncio.run(run(make_app(middleware), iterations))
+
+    baseline = results["none"]
+    print(f"{'middleware':<30} {'per request':>12} {'added':>10}")
+    for name, seconds in results.items():
+        print(f"{name:<30} {seconds * 1e6:>10.1f}us {(seconds - baseline) * 1e6:>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: stock estimator vs the compiled tree-ensemble and ONNX backends.
+
+Measures single-row and batch prediction latency of the array engine itself
+(``predict_compiled``, i.e. without the large-batch delegation to the
+estimator) and checks that the backends predict the same classes. The ONNX
+rows are skipped when onnxruntime/skl2onnx are not installed. Uses a cached server model if given,
+otherwise trains a RandomForest on synthetic 76-feature flows.
+
+Usage:
+    python scripts/bench_model_backends.py [--model model_cache/model.joblib]
+                                           [--trees 100] [--batch 1024] [--iterations 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.inference_server.model_manager import FEATURE_MAPPING, synthetic_frame
+from src.inference_server.tree_engine import CompiledTreeEnsemble, check_parity
+
+
+def make_model(n_trees):
+    from sklearn.ensemble import RandomForestClassifier
+
+    features = list(FEATURE_MAPPING.values())
+    X = synthetic_frame(features, 20000, seed=2)
+    # A few interacting thresholds so the trees grow realistically deep
+    y = ((X.iloc[:, 0] > 150) & (X.iloc[:, 5] < 80)).astype(int) + (X.iloc[:, 13] > 300).astype(int) * 2
+    return RandomForestClassifier(n_estimators=n_trees, random_state=0).fit(X, y)
+
+
+def time_call(fn, X, iterations):
+    fn(X)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(X)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", help="joblib-dumped estimator (e.g. MODEL_CACHE_DIR/model.joblib)")
+    parser.add_argument("--trees", type=int, default=100, help="trees in the synthetic forest")
+    parser.add_argument("--batch", type=int, default=1024)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.model:
+        import joblib
+
+        estimator = joblib.load(args.model)
+    else:
+        estimator = make_model(args.trees)
+    features = list(getattr(estimator, "feature_names_in_", FEATURE_MAPPING.values()))
+
+    start = time.perf_counter()
+    compiled = CompiledTreeEnsemble.from_estimator(estimator)
+    print(f"{type(estimator).__name__}: {compiled.n_trees} trees, {compiled.n_nodes} nodes, "
+          f"depth {compiled.max_depth}, compiled in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    X = synthetic_frame(features, args.batch, seed=3)
+    print(f"parity on {args.batch} rows: {check_parity(compiled, X):.4%}")
+
+    single_frame = X.iloc[:1]
+    single_array = np.asarray(single_frame, dtype=np.float32)
+    batch_iterations = max(1, args.iterations // 10)
+    rows = [
+        ("stock, 1 row (DataFrame)", time_call(estimator.predict, single_frame, args.iterations), 1),
+        ("compiled, 1 row (DataFrame)", time_call(compiled.predict, single_frame, args.iterations), 1),
+        ("compiled, 1 row (ndarray)", time_call(compiled.predict, single_array, args.iterations), 1),
+        (f"stock, {args.batch} rows", time_call(estimator.predict, X, batch_iterations), args.batch),
+        (f"compiled, {args.batch} rows", time_call(compiled.predict_compiled, X, batch_iterations), args.batch),
+    ]
+    try:
+        from src.inference_server.onnx_backend import OnnxPredictor
+
+        onnx = OnnxPredictor.from_estimator(estimator, features)
+    except Exception as e:
+        print(f"ONNX backend skipped: {e}")
+    else:
+        agreement = np.mean(onnx.predict(X) == np.asarray(estimator.predict(X)))
+        print(f"ONNX parity on {args.batch} rows: {agreement:.4%}")
+        rows[3:3] = [("onnx, 1 row (ndarray)", time_call(onnx.predict, single_array, args.iterations), 1)]
+        rows.append((f"onnx, {args.batch} rows", time_call(onnx.predict, X, batch_iterations), args.batch))
+
+    print(f"{'backend':<30} {'per call':>12} {'per row':>12}")
+    for name, seconds, n in rows:
+        print(f"{name:<30} {seconds * 1e3:>10.3f}ms {seconds / n * 1e6:>10.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compare the in-process flow meter with a CICFlowMeter CSV of the same pcap.
+
+Runs ``flow_meter.iter_pcap`` over the capture, matches its flows to the
+CSV rows by 5-tuple and, among flows with the same 5-tuple, by the order
+of their start times (only the order is used, so the CSV's timestamp
+format and time zone do not matter), and reports per feature the share of
+matched flows whose values agree within a relative tolerance. Use it to
+check the extractor against CICFlowMeter output before switching a sensor
+to ``FLOW_METER=native``.
+
+Usage:
+    python scripts/compare_flow_meter.py capture.pcap cicflowmeter.csv [--rtol 0.01]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.inference_server.batch_scoring import REQUEST_FIELDS
+from src.inference_server.flow_meter import iter_pcap
+from src.inference_server.model_manager import FEATURE_MAPPING
+
+# Identifier columns of the Java (CICFlowMeter-V4) and Python (cicflowmeter) CSVs
+ID_COLUMNS = {
+    'src': ('Src IP', 'src_ip'), 'sport': ('Src Port', 'src_port'),
+    'dst': ('Dst IP', 'dst_ip'), 'dport': ('Dst Port', 'dst_port'),
+    'proto': ('Protocol', 'protocol'),
+    'start': ('Timestamp', 'timestamp'),
+}
+
+
+def load_reference(path):
+    ref = pd.read_csv(path, skipinitialspace=True)
+    ref.columns = ref.columns.str.strip()
+    rename = {}
+    for key, names in ID_COLUMNS.items():
+        rename.update({name: key for name in names if name in ref.columns})
+    rename.update({name: field for field, name in FEATURE_MAPPING.items() if name in ref.columns})
+    ref = ref.rename(columns=rename)
+    if 'start' in ref:
+        ref['start'] = pd.to_datetime(ref['start'], errors='coerce', dayfirst=True, format='mixed')
+    return ref
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pcap')
+    parser.add_argument('csv')
+    parser.add_argument('--rtol', type=float, default=0.01)
+    args = parser.parse_args()
+
+    ours = []
+    for batch in iter_pcap(args.pcap):
+        frame = pd.DataFrame(batch.features, columns=REQUEST_FIELDS)
+        frame[['src', 'sport', 'dst', 'dport', 'proto']] = pd.DataFrame(batch.flows, index=frame.index)
+        frame['start'] = batch.start_times
+        ours.append(frame)
+    ref = load_reference(args.csv)
+    if not ours:
+        print(f'flows: meter=0 reference={len(ref)} matched=0')
+        return
+    ours = pd.concat(ours, ignore_index=True)
+
+    # Flows are matched on 5-tuple and the order of their start times within it.
+    # Both sides list flows as they finish, so they are put in start order first
+    # (a stable sort keeps file order for a CSV without timestamps).
+    keys = ['src', 'sport', 'dst', 'dport', 'proto']
+    ours = ours.sort_values('start', kind='stable')
+    if 'start' in ref:
+        ref = ref.sort_values('start', kind='stable')
+    for frame in (ours, ref):
+        frame['occurrence'] = frame.groupby(keys).cumcount()
+    merged = ours.merge(ref.drop(columns='start', errors='ignore'), on=keys + ['occurrence'],
+                        suffixes=('', '_ref'))
+    print(f'flows: meter={len(ours)} reference={len(ref)} matched={len(merged)}')
+    if merged.empty:
+        return
+
+    print(f'{"feature":<22} {"agree":>7}')
+    for field in REQUEST_FIELDS:
+        if f'{field}_ref' not in merged:
+            continue
+        ref_values = pd.to_numeric(merged[f'{field}_ref'], errors='coerce').to_numpy(dtype=float)
+        agree = np.isclose(merged[field].to_numpy(dtype=float), ref_values, rtol=args.rtol, atol=1e-6)
+        print(f'{field:<22} {agree.mean():>7.1%}')
+
+
+if __name__ == "__main__":
+    main()
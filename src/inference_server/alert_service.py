@@ -23,6 +23,7 @@ from .models import (
 from .notifications import notification_service
 from .websocket_manager import ws_manager
 from .metrics import ALERTS_CREATED_TOTAL
+from .tracing import traced, traced_stage, tracer
 
 logger = logging.getLogger(__name__)
 
@@ -107,6 +108,7 @@ class AlertService:
         
         return result.scalar_one_or_none()
     
+    @traced("alert_service.create_alert")
     async def create_alert(
         self,
         db: AsyncSession,
@@ -131,7 +133,8 @@ class AlertService:
             Created alert or None if deduplicated
         """
         # Check for duplicates
-        existing = await self.check_duplicate(db, src_ip, attack_type)
+        with traced_stage("dedup_check"):
+            existing = await self.check_duplicate(db, src_ip, attack_type)
         
         if existing:
             logger.info(
@@ -153,9 +156,10 @@ class AlertService:
             prediction_score=prediction_score
         )
         
-        db.add(alert)
-        await db.commit()
-        await db.refresh(alert)
+        with traced_stage("db_write"):
+            db.add(alert)
+            await db.commit()
+            await db.refresh(alert)
         
         logger.info(
             f"Created alert ID {alert.id}: {attack_type} from {src_ip} "
@@ -165,27 +169,94 @@ class AlertService:
         ALERTS_CREATED_TOTAL.labels(severity=severity.value).inc()
 
         # Evaluate alert rules
-        await self.evaluate_alert_rules(db, alert)
+        with traced_stage("rule_evaluation"):
+            await self.evaluate_alert_rules(db, alert)
         
         # Send notifications
-        await self.send_notifications(db, alert)
+        with traced_stage("notifications"):
+            await self.send_notifications(db, alert)
         
         # Record metric
-        await self.record_alert_metric(db, alert)
+        with traced_stage("metric_write"):
+            await self.record_alert_metric(db, alert)
         
         # Broadcast to WebSocket clients
-        await ws_manager.send_alert({
-            "id": alert.id,
-            "attack_type": alert.attack_type,
-            "severity": alert.severity.value,
-            "src_ip": alert.src_ip,
-            "dst_ip": alert.dst_ip,
-            "timestamp": alert.timestamp.isoformat(),
-            "acknowledged": alert.acknowledged
-        })
+        with traced_stage("websocket_broadcast"):
+            await ws_manager.send_alert({
+                "id": alert.id,
+                "attack_type": alert.attack_type,
+                "severity": alert.severity.value,
+                "src_ip": alert.src_ip,
+                "dst_ip": alert.dst_ip,
+                "timestamp": alert.timestamp.isoformat(),
+                "acknowledged": alert.acknowledged
+            })
         
         return alert
-    
+
+    @traced("alert_service.create_alerts_bulk")
+    async def create_alerts_bulk(
+        self,
+        db: AsyncSession,
+        alerts: List[Dict[str, Any]]
+    ) -> List[Alert]:
+        """
+        Create many alerts in one transaction (offline replay, scoring jobs).
+
+        Deduplicates by (src_ip, attack_type) within the batch and against
+        alerts stored in the deduplication window, with one query instead of
+        one per alert. Alert rules, notifications and WebSocket broadcasts are
+        skipped: the flows are historical, not live attacks.
+
+        Args:
+            db: Database session
+            alerts: Dicts with the keyword arguments of ``create_alert``
+                (attack_type, src_ip, and optionally dst_ip, features,
+                prediction_score)
+
+        Returns:
+            Created alerts
+        """
+        if not alerts:
+            return []
+
+        cutoff_time = datetime.utcnow() - timedelta(seconds=self.dedup_window_seconds)
+        with traced_stage("dedup_check"):
+            result = await db.execute(
+                select(Alert.src_ip, Alert.attack_type).where(
+                    and_(
+                        Alert.src_ip.in_(list({a["src_ip"] for a in alerts})),
+                        Alert.timestamp >= cutoff_time
+                    )
+                ).distinct()
+            )
+            seen = set(result.all())
+
+        created = []
+        for data in alerts:
+            key = (data["src_ip"], data["attack_type"])
+            if key in seen:
+                continue
+            seen.add(key)
+            created.append(Alert(
+                attack_type=data["attack_type"],
+                severity=self.classify_severity(data["attack_type"], data.get("prediction_score")),
+                src_ip=data["src_ip"],
+                dst_ip=data.get("dst_ip"),
+                features=data.get("features"),
+                prediction_score=data.get("prediction_score")
+            ))
+
+        with traced_stage("db_write"):
+            db.add_all(created)
+            await db.commit()
+
+        for alert in created:
+            ALERTS_CREATED_TOTAL.labels(severity=alert.severity.value).inc()
+        logger.info(f"Created {len(created)} alerts in bulk ({len(alerts) - len(created)} deduplicated)")
+        return created
+
+    @traced("alert_service.evaluate_alert_rules")
     async def evaluate_alert_rules(self, db: AsyncSession, alert: Alert):
         """
         Evaluate alert rules and take appropriate actions.
@@ -201,7 +272,10 @@ class AlertService:
         rules = result.scalars().all()
         
         for rule in rules:
-            triggered = await self._check_rule_condition(db, rule, alert)
+            with tracer.start_as_current_span("alert_rule.check") as span:
+                span.set_attribute("mlids.rule", rule.name)
+                triggered = await self._check_rule_condition(db, rule, alert)
+                span.set_attribute("mlids.rule_triggered", bool(triggered))
             
             if triggered:
                 logger.info(f"Alert rule '{rule.name}' triggered for alert {alert.id}")
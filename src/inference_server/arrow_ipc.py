@@ -0,0 +1,108 @@
+"""Apache Arrow IPC batches for ``/predict``.
+
+A ``POST /predict`` with ``Content-Type: application/vnd.apache.arrow.stream``
+carries a batch of flows as an Arrow IPC stream, one flow per row. Feature
+columns are named by request field names (the keys of FEATURE_MAPPING) or by
+the model feature names; columns missing from the batch are 0 and unknown
+columns are ignored. Optional string columns ``src_ip`` and ``dst_ip`` are
+used for alerts.
+
+The body bypasses JSON and pydantic: each numeric column is read from the
+Arrow buffers and written once into a float32 matrix, which goes through
+``batch_scoring.score_matrix`` like the other batch paths. The response is
+an Arrow stream with a ``prediction`` column in row order (plus
+``validation_warnings`` when values were clamped), or JSON when the client
+only accepts ``application/json``.
+"""
+
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from .schemas import MatrixWarnings
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pyarrow as pa
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ID_FIELDS = ("src_ip", "dst_ip")
+
+
+def is_arrow(content_type: Optional[str]) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() == ARROW_STREAM
+
+
+def wants_json(accept: Optional[str]) -> bool:
+    """True when the client accepts JSON but not Arrow."""
+    accept = (accept or "").lower()
+    return "application/json" in accept and ARROW_STREAM not in accept
+
+
+def _strings(column: "pa.ChunkedArray") -> List[Optional[str]]:
+    import pyarrow as pa
+
+    if not pa.types.is_string(column.type) and not pa.types.is_large_string(column.type):
+        column = column.cast(pa.string())
+    return column.to_pylist()
+
+
+def read_batch(body: bytes) -> Tuple["np.ndarray", List[str], Optional[List], Optional[List]]:
+    """Decode an Arrow IPC stream into (features, fields, src_ips, dst_ips).
+
+    Raises:
+        HTTPException: 400 if the body is not an Arrow stream or has no
+            usable feature column.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    from .batch_scoring import _FIELD_FOR_COLUMN
+
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Arrow IPC stream: {e}")
+
+    columns, fields = [], []
+    for name in table.column_names:
+        field = _FIELD_FOR_COLUMN.get(name)
+        if field is None or field in fields:
+            continue
+        column = table.column(name)
+        if not (pa.types.is_floating(column.type) or pa.types.is_integer(column.type)):
+            raise HTTPException(status_code=400, detail=f"Column {name} must be numeric, got {column.type}")
+        columns.append(column)
+        fields.append(field)
+    if not fields and table.num_rows:
+        raise HTTPException(status_code=400, detail="No FEATURE_MAPPING columns in Arrow batch")
+
+    X = np.empty((table.num_rows, len(fields)), dtype=np.float32)
+    for j, column in enumerate(columns):
+        # Nulls come out as NaN and are replaced with 0 by score_matrix
+        if column.null_count:
+            column = column.cast(pa.float64())
+        X[:, j] = column.to_numpy()
+
+    src_ips, dst_ips = (_strings(table.column(name)) if name in table.column_names else None
+                        for name in ID_FIELDS)
+    return X, fields, src_ips, dst_ips
+
+
+def write_predictions(predictions: "np.ndarray", warnings: Optional[MatrixWarnings] = None) -> bytes:
+    """Encode predictions as an Arrow IPC stream.
+
+    The ``prediction`` column is always present; a ``validation_warnings``
+    column (list of strings per row) is added when any value was clamped.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    columns = {"prediction": pa.array(np.asarray(predictions))}
+    if warnings:
+        columns["validation_warnings"] = pa.array(warnings.to_lists(), pa.list_(pa.string()))
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -2,20 +2,34 @@
 
 Provides header-based API key authentication for HTTP endpoints
 and query-parameter authentication for WebSocket connections.
+
+The key set is parsed once into a set of SHA-256 digests and only rebuilt
+when the process receives SIGHUP or when ``ML_IDS_API_KEYS_FILE`` changes on
+disk, so the per-request cost is one hash and a constant-time comparison.
 """
 
+import asyncio
+import hashlib
+import hmac
 import logging
 import os
-from typing import List, Optional
+import signal
+import threading
+import time
+from typing import FrozenSet, List, Optional
 
-from fastapi import HTTPException, WebSocket
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from fastapi import HTTPException, Request, WebSocket
+from starlette.datastructures import Headers
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
-PUBLIC_PATHS = {"/health", "/docs", "/redoc", "/openapi.json", "/openapi.yaml", "/"}
+PUBLIC_PATHS = {"/health", "/health/live", "/health/ready", "/docs", "/redoc", "/openapi.json", "/openapi.yaml", "/"}
+
+# Entries in ML_IDS_API_KEYS or the keys file with this prefix are already
+# SHA-256 hex digests, so plaintext keys never need to be stored in config.
+HASHED_KEY_PREFIX = "sha256:"
 
 
 def get_api_keys() -> List[str]:
@@ -29,46 +43,207 @@ def is_auth_enabled() -> bool:
     return os.getenv("ML_IDS_AUTH_ENABLED", "true").lower() in ("true", "1", "yes")
 
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
-    """Middleware that enforces X-API-Key header authentication."""
+def hash_api_key(api_key: str) -> bytes:
+    """Return the SHA-256 digest used to store and compare an API key."""
+    return hashlib.sha256(api_key.encode("utf-8")).digest()
+
+
+def key_id_for_digest(digest: bytes) -> str:
+    """Short, non-secret identifier for a key, safe for logs and metric labels."""
+    return f"key-{digest.hex()[:8]}"
+
+
+def _read_keys_file(path: str) -> List[str]:
+    """Read one key per line from path, ignoring blank lines and # comments."""
+    with open(path) as f:
+        return [
+            line.strip() for line in f
+            if line.strip() and not line.strip().startswith("#")
+        ]
 
-    async def dispatch(self, request: Request, call_next):
-        if not is_auth_enabled():
-            return await call_next(request)
 
-        path = request.url.path
+def _digest_entry(entry: str) -> Optional[bytes]:
+    """Turn a configured key entry (plaintext or sha256:<hex>) into a digest."""
+    if entry.startswith(HASHED_KEY_PREFIX):
+        try:
+            digest = bytes.fromhex(entry[len(HASHED_KEY_PREFIX):])
+        except ValueError:
+            digest = b""
+        if len(digest) != hashlib.sha256().digest_size:
+            logger.warning("Ignoring malformed hashed API key entry")
+            return None
+        return digest
+    return hash_api_key(entry)
+
+
+class APIKeyStore:
+    """Precomputed set of API key digests with on-demand reloading.
+
+    Built from ``ML_IDS_API_KEYS`` plus the optional ``ML_IDS_API_KEYS_FILE``.
+    Keys in ``ML_IDS_ADMIN_API_KEYS`` are valid everywhere and additionally
+    unlock the ``/api/admin`` endpoints.
+    The file's mtime is checked at most every
+    ``ML_IDS_API_KEYS_RELOAD_INTERVAL`` seconds (default 5) from the request
+    path; ``reload()`` can also be triggered explicitly, e.g. by SIGHUP.
+    """
+
+    def __init__(self):
+        self.enabled: bool = True
+        self.digests: FrozenSet[bytes] = frozenset()
+        self.admin_digests: FrozenSet[bytes] = frozenset()
+        self.keys_file: Optional[str] = None
+        self.reload_interval: float = 5.0
+        self._file_mtime: Optional[float] = None
+        self._next_check: float = 0.0
+        self._lock = threading.Lock()
+
+    def reload(self) -> None:
+        """Re-read the environment and keys file and rebuild the digest set."""
+        with self._lock:
+            self.enabled = is_auth_enabled()
+            self.keys_file = os.getenv("ML_IDS_API_KEYS_FILE") or None
+            self.reload_interval = float(os.getenv("ML_IDS_API_KEYS_RELOAD_INTERVAL", "5"))
+
+            entries = get_api_keys()
+            self._file_mtime = None
+            if self.keys_file:
+                try:
+                    self._file_mtime = os.stat(self.keys_file).st_mtime
+                    entries.extend(_read_keys_file(self.keys_file))
+                except OSError as e:
+                    logger.warning(f"Failed to read API keys file {self.keys_file}: {e}")
+
+            admin_raw = os.getenv("ML_IDS_ADMIN_API_KEYS", "")
+            admin_digests = {_digest_entry(k.strip()) for k in admin_raw.split(",") if k.strip()}
+            admin_digests.discard(None)
+            digests = {_digest_entry(e) for e in entries} | admin_digests
+            digests.discard(None)
+            self.digests = frozenset(digests)
+            self.admin_digests = frozenset(admin_digests)
+            self._next_check = time.monotonic() + self.reload_interval
+
+        logger.debug(f"Loaded {len(self.digests)} API key(s), auth {'enabled' if self.enabled else 'disabled'}")
+
+    def _maybe_reload_file(self) -> None:
+        """Reload if the keys file changed since the last check."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        try:
+            mtime = os.stat(self.keys_file).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._file_mtime:
+            logger.info(f"API keys file {self.keys_file} changed, reloading")
+            self.reload()
+
+    def has_keys(self) -> bool:
+        """Whether any key is configured (no keys means dev mode)."""
+        if self.keys_file:
+            self._maybe_reload_file()
+        return bool(self.digests)
+
+    def match(self, api_key: Optional[str]) -> Optional[bytes]:
+        """Return the digest of api_key if it is a configured key, else None.
+
+        Every stored digest is compared with ``hmac.compare_digest`` so the
+        timing does not reveal which key (or how much of it) matched.
+        """
+        if not api_key:
+            return None
+        candidate = hash_api_key(api_key)
+        found = False
+        for digest in self.digests:
+            found |= hmac.compare_digest(candidate, digest)
+        return candidate if found else None
+
 
-        # Skip public paths
-        if path in PUBLIC_PATHS:
-            return await call_next(request)
+key_store = APIKeyStore()
 
-        # Skip dashboard static files
-        if path.startswith("/dashboard"):
-            return await call_next(request)
 
-        # Skip metrics endpoint
-        if path == "/metrics":
-            return await call_next(request)
+def _reload_on_signal(store: APIKeyStore) -> None:
+    logger.info("SIGHUP received, reloading API keys")
+    store.reload()
 
-        keys = get_api_keys()
-        if not keys:
+
+def install_reload_signal(store: APIKeyStore = key_store) -> bool:
+    """Reload the key store on SIGHUP. Returns False where signals are unavailable.
+
+    Must be called from the running event loop. The reload runs as a loop
+    callback rather than in a raw signal handler, which could interrupt a
+    request holding the store's lock and deadlock on it.
+    """
+    if not hasattr(signal, "SIGHUP"):
+        return False
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, _reload_on_signal, store)
+    except (RuntimeError, ValueError, NotImplementedError):
+        # No running loop, or not in the main thread (e.g. under a test client); skip quietly.
+        return False
+    return True
+
+
+class APIKeyMiddleware:
+    """Pure ASGI middleware that enforces X-API-Key header authentication."""
+
+    def __init__(self, app: ASGIApp, store: Optional[APIKeyStore] = None):
+        self.app = app
+        self.store = store or key_store
+        self.store.reload()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.store.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+
+        # Skip public paths, dashboard static files and the metrics endpoint
+        if path in PUBLIC_PATHS or path.startswith("/dashboard") or path == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        if not self.store.has_keys():
             logger.warning("No API keys configured — allowing request (dev mode)")
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
-        api_key = request.headers.get("X-API-Key")
+        api_key = Headers(scope=scope).get("x-api-key")
         if not api_key:
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=401,
                 content={"detail": "Missing X-API-Key header"},
             )
+            await response(scope, receive, send)
+            return
 
-        if api_key not in keys:
-            return JSONResponse(
+        digest = self.store.match(api_key)
+        if digest is None:
+            response = JSONResponse(
                 status_code=401,
                 content={"detail": "Invalid API key"},
             )
+            await response(scope, receive, send)
+            return
+
+        # Expose a non-secret caller identity to downstream middleware/routes
+        state = scope.setdefault("state", {})
+        state["api_key_id"] = key_id_for_digest(digest)
+        state["api_key_admin"] = digest in self.store.admin_digests
+        await self.app(scope, receive, send)
+
 
-        return await call_next(request)
+def require_admin(request: Request) -> None:
+    """FastAPI dependency restricting a route to ML_IDS_ADMIN_API_KEYS.
+
+    Open when authentication is disabled or in dev mode (no keys), like the
+    rest of the API.
+    """
+    if not key_store.enabled or not key_store.has_keys():
+        return
+    if not getattr(request.state, "api_key_admin", False):
+        raise HTTPException(status_code=403, detail="Admin API key required")
 
 
 async def verify_ws_api_key(websocket: WebSocket) -> bool:
@@ -79,13 +254,13 @@ async def verify_ws_api_key(websocket: WebSocket) -> bool:
     if not is_auth_enabled():
         return True
 
-    keys = get_api_keys()
-    if not keys:
+    # WebSocket handshakes are rare, so build a fresh store to pick up the
+    # current environment and keys file.
+    store = APIKeyStore()
+    store.reload()
+    if not store.has_keys():
         logger.warning("No API keys configured — allowing WebSocket (dev mode)")
         return True
 
     api_key = websocket.query_params.get("api_key")
-    if not api_key or api_key not in keys:
-        return False
-
-    return True
+    return store.match(api_key) is not None
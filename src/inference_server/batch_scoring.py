@@ -0,0 +1,132 @@
+"""Vectorized scoring of flow batches outside the per-request JSON path.
+
+Batch ingestion paths deliver flows as float matrices whose columns are
+request field names (the keys of FEATURE_MAPPING, in ``REQUEST_FIELDS``
+order unless stated otherwise). ``predict_matrix`` applies the request value
+rules, maps the columns to the serving model's feature order and predicts
+the whole batch in one call; ``score_matrix`` also returns the per-row
+validation warnings. ``record_attacks`` raises alerts for the positive
+rows, like ``/predict`` does for a single flow.
+"""
+
+import logging
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .alert_service import alert_service
+from .metrics import BATCH_FLOWS_TOTAL, PREDICTION_LATENCY, PREDICTIONS_TOTAL
+from .model_manager import FEATURE_MAPPING, LoadedModel
+from .overload import overload_guard
+from .schemas import MatrixWarnings, sanitize_feature_matrix, validate_feature_matrix
+
+logger = logging.getLogger(__name__)
+
+# Column order of fixed-layout batches (local ingest records, replay files)
+REQUEST_FIELDS: List[str] = list(FEATURE_MAPPING)
+_FIELD_FOR_FEATURE: Dict[str, str] = {v: k for k, v in FEATURE_MAPPING.items()}
+# Column names accepted for each request field in batch inputs (replay CSV/Parquet
+# headers, Arrow columns): the model feature name or the field itself
+_FIELD_FOR_COLUMN: Dict[str, str] = {**_FIELD_FOR_FEATURE, **{field: field for field in FEATURE_MAPPING}}
+
+
+@lru_cache(maxsize=16)
+def _column_plan(fields: Tuple[str, ...], features: Tuple[str, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """(model columns, source columns) to copy; model features not provided stay 0."""
+    index = {f: i for i, f in enumerate(fields)}
+    pairs = [(j, index[_FIELD_FOR_FEATURE.get(feat, feat)])
+             for j, feat in enumerate(features) if _FIELD_FOR_FEATURE.get(feat, feat) in index]
+    dst = np.asarray([j for j, _ in pairs], dtype=np.intp)
+    src = np.asarray([i for _, i in pairs], dtype=np.intp)
+    return dst, src
+
+
+def to_model_matrix(X: np.ndarray, fields: Sequence[str], features: Sequence[str]) -> np.ndarray:
+    """Reorder request-field columns of ``X`` into the model's feature order."""
+    dst, src = _column_plan(tuple(fields), tuple(features))
+    if len(dst) == len(features) == X.shape[1] and np.array_equal(dst, src):
+        return X
+    out = np.zeros((X.shape[0], len(features)), dtype=X.dtype)
+    out[:, dst] = X[:, src]
+    return out
+
+
+def predict_matrix(current: LoadedModel, X: np.ndarray, fields: Sequence[str], source: str) -> np.ndarray:
+    """Validate ``X`` in place and predict every row with ``current``.
+
+    Args:
+        current: Serving model snapshot.
+        X: float32 matrix, one flow per row, columns named by ``fields``.
+        fields: Request field names of the columns of ``X``.
+        source: Ingestion path, the label of ``mlids_batch_flows_total``.
+    """
+    sanitize_feature_matrix(X, fields)
+    return _predict(current, X, fields, source)
+
+
+def score_matrix(
+    current: LoadedModel, X: np.ndarray, fields: Sequence[str], source: str
+) -> Tuple[np.ndarray, MatrixWarnings]:
+    """``predict_matrix`` that also returns the per-row validation warnings."""
+    warnings = validate_feature_matrix(X, fields)
+    return _predict(current, X, fields, source), warnings
+
+
+def _predict(current: LoadedModel, X: np.ndarray, fields: Sequence[str], source: str) -> np.ndarray:
+    import pandas as pd
+
+    if not len(X):
+        # Estimators reject empty input (e.g. a header-only CSV chunk)
+        return np.zeros(0, dtype=np.int64)
+
+    frame = pd.DataFrame(to_model_matrix(X, fields, current.features), columns=current.features, copy=False)
+
+    start = time.monotonic()
+    predictions = np.asarray(current.model.predict(frame))
+    PREDICTION_LATENCY.observe(time.monotonic() - start)
+
+    attacks = int(np.count_nonzero(predictions != 0))
+    if attacks:
+        PREDICTIONS_TOTAL.labels(result="attack").inc(attacks)
+    if len(predictions) - attacks:
+        PREDICTIONS_TOTAL.labels(result="benign").inc(len(predictions) - attacks)
+    BATCH_FLOWS_TOTAL.labels(source=source).inc(len(predictions))
+    return predictions
+
+
+async def record_attacks(
+    predictions: np.ndarray,
+    X: np.ndarray,
+    fields: Sequence[str],
+    src_ips: Sequence[Optional[str]],
+    dst_ips: Optional[Sequence[Optional[str]]] = None,
+) -> int:
+    """Create alerts for the attack rows of a scored batch.
+
+    Returns the number of attack rows. Without a database, attackers are
+    still remembered by overload protection.
+    """
+    from . import database
+
+    rows = np.flatnonzero(predictions != 0)
+    for i in rows:
+        overload_guard.mark_attacker(src_ips[i])
+    if not rows.size or not database.db_available or database.async_session_maker is None:
+        return int(rows.size)
+
+    async with database.async_session_maker() as db:
+        for i in rows:
+            try:
+                await alert_service.create_alert(
+                    db=db,
+                    attack_type=str(predictions[i]),
+                    src_ip=src_ips[i] or "unknown",
+                    dst_ip=dst_ips[i] if dst_ips is not None else None,
+                    features=dict(zip(fields, X[i].tolist())),
+                )
+            except Exception as e:
+                logger.warning(f"Failed to create alert in database: {e}")
+                await db.rollback()
+    return int(rows.size)
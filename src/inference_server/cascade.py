@@ -0,0 +1,145 @@
+"""Two-stage cascade inference: a cheap benign screen in front of the full model.
+
+Almost all traffic is benign, so most flows do not need the full multiclass
+model. ``CascadePredictor`` first scores every flow with a tiny binary screen
+(a few shallow trees on a handful of top features, trained by
+``notebooks/train_cascade_screen.py``). Flows whose attack probability is
+below the threshold are returned as benign straight away; only the rest are
+passed to the full model.
+
+The screen is tuned for recall, not precision: its threshold is picked from
+the table of (threshold, attack recall, benign fraction screened) measured
+offline on the validation split and stored in the screen's JSON sidecar,
+as the highest threshold whose attack recall still meets
+``MODEL_CASCADE_RECALL_FLOOR``. ``MODEL_CASCADE_THRESHOLD`` overrides it.
+
+Per-stage outcomes and latency are exported as
+``mlids_cascade_flows_total{stage}`` and ``mlids_cascade_stage_seconds{stage}``
+and summarised by ``stats()`` (shown in ``/health``).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .metrics import CASCADE_FLOWS_TOTAL, CASCADE_STAGE_SECONDS
+
+
+def select_threshold(table: Sequence[dict], recall_floor: float) -> dict:
+    """The row of ``table`` with the highest threshold meeting ``recall_floor``.
+
+    Raises ValueError when no threshold reaches the floor.
+    """
+    eligible = [row for row in table if row["attack_recall"] >= recall_floor]
+    if not eligible:
+        best = max((row["attack_recall"] for row in table), default=0.0)
+        raise ValueError(f"no screen threshold reaches attack recall {recall_floor} (best {best})")
+    return max(eligible, key=lambda row: row["threshold"])
+
+
+def read_screen_meta(path: str) -> dict:
+    """The JSON sidecar (``<name>.json``) of the screen stored at ``path``."""
+    with open(os.path.splitext(path)[0] + ".json") as f:
+        return json.load(f)
+
+
+class CascadePredictor:
+    """Screen, then the full model for suspicious flows, with an estimator-like ``predict``.
+
+    ``screen`` must provide ``predict_proba`` over the ``screen_features``
+    columns (as an array when it is a CompiledTreeEnsemble, else a
+    DataFrame); ``full`` is any serving model taking ``features``.
+    """
+
+    def __init__(
+        self,
+        screen,
+        full,
+        features: List[str],
+        screen_features: List[str],
+        threshold: float,
+        recall_floor: Optional[float] = None,
+        benign_label=0,
+    ):
+        from .tree_engine import CompiledTreeEnsemble
+
+        self.screen = screen
+        self.full = full
+        self.features = list(features)
+        self.screen_features = list(screen_features)
+        self.threshold = float(threshold)
+        self.recall_floor = recall_floor
+        self.benign_label = benign_label
+        self.estimator = getattr(full, "estimator", full)
+        classes = getattr(full, "classes_", None)
+        self.classes_ = np.asarray(classes if classes is not None and len(classes) else [benign_label])
+        self.feature_names_in_ = np.asarray(self.features, dtype=object)
+
+        self._screen_index = np.asarray([self.features.index(f) for f in self.screen_features], dtype=np.intp)
+        self._screen_takes_array = isinstance(screen, CompiledTreeEnsemble)
+        self._attack_column = int(np.flatnonzero(np.asarray(screen.classes_) != benign_label)[0])
+
+        self._lock = threading.Lock()
+        self._screened = 0
+        self._escalated = 0
+        self._screen_seconds = 0.0
+        self._full_seconds = 0.0
+
+    def attack_probability(self, X) -> np.ndarray:
+        """Screen score of each row: the probability that it is not benign."""
+        values = np.asarray(X, dtype=np.float32)[:, self._screen_index]
+        if not self._screen_takes_array:
+            import pandas as pd
+
+            values = pd.DataFrame(values, columns=self.screen_features)
+        return self.screen.predict_proba(values)[:, self._attack_column]
+
+    def suspicious(self, X) -> np.ndarray:
+        """Rows the screen passes on to the full model (boolean mask)."""
+        return self.attack_probability(X) >= self.threshold
+
+    def predict(self, X) -> np.ndarray:
+        t0 = time.perf_counter()
+        suspicious = np.flatnonzero(self.suspicious(X))
+        t1 = time.perf_counter()
+
+        n = len(X)
+        out = np.full(n, self.benign_label, dtype=self.classes_.dtype)
+        if suspicious.size == n:
+            out[:] = self.full.predict(X)
+        elif suspicious.size:
+            subset = X.iloc[suspicious] if hasattr(X, "iloc") else np.asarray(X)[suspicious]
+            out[suspicious] = self.full.predict(subset)
+        t2 = time.perf_counter()
+
+        CASCADE_FLOWS_TOTAL.labels(stage="screen").inc(n - suspicious.size)
+        CASCADE_STAGE_SECONDS.labels(stage="screen").observe(t1 - t0)
+        if suspicious.size:
+            CASCADE_FLOWS_TOTAL.labels(stage="full").inc(suspicious.size)
+            CASCADE_STAGE_SECONDS.labels(stage="full").observe(t2 - t1)
+        with self._lock:
+            self._screened += n - suspicious.size
+            self._escalated += suspicious.size
+            self._screen_seconds += t1 - t0
+            self._full_seconds += t2 - t1
+        return out
+
+    def stats(self) -> dict:
+        """Flows decided by each stage and their cumulative latency in this process."""
+        with self._lock:
+            flows = self._screened + self._escalated
+            return {
+                "threshold": self.threshold,
+                "recall_floor": self.recall_floor,
+                "screen_features": len(self.screen_features),
+                "flows": flows,
+                "screened_benign": self._screened,
+                "escalated": self._escalated,
+                "screen_hit_rate": round(self._screened / flows, 4) if flows else None,
+                "screen_seconds": round(self._screen_seconds, 4),
+                "full_seconds": round(self._full_seconds, 4),
+            }
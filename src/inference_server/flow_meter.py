@@ -0,0 +1,519 @@
+"""In-process flow meter: packets to CICFlowMeter features to batched scoring.
+
+Replaces the external ``cicflowmeter`` sensor, which posts every finished
+flow to ``/predict`` over HTTP. Packets are read from a pcap or sniffed
+live with scapy and assembled into bidirectional TCP/UDP flows keyed by
+5-tuple. Each flow's state is a fixed-width row of running accumulators
+(counts, Welford mean/variance, min/max, flag and bulk counters) in one
+flat ``array('d')`` table, updated incrementally per packet. Finished flows
+are turned into the 76 ``FEATURE_MAPPING`` features with column-wise NumPy
+operations over all of them at once and scored through ``batch_scoring``.
+
+Feature definitions follow the Java CICFlowMeter that generated CIC-IDS2017
+(the training data): lengths are transport payload bytes, times are
+microseconds, standard deviations are sample deviations, a FIN ends a flow,
+flows are cut ``flow_timeout`` after their first packet, and a gap of
+``activity_timeout`` separates active from idle periods.
+
+With ``FLOW_METER_INTERFACE`` set the server captures on that interface
+itself (one worker per host) and start.sh no longer needs cicflowmeter.
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .batch_scoring import REQUEST_FIELDS, predict_matrix, record_attacks
+from .model_manager import model_manager
+
+logger = logging.getLogger(__name__)
+
+FIN, SYN, RST, PSH, ACK, URG, ECE, CWR = (1 << bit for bit in range(8))
+TCP, UDP = 6, 17
+_US = 1e6
+
+# Row layout of the flow table. Each statistic is a block of five columns.
+_N, _MEAN, _M2, _MIN, _MAX = range(5)
+_FWD_LEN, _BWD_LEN, _PKT_LEN, _FLOW_IAT, _FWD_IAT, _BWD_IAT, _ACTIVE, _IDLE = range(0, 40, 5)
+(_FIRST_TS, _LAST_TS, _LAST_FWD_TS, _LAST_BWD_TS, _FWD_PSH, _BWD_PSH, _FWD_URG, _BWD_URG,
+ _FWD_HDR, _BWD_HDR, _FWD_ACT_DATA, _FWD_SEG_MIN, _INIT_FWD_WIN, _INIT_BWD_WIN,
+ _SF_LAST_TS, _SF_COUNT, _START_ACTIVE, _END_ACTIVE) = range(40, 58)
+_FLAG_COUNTS = 58  # FIN SYN RST PSH ACK URG ECE CWR, in TCP flag bit order
+# Bulk transfer state per direction (CICFlowMeter: >= 4 payload packets < 1 s apart)
+_FWD_BULK, _BWD_BULK = 66, 74
+_B_START, _B_LAST, _B_PKTS_HELPER, _B_SIZE_HELPER, _B_COUNT, _B_PKTS, _B_SIZE, _B_DURATION = range(8)
+_WIDTH = 82
+
+BULK_BOUND = 4
+CLUMP_TIMEOUT = 1.0 * _US
+SUBFLOW_GAP = 1.0 * _US
+
+_TEMPLATE = array("d", [0.0] * _WIDTH)
+for _base in range(_FWD_LEN, _IDLE + 1, 5):
+    _TEMPLATE[_base + _MIN] = float("inf")
+    _TEMPLATE[_base + _MAX] = float("-inf")
+for _base in (_FWD_BULK, _BWD_BULK):
+    _TEMPLATE[_base + _B_START] = _TEMPLATE[_base + _B_LAST] = -1.0
+_TEMPLATE[_FWD_SEG_MIN] = float("inf")
+_TEMPLATE[_INIT_FWD_WIN] = _TEMPLATE[_INIT_BWD_WIN] = -1.0
+_TEMPLATE[_SF_COUNT] = 1.0
+
+# (src, src port, dst, dst port, protocol), oriented like the flow's first packet
+FlowKey = Tuple[str, int, str, int, int]
+
+
+def _observe(t: array, base: int, x: float) -> None:
+    """Add ``x`` to the statistic block at ``base`` (Welford update)."""
+    n = t[base + _N] + 1.0
+    t[base + _N] = n
+    delta = x - t[base + _MEAN]
+    mean = t[base + _MEAN] + delta / n
+    t[base + _MEAN] = mean
+    t[base + _M2] += delta * (x - mean)
+    if x < t[base + _MIN]:
+        t[base + _MIN] = x
+    if x > t[base + _MAX]:
+        t[base + _MAX] = x
+
+
+def _flow_key(src: str, sport: int, dst: str, dport: int, proto: int) -> FlowKey:
+    """Direction-independent table key."""
+    if (src, sport) <= (dst, dport):
+        return (src, sport, dst, dport, proto)
+    return (dst, dport, src, sport, proto)
+
+
+@dataclass
+class FlowBatch:
+    """Finished flows: one feature row per flow, in ``REQUEST_FIELDS`` order."""
+
+    features: np.ndarray
+    flows: List[FlowKey] = field(default_factory=list)
+    start_times: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.flows)
+
+    @property
+    def src_ips(self) -> List[str]:
+        return [flow[0] for flow in self.flows]
+
+    @property
+    def dst_ips(self) -> List[str]:
+        return [flow[2] for flow in self.flows]
+
+
+class FlowTable:
+    """Incremental bidirectional flow assembly over a flat accumulator table.
+
+    Not thread-safe; ``FlowMeter`` serializes access.
+    """
+
+    def __init__(self, flow_timeout: float = 120.0, activity_timeout: float = 5.0):
+        self.flow_timeout = flow_timeout * _US
+        self.activity_timeout = activity_timeout * _US
+        self._table = array("d")
+        self._slots: Dict[FlowKey, int] = {}
+        self._flows: List[Optional[FlowKey]] = []
+        self._free: List[int] = []
+        self._finished: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def pending(self) -> int:
+        """Finished flows not yet collected by ``pop_finished``."""
+        return len(self._finished)
+
+    def add(self, ts: float, src: str, sport: int, dst: str, dport: int, proto: int,
+            payload: int, header: int, flags: int = 0, window: int = -1) -> None:
+        """Account one packet.
+
+        Args:
+            ts: Capture time in seconds.
+            payload: Transport payload bytes.
+            header: Transport header bytes.
+            flags: TCP flag bits (0 for UDP).
+            window: TCP window (-1 for UDP).
+        """
+        ts *= _US
+        key = _flow_key(src, sport, dst, dport, proto)
+        slot = self._slots.get(key)
+        t = self._table
+        if slot is not None and ts - t[slot * _WIDTH + _FIRST_TS] > self.flow_timeout:
+            self._finish(slot, timed_out=True)
+            slot = None
+        if slot is None:
+            slot = self._open(key, (src, sport, dst, dport, proto), ts)
+            self._update(slot * _WIDTH, ts, True, payload, header, flags, window, first=True)
+            return
+
+        o = slot * _WIDTH
+        forward = self._flows[slot][0] == src and self._flows[slot][1] == sport
+        if flags & FIN:
+            self._update(o, ts, forward, payload, header, flags, window)
+            self._finish(slot, timed_out=False)
+            return
+        if ts - t[o + _END_ACTIVE] > self.activity_timeout:
+            if t[o + _END_ACTIVE] - t[o + _START_ACTIVE] > 0:
+                _observe(t, o + _ACTIVE, t[o + _END_ACTIVE] - t[o + _START_ACTIVE])
+            _observe(t, o + _IDLE, ts - t[o + _END_ACTIVE])
+            t[o + _START_ACTIVE] = ts
+        t[o + _END_ACTIVE] = ts
+        self._update(o, ts, forward, payload, header, flags, window)
+
+    def _open(self, key: FlowKey, flow: FlowKey, ts: float) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._table[slot * _WIDTH:(slot + 1) * _WIDTH] = _TEMPLATE
+            self._flows[slot] = flow
+        else:
+            slot = len(self._flows)
+            self._table.extend(_TEMPLATE)
+            self._flows.append(flow)
+        self._slots[key] = slot
+        o = slot * _WIDTH
+        self._table[o + _FIRST_TS] = self._table[o + _START_ACTIVE] = self._table[o + _END_ACTIVE] = ts
+        return slot
+
+    def _update(self, o: int, ts: float, forward: bool, payload: int, header: int,
+                flags: int, window: int, first: bool = False) -> None:
+        t = self._table
+        if forward:
+            self._bulk(o + _FWD_BULK, o + _BWD_BULK, ts, payload)
+        else:
+            self._bulk(o + _BWD_BULK, o + _FWD_BULK, ts, payload)
+
+        if not first and ts - t[o + _SF_LAST_TS] > SUBFLOW_GAP:
+            t[o + _SF_COUNT] += 1
+        t[o + _SF_LAST_TS] = ts
+
+        if flags:
+            for bit in range(8):
+                if flags & (1 << bit):
+                    t[o + _FLAG_COUNTS + bit] += 1
+
+        _observe(t, o + _PKT_LEN, payload)
+        if forward:
+            if payload >= 1:
+                t[o + _FWD_ACT_DATA] += 1
+            _observe(t, o + _FWD_LEN, payload)
+            t[o + _FWD_HDR] += header
+            if t[o + _FWD_LEN + _N] > 1:
+                _observe(t, o + _FWD_IAT, ts - t[o + _LAST_FWD_TS])
+            t[o + _LAST_FWD_TS] = ts
+            if header < t[o + _FWD_SEG_MIN]:
+                t[o + _FWD_SEG_MIN] = header
+            if flags & PSH:
+                t[o + _FWD_PSH] += 1
+            if flags & URG:
+                t[o + _FWD_URG] += 1
+            if first:
+                t[o + _INIT_FWD_WIN] = window
+        else:
+            _observe(t, o + _BWD_LEN, payload)
+            t[o + _BWD_HDR] += header
+            if t[o + _BWD_LEN + _N] > 1:
+                _observe(t, o + _BWD_IAT, ts - t[o + _LAST_BWD_TS])
+            else:
+                t[o + _INIT_BWD_WIN] = window
+            t[o + _LAST_BWD_TS] = ts
+            if flags & PSH:
+                t[o + _BWD_PSH] += 1
+            if flags & URG:
+                t[o + _BWD_URG] += 1
+
+        if not first:
+            _observe(t, o + _FLOW_IAT, ts - t[o + _LAST_TS])
+        t[o + _LAST_TS] = ts
+
+    def _bulk(self, b: int, other: int, ts: float, size: int) -> None:
+        t = self._table
+        if t[other + _B_LAST] > t[b + _B_START]:
+            t[b + _B_START] = -1.0
+        if size <= 0:
+            return
+        if t[b + _B_START] < 0 or ts - t[b + _B_LAST] > CLUMP_TIMEOUT:
+            t[b + _B_START] = t[b + _B_LAST] = ts
+            t[b + _B_PKTS_HELPER] = 1
+            t[b + _B_SIZE_HELPER] = size
+            return
+        t[b + _B_PKTS_HELPER] += 1
+        t[b + _B_SIZE_HELPER] += size
+        if t[b + _B_PKTS_HELPER] == BULK_BOUND:
+            t[b + _B_COUNT] += 1
+            t[b + _B_PKTS] += t[b + _B_PKTS_HELPER]
+            t[b + _B_SIZE] += t[b + _B_SIZE_HELPER]
+            t[b + _B_DURATION] += ts - t[b + _B_START]
+        elif t[b + _B_PKTS_HELPER] > BULK_BOUND:
+            t[b + _B_PKTS] += 1
+            t[b + _B_SIZE] += size
+            t[b + _B_DURATION] += ts - t[b + _B_LAST]
+        t[b + _B_LAST] = ts
+
+    def _finish(self, slot: int, timed_out: bool) -> None:
+        t, o = self._table, slot * _WIDTH
+        active = t[o + _END_ACTIVE] - t[o + _START_ACTIVE]
+        if active > 0:
+            _observe(t, o + _ACTIVE, active)
+        if timed_out:
+            remaining = self.flow_timeout - (t[o + _END_ACTIVE] - t[o + _FIRST_TS])
+            if remaining > 0:
+                _observe(t, o + _IDLE, remaining)
+        del self._slots[_flow_key(*self._flows[slot])]
+        self._finished.append(slot)
+
+    def expire(self, now: float) -> int:
+        """Finish flows that started more than ``flow_timeout`` before ``now`` (seconds)."""
+        if not self._slots:
+            return 0
+        slots = np.fromiter(self._slots.values(), dtype=np.intp, count=len(self._slots))
+        view = np.frombuffer(self._table, dtype=np.float64).reshape(-1, _WIDTH)
+        expired = slots[now * _US - view[slots, _FIRST_TS] > self.flow_timeout].tolist()
+        del view
+        for slot in expired:
+            self._finish(slot, timed_out=True)
+        return len(expired)
+
+    def flush(self) -> None:
+        """Finish every open flow (end of capture)."""
+        for slot in list(self._slots.values()):
+            self._finish(slot, timed_out=False)
+
+    def pop_finished(self) -> FlowBatch:
+        """Compute the features of all finished flows and release their rows."""
+        slots, self._finished = self._finished, []
+        view = np.frombuffer(self._table, dtype=np.float64).reshape(-1, _WIDTH)
+        rows = view[slots]
+        del view
+        flows = [self._flows[slot] for slot in slots]
+        for slot in slots:
+            self._flows[slot] = None
+        self._free.extend(slots)
+        return FlowBatch(features=flow_features(rows), flows=flows, start_times=rows[:, _FIRST_TS] / _US)
+
+
+def _stats(A: np.ndarray, base: int):
+    """count, sum, mean, sample std, min, max of a statistic block (0 when empty)."""
+    n = A[:, base + _N]
+    mean = A[:, base + _MEAN]
+    std = np.sqrt(np.divide(A[:, base + _M2], n - 1, out=np.zeros_like(n), where=n > 1))
+    lo = np.where(n > 0, A[:, base + _MIN], 0.0)
+    hi = np.where(n > 0, A[:, base + _MAX], 0.0)
+    return n, mean * n, mean, std, lo, hi
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    return np.divide(num, den, out=np.zeros_like(num, dtype=np.float64), where=den > 0)
+
+
+def flow_features(A: np.ndarray) -> np.ndarray:
+    """Vectorized CICFlowMeter features of flow table rows, in ``REQUEST_FIELDS`` order."""
+    f = {}
+    duration = A[:, _LAST_TS] - A[:, _FIRST_TS]
+    seconds = duration / _US
+    fwd_n, fwd_sum, fwd_mean, fwd_std, fwd_min, fwd_max = _stats(A, _FWD_LEN)
+    bwd_n, bwd_sum, bwd_mean, bwd_std, bwd_min, bwd_max = _stats(A, _BWD_LEN)
+    pkt_n, pkt_sum, pkt_mean, pkt_std, pkt_min, pkt_max = _stats(A, _PKT_LEN)
+
+    f["flow_duration"] = duration
+    f["tot_fwd_pkts"], f["tot_bwd_pkts"] = fwd_n, bwd_n
+    f["totlen_fwd_pkts"], f["totlen_bwd_pkts"] = fwd_sum, bwd_sum
+    f["fwd_pkt_len_max"], f["fwd_pkt_len_min"] = fwd_max, fwd_min
+    f["fwd_pkt_len_mean"], f["fwd_pkt_len_std"] = fwd_mean, fwd_std
+    f["bwd_pkt_len_max"], f["bwd_pkt_len_min"] = bwd_max, bwd_min
+    f["bwd_pkt_len_mean"], f["bwd_pkt_len_std"] = bwd_mean, bwd_std
+    f["flow_byts_s"] = _ratio(fwd_sum + bwd_sum, seconds)
+    f["flow_pkts_s"] = _ratio(pkt_n, seconds)
+    f["fwd_pkts_s"] = _ratio(fwd_n, seconds)
+    f["bwd_pkts_s"] = _ratio(bwd_n, seconds)
+
+    _, _, f["flow_iat_mean"], f["flow_iat_std"], f["flow_iat_min"], f["flow_iat_max"] = _stats(A, _FLOW_IAT)
+    for direction, base in (("fwd", _FWD_IAT), ("bwd", _BWD_IAT)):
+        _, total, mean, std, lo, hi = _stats(A, base)
+        f[f"{direction}_iat_tot"], f[f"{direction}_iat_mean"], f[f"{direction}_iat_std"] = total, mean, std
+        f[f"{direction}_iat_min"], f[f"{direction}_iat_max"] = lo, hi
+    for name, base in (("active", _ACTIVE), ("idle", _IDLE)):
+        _, _, f[f"{name}_mean"], f[f"{name}_std"], f[f"{name}_min"], f[f"{name}_max"] = _stats(A, base)
+
+    f["fwd_psh_flags"], f["bwd_psh_flags"] = A[:, _FWD_PSH], A[:, _BWD_PSH]
+    f["fwd_urg_flags"], f["bwd_urg_flags"] = A[:, _FWD_URG], A[:, _BWD_URG]
+    f["fwd_header_len"], f["bwd_header_len"] = A[:, _FWD_HDR], A[:, _BWD_HDR]
+
+    f["pkt_len_min"], f["pkt_len_max"], f["pkt_len_mean"] = pkt_min, pkt_max, pkt_mean
+    f["pkt_len_std"], f["pkt_len_var"] = pkt_std, pkt_std ** 2
+    for i, name in enumerate(("fin_flag_cnt", "syn_flag_cnt", "rst_flag_cnt", "psh_flag_cnt",
+                              "ack_flag_cnt", "urg_flag_cnt", "ece_flag_cnt", "cwr_flag_count")):
+        f[name] = A[:, _FLAG_COUNTS + i]
+
+    f["down_up_ratio"] = np.floor(_ratio(bwd_n, fwd_n))
+    f["pkt_size_avg"] = _ratio(pkt_sum, pkt_n)
+    f["fwd_seg_size_avg"], f["bwd_seg_size_avg"] = fwd_mean, bwd_mean
+    for direction, b in (("fwd", _FWD_BULK), ("bwd", _BWD_BULK)):
+        count = A[:, b + _B_COUNT]
+        f[f"{direction}_byts_b_avg"] = _ratio(A[:, b + _B_SIZE], count)
+        f[f"{direction}_pkts_b_avg"] = _ratio(A[:, b + _B_PKTS], count)
+        f[f"{direction}_blk_rate_avg"] = _ratio(A[:, b + _B_SIZE], A[:, b + _B_DURATION] / _US)
+
+    subflows = A[:, _SF_COUNT]
+    f["subflow_fwd_pkts"], f["subflow_fwd_byts"] = np.floor(fwd_n / subflows), np.floor(fwd_sum / subflows)
+    f["subflow_bwd_pkts"], f["subflow_bwd_byts"] = np.floor(bwd_n / subflows), np.floor(bwd_sum / subflows)
+    f["init_fwd_win_byts"], f["init_bwd_win_byts"] = A[:, _INIT_FWD_WIN], A[:, _INIT_BWD_WIN]
+    f["fwd_act_data_pkts"] = A[:, _FWD_ACT_DATA]
+    f["fwd_seg_size_min"] = np.where(fwd_n > 0, A[:, _FWD_SEG_MIN], 0.0)
+
+    return np.column_stack([f[name] for name in REQUEST_FIELDS]).astype(np.float32)
+
+
+def packet_fields(pkt) -> Optional[tuple]:
+    """``FlowTable.add`` arguments for a scapy packet, or None if not TCP/UDP over IP."""
+    from scapy.layers.inet import IP, TCP as TCPLayer, UDP as UDPLayer
+    from scapy.layers.inet6 import IPv6
+
+    if IP in pkt:
+        ip = pkt[IP]
+        ip_payload = ip.len - ip.ihl * 4
+    elif IPv6 in pkt:
+        ip = pkt[IPv6]
+        ip_payload = ip.plen
+    else:
+        return None
+    if TCPLayer in pkt:
+        l4 = pkt[TCPLayer]
+        proto, header, flags, window = TCP, l4.dataofs * 4, int(l4.flags), l4.window
+    elif UDPLayer in pkt:
+        l4 = pkt[UDPLayer]
+        proto, header, flags, window = UDP, 8, 0, -1
+    else:
+        return None
+    return (float(pkt.time), ip.src, l4.sport, ip.dst, l4.dport, proto,
+            max(ip_payload - header, 0), header, flags, window)
+
+
+def iter_pcap(path: str, batch_size: int = 4096, table: Optional[FlowTable] = None) -> Iterator[FlowBatch]:
+    """Yield batches of finished flows read from a pcap/pcapng file."""
+    from scapy.utils import PcapReader
+
+    table = table or FlowTable()
+    with PcapReader(path) as reader:
+        for pkt in reader:
+            fields = packet_fields(pkt)
+            if fields is None:
+                continue
+            table.add(*fields)
+            if table.pending >= batch_size:
+                yield table.pop_finished()
+    table.flush()
+    if table.pending:
+        yield table.pop_finished()
+
+
+class FlowMeter:
+    """Live capture on one interface, scoring finished flows every ``flush_interval``."""
+
+    def __init__(self, interface: str, bpf_filter: str = "ip or ip6", flush_interval: float = 1.0,
+                 flow_timeout: float = 120.0, activity_timeout: float = 5.0,
+                 lock_path: Optional[str] = None):
+        self.interface = interface
+        self.bpf_filter = bpf_filter
+        self.flush_interval = flush_interval
+        self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), "mlids-flow-meter.lock")
+        self.table = FlowTable(flow_timeout, activity_timeout)
+        self.flows_scored = 0
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._sniffer = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["FlowMeter"]:
+        interface = os.getenv("FLOW_METER_INTERFACE")
+        if not interface:
+            return None
+        return cls(
+            interface,
+            bpf_filter=os.getenv("FLOW_METER_FILTER", "ip or ip6"),
+            flush_interval=float(os.getenv("FLOW_METER_FLUSH_INTERVAL", "1.0")),
+            flow_timeout=float(os.getenv("FLOW_METER_FLOW_TIMEOUT", "120")),
+            activity_timeout=float(os.getenv("FLOW_METER_ACTIVITY_TIMEOUT", "5")),
+        )
+
+    def _claim(self) -> bool:
+        """Only one worker per host captures; the others skip."""
+        import fcntl
+
+        self._lock_file = open(self.lock_path, "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+
+    def _on_packet(self, pkt) -> None:
+        fields = packet_fields(pkt)
+        if fields is not None:
+            with self._lock:
+                self.table.add(*fields)
+
+    async def start(self) -> bool:
+        """Start capturing; returns False if another worker already captures."""
+        if not self._claim():
+            logger.info("Flow meter runs in another worker")
+            return False
+        from scapy.sendrecv import AsyncSniffer
+
+        self._sniffer = AsyncSniffer(iface=self.interface, filter=self.bpf_filter,
+                                     prn=self._on_packet, store=False)
+        self._sniffer.start()
+        self._task = asyncio.create_task(self._score_loop())
+        logger.info(f"Flow meter capturing on {self.interface}")
+        return True
+
+    async def stop(self):
+        if self._sniffer is not None:
+            self._sniffer.stop()
+            self._sniffer = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            with self._lock:
+                self.table.flush()
+            await self.score_finished()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def _score_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                with self._lock:
+                    self.table.expire(time.time())
+                await self.score_finished()
+            except Exception as e:
+                logger.error(f"Flow meter scoring failed: {e}")
+
+    async def score_finished(self) -> int:
+        """Score the flows finished so far; they wait while no model is loaded."""
+        current = model_manager.current
+        if current is None or current.model is None or current.features is None:
+            return 0
+        with self._lock:
+            if not self.table.pending:
+                return 0
+            batch = self.table.pop_finished()
+        predictions = await asyncio.to_thread(predict_matrix, current, batch.features, REQUEST_FIELDS, "flow_meter")
+        await record_attacks(predictions, batch.features, REQUEST_FIELDS, batch.src_ips, batch.dst_ips)
+        self.flows_scored += len(batch)
+        return len(batch)
@@ -0,0 +1,37 @@
+"""Gunicorn configuration for running the inference server with several workers.
+
+Used by start.sh when WEB_CONCURRENCY > 1:
+
+    gunicorn -c src/inference_server/gunicorn_conf.py src.inference_server.main:app
+
+PROMETHEUS_MULTIPROC_DIR must be set in the environment so every worker
+writes its metrics to the shared directory (see metrics.py).
+"""
+
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Model loading from MLflow can take a while on first start
+timeout = int(os.getenv("WORKER_TIMEOUT", "300"))
+
+
+def on_starting(server):
+    """Start from an empty metrics directory so stale worker files are not aggregated."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        server.log.warning("PROMETHEUS_MULTIPROC_DIR not set; /metrics will only show one worker")
+        return
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Remove the exited worker's live gauge samples."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
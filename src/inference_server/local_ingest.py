@@ -0,0 +1,284 @@
+"""Binary flow ingestion over a Unix domain socket for co-located sensors.
+
+A flow meter on the same host does not need HTTP and JSON: with
+``LOCAL_INGEST_SOCKET`` set the server listens on that Unix socket for
+frames of fixed-layout float32 records and scores each frame as one batch.
+
+Protocol (all little-endian), one response frame per request frame, in order:
+
+    request   header  magic b"MLIF", u16 version (1), u16 feature count (76),
+                      u32 record count
+              record  16 bytes source IP, 16 bytes destination IP (IPv6 or
+                      IPv4-mapped, all zero for unknown), then the features as
+                      float32 in ``REQUEST_FIELDS`` (feature_mapping.json) order
+    response  header  magic b"MLIR", u16 status, u32 record count
+              body    one int32 prediction per record (status OK only)
+
+Status is ``STATUS_OK``, ``STATUS_UNAVAILABLE`` (no model loaded yet; the
+frame was not scored, retry later) or ``STATUS_BAD_FRAME`` (after which
+the server closes the connection). ``LocalIngestClient`` implements the
+producer side.
+
+The records are mapped onto a NumPy array without copying and scored off
+the event loop through ``batch_scoring``; attack rows raise alerts as on
+``/predict``. With several workers one serves the socket: the one holding
+an ``flock`` on ``<socket>.lock``, which is also the only one that creates
+or removes the socket file. The others retry the lock every
+``LOCAL_INGEST_CLAIM_INTERVAL`` seconds, so when the serving worker exits
+(or is recycled) a sibling takes over; producers reconnect in between.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import struct
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .batch_scoring import REQUEST_FIELDS, predict_matrix, record_attacks
+from .model_manager import model_manager
+
+logger = logging.getLogger(__name__)
+
+REQUEST_HEADER = struct.Struct("<4sHHI")
+RESPONSE_HEADER = struct.Struct("<4sHI")
+REQUEST_MAGIC = b"MLIF"
+RESPONSE_MAGIC = b"MLIR"
+VERSION = 1
+
+STATUS_OK = 0
+STATUS_UNAVAILABLE = 1
+STATUS_BAD_FRAME = 2
+
+RECORD_DTYPE = np.dtype([
+    ("src_ip", "V16"),
+    ("dst_ip", "V16"),
+    ("features", "<f4", (len(REQUEST_FIELDS),)),
+])
+_ZERO_IP = bytes(16)
+
+
+def _ip_to_bytes(ip: Optional[str]) -> bytes:
+    if not ip:
+        return _ZERO_IP
+    addr = ipaddress.ip_address(ip)
+    if addr.version == 4:
+        addr = ipaddress.IPv6Address(f"::ffff:{addr}")
+    return addr.packed
+
+
+def _ip_from_bytes(raw: bytes) -> Optional[str]:
+    if raw == _ZERO_IP:
+        return None
+    addr = ipaddress.IPv6Address(raw)
+    return str(addr.ipv4_mapped or addr)
+
+
+def encode_frame(features: np.ndarray, src_ips: Optional[Sequence[Optional[str]]] = None,
+                 dst_ips: Optional[Sequence[Optional[str]]] = None) -> bytes:
+    """Serialize a ``(rows, 76)`` feature matrix as one request frame."""
+    records = np.zeros(len(features), dtype=RECORD_DTYPE)
+    records["features"] = features
+    if src_ips is not None:
+        records["src_ip"] = [_ip_to_bytes(ip) for ip in src_ips]
+    if dst_ips is not None:
+        records["dst_ip"] = [_ip_to_bytes(ip) for ip in dst_ips]
+    header = REQUEST_HEADER.pack(REQUEST_MAGIC, VERSION, len(REQUEST_FIELDS), len(records))
+    return header + records.tobytes()
+
+
+class LocalIngestServer:
+    """Serves the binary ingest protocol on a Unix domain socket."""
+
+    def __init__(self, path: str, max_records: int = 65536, mode: int = 0o660,
+                 claim_interval: float = 5.0, lock_path: Optional[str] = None):
+        self.path = path
+        self.max_records = max_records
+        self.mode = mode
+        self.claim_interval = claim_interval
+        self.lock_path = lock_path or f"{path}.lock"
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._lock_file = None
+        self._claim_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["LocalIngestServer"]:
+        path = os.getenv("LOCAL_INGEST_SOCKET")
+        if not path:
+            return None
+        return cls(
+            path,
+            max_records=int(os.getenv("LOCAL_INGEST_MAX_RECORDS", "65536")),
+            mode=int(os.getenv("LOCAL_INGEST_SOCKET_MODE", "660"), 8),
+            claim_interval=float(os.getenv("LOCAL_INGEST_CLAIM_INTERVAL", "5")),
+        )
+
+    def _claim(self) -> bool:
+        """Only one worker per socket serves it; the others skip."""
+        import fcntl
+
+        self._lock_file = open(self.lock_path, "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+
+    def _release(self) -> None:
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def _bind(self) -> None:
+        # Holding the lock: a socket file left at the path belongs to a worker that exited
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, self.mode)
+        logger.info(f"Local ingest listening on {self.path}")
+
+    async def start(self) -> bool:
+        """Serve the socket; returns False if another worker serves it.
+
+        A worker that does not get the socket keeps retrying in the
+        background and takes it over once the serving worker has exited.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self._claim():
+            try:
+                await self._bind()
+            except BaseException:
+                self._release()
+                raise
+            return True
+        logger.info(f"Local ingest socket {self.path} is served by another worker")
+        self._claim_task = asyncio.create_task(self._claim_loop())
+        return False
+
+    async def _claim_loop(self):
+        while True:
+            await asyncio.sleep(self.claim_interval)
+            if not self._claim():
+                continue
+            try:
+                await self._bind()
+            except Exception as e:
+                logger.error(f"Local ingest could not take over {self.path}: {e}")
+                self._release()
+                continue
+            logger.info(f"Local ingest took over {self.path}")
+            return
+
+    async def stop(self):
+        if self._claim_task is not None:
+            self._claim_task.cancel()
+            try:
+                await self._claim_task
+            except asyncio.CancelledError:
+                pass
+            self._claim_task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            # Only the lock holder removes the path; a sibling may bind it right after
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        self._release()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(REQUEST_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                magic, version, n_features, n_records = REQUEST_HEADER.unpack(header)
+                if (magic != REQUEST_MAGIC or version != VERSION
+                        or n_features != len(REQUEST_FIELDS) or n_records > self.max_records):
+                    logger.warning(f"Local ingest: bad frame header {magic!r} v{version} "
+                                   f"{n_features} features {n_records} records, closing")
+                    writer.write(RESPONSE_HEADER.pack(RESPONSE_MAGIC, STATUS_BAD_FRAME, 0))
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(n_records * RECORD_DTYPE.itemsize)
+                writer.write(await self._score(body, n_records))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Local ingest connection error: {e}")
+        finally:
+            writer.close()
+
+    async def _score(self, body: bytes, n_records: int) -> bytes:
+        current = model_manager.current
+        if current is None or current.model is None or current.features is None:
+            return RESPONSE_HEADER.pack(RESPONSE_MAGIC, STATUS_UNAVAILABLE, 0)
+        if n_records == 0:
+            return RESPONSE_HEADER.pack(RESPONSE_MAGIC, STATUS_OK, 0)
+
+        records = np.frombuffer(body, dtype=RECORD_DTYPE)
+        # The only copy: a contiguous, writable matrix for validation
+        X = np.array(records["features"], dtype=np.float32)
+        predictions = await asyncio.to_thread(predict_matrix, current, X, REQUEST_FIELDS, "local_ingest")
+
+        if np.any(predictions != 0):
+            attack_rows = np.flatnonzero(predictions != 0)
+            src_ips = [None] * n_records
+            dst_ips = [None] * n_records
+            for i in attack_rows:
+                src_ips[i] = _ip_from_bytes(records["src_ip"][i].tobytes())
+                dst_ips[i] = _ip_from_bytes(records["dst_ip"][i].tobytes())
+            await record_attacks(predictions, X, REQUEST_FIELDS, src_ips, dst_ips)
+
+        labels = np.asarray(predictions).astype("<i4")
+        return RESPONSE_HEADER.pack(RESPONSE_MAGIC, STATUS_OK, n_records) + labels.tobytes()
+
+
+class LocalIngestClient:
+    """Blocking producer-side client for ``LocalIngestServer``."""
+
+    def __init__(self, path: str, timeout: Optional[float] = 30.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+
+    def _recv_exactly(self, n: int) -> bytes:
+        chunks = []
+        while n:
+            chunk = self.sock.recv(n)
+            if not chunk:
+                raise ConnectionError("local ingest server closed the connection")
+            chunks.append(chunk)
+            n -= len(chunk)
+        return b"".join(chunks)
+
+    def score(self, features: np.ndarray, src_ips: Optional[Sequence[Optional[str]]] = None,
+              dst_ips: Optional[Sequence[Optional[str]]] = None) -> Optional[np.ndarray]:
+        """Score a batch; returns the predictions, or None if no model is loaded yet."""
+        self.sock.sendall(encode_frame(features, src_ips, dst_ips))
+        magic, status, n_records = RESPONSE_HEADER.unpack(self._recv_exactly(RESPONSE_HEADER.size))
+        if magic != RESPONSE_MAGIC or status == STATUS_BAD_FRAME:
+            raise ValueError("local ingest server rejected the frame")
+        if status == STATUS_UNAVAILABLE:
+            return None
+        return np.frombuffer(self._recv_exactly(4 * n_records), dtype="<i4")
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,23 +1,34 @@
+import asyncio
 import time as _time
+from datetime import datetime as _dt
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
-import pandas as pd
+from fastapi.responses import FileResponse, JSONResponse, Response
 import os
 import json
-import numpy as np
 import logging
 from dotenv import load_dotenv
+from pydantic import ValidationError
+from opentelemetry import trace
 
 from .schemas import PredictionRequest
+from .arrow_ipc import ARROW_STREAM, is_arrow, wants_json
 from .database import init_db, close_db, health_check as db_health_check, is_db_available, get_db
 from .alert_service import alert_service
-from .auth import APIKeyMiddleware
-from .metrics import metrics_response, PREDICTIONS_TOTAL, PREDICTION_LATENCY, MODEL_LOADED
-from .routers import alerts, incidents, dashboard
+from .model_manager import FEATURE_MAPPING, model_manager
+from .prediction_cache import prediction_cache
+from .auth import APIKeyMiddleware, install_reload_signal
+from .rate_limit import RateLimitMiddleware
+from .overload import LoadLevel, OverloadProtectionMiddleware, overload_guard
+from .metrics import (
+    metrics_response, RequestDurationMiddleware,
+    PREDICTIONS_TOTAL, PREDICTION_LATENCY,
+)
+from .routers import alerts, incidents, dashboard, admin, jobs
+from .tracing import configure_tracing, shutdown_tracing, traced, traced_stage
 from sqlalchemy.ext.asyncio import AsyncSession
-import yaml
 
 # FastAPI app with OpenAPI configuration
 app = FastAPI(
@@ -44,7 +55,13 @@ app = FastAPI(
     openapi_url="/openapi.json"
 )
 
+# Starlette runs the last-added middleware first: authenticate, rate limit,
+# then adaptive overload protection
+app.add_middleware(OverloadProtectionMiddleware)
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(APIKeyMiddleware)
+# Outermost, so request durations include time spent in the other middleware
+app.add_middleware(RequestDurationMiddleware)
 
 
 
@@ -57,6 +74,8 @@ load_dotenv()
 app.include_router(alerts.router)
 app.include_router(incidents.router)
 app.include_router(dashboard.router)
+app.include_router(admin.router)
+app.include_router(jobs.router)
 
 # Mount static files for dashboard
 static_dir = os.path.join(os.path.dirname(__file__), "static")
@@ -98,6 +117,30 @@ async def get_openapi_yaml():
         raise HTTPException(status_code=404, detail="OpenAPI YAML file not found")
 
 
+@app.get("/health/live")
+async def health_live():
+    """
+    Liveness probe: the process is up and the event loop is responsive.
+
+    Deliberately independent of the model and database so orchestrators
+    do not restart the server while a model is still loading.
+    """
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """
+    Readiness probe: a model is loaded and warmed up.
+
+    :return: 200 when ready to take traffic, 503 otherwise.
+    """
+    body = {"ready": model_manager.ready, "model_state": model_manager.state}
+    if not model_manager.ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
 @app.get("/health")
 async def health():
     """
@@ -116,139 +159,181 @@ async def health():
     return {
         "status": overall_status,
         "model_initialized": model_manager.initialized,
+        "model_state": model_manager.state,
         "model_source": model_manager.model_source,
         "model_loaded_at": model_manager.model_loaded_at,
+        "model_version": model_manager.model_version,
+        "model_backend": model_manager.model_backend,
+        "model_ready": model_manager.ready,
+        "model_warmup": model_manager.warmup,
+        "model_cascade": model_manager.cascade_stats,
+        "prediction_cache": prediction_cache.stats() if prediction_cache.enabled else None,
         "database": db_status
     }
 
-import joblib
-import mlflow
-from mlflow.exceptions import MlflowException
-from datetime import datetime as _dt
+async def _serving_model():
+    """The serving model snapshot, loading it on first use (503 while a load is in progress)."""
+    if not model_manager.initialized:
+        if model_manager.loading:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Model is loading ({model_manager.state})",
+                headers={"Retry-After": "5"},
+            )
+        await asyncio.to_thread(model_manager.load_model)
+    return model_manager.current
 
-class ModelManager:
-    MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", "/app/model_cache")
-    LOCAL_MODEL_PATH = os.path.join(MODEL_CACHE_DIR, "model.joblib")
-    LOCAL_META_PATH = os.path.join(MODEL_CACHE_DIR, "model_meta.json")
 
-    def __init__(self):
-        self.model = None
-        self.features = None
-        self.initialized = False
-        self.model_source: str = "none"
-        self.model_loaded_at: str | None = None
+async def _predict_arrow(request: Request):
+    """Score an Arrow IPC batch of flows in one model call."""
+    from .arrow_ipc import read_batch, write_predictions
+    from .batch_scoring import record_attacks, score_matrix
 
-    def _save_to_cache(self):
-        """Persist the current model and metadata to local disk."""
-        try:
-            os.makedirs(self.MODEL_CACHE_DIR, exist_ok=True)
-            joblib.dump(self.model, self.LOCAL_MODEL_PATH)
-            meta = {
-                "features": list(self.features),
-                "timestamp": _dt.utcnow().isoformat(),
-                "source": "mlflow",
-            }
-            with open(self.LOCAL_META_PATH, "w") as f:
-                json.dump(meta, f)
-            logger.info(f"Model cached locally at {self.MODEL_CACHE_DIR}")
-        except Exception as e:
-            logger.warning(f"Failed to cache model locally: {e}")
-
-    def _load_from_cache(self) -> bool:
-        """Try loading a locally cached model. Returns True on success."""
-        try:
-            if not os.path.exists(self.LOCAL_MODEL_PATH) or not os.path.exists(self.LOCAL_META_PATH):
-                return False
-            self.model = joblib.load(self.LOCAL_MODEL_PATH)
-            with open(self.LOCAL_META_PATH) as f:
-                meta = json.load(f)
-            self.features = meta["features"]
-            self.model_source = "cache"
-            self.model_loaded_at = _dt.utcnow().isoformat()
-            self.initialized = True
-            MODEL_LOADED.set(1)
-            logger.info("Model loaded from local cache")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to load model from cache: {e}")
-            return False
-
-    def load_model(self):
-        """Load the ML model from MLflow, falling back to local cache."""
-        if self.initialized:
-            return
-
-        tracking_uri = os.environ.get("MLFLOW_TRACKING_URI")
-        model_name = os.environ.get("MLFLOW_MODEL_NAME", "models:/ML_IDS_Model_v1/Production")
-
-        # Try MLflow first
-        if tracking_uri:
-            mlflow.set_tracking_uri(tracking_uri)
-            try:
-                self.model = mlflow.sklearn.load_model(model_name)
-                # Some models might not have feature_names_in_
-                if hasattr(self.model, "feature_names_in_"):
-                    self.features = self.model.feature_names_in_
-                else:
-                    logger.warning("Model does not have feature_names_in_. Feature mapping might be affected.")
-                    self.features = None
-                
-                self.initialized = True
-                self.model_source = "mlflow"
-                self.model_loaded_at = _dt.utcnow().isoformat()
-                logger.info("Model loaded successfully from MLflow.")
-                MODEL_LOADED.set(1)
-                self._save_to_cache()
-                return
-            except (MlflowException, AttributeError, Exception) as e:
-                logger.warning(f"MLflow model load failed: {e}. Trying local cache...")
-
-        # Fallback to local cache
-        if self._load_from_cache():
-            return
-
-        raise HTTPException(status_code=503, detail="Model not available: MLflow unreachable and no local cache")
-
-model_manager = ModelManager()
-
-# Load feature mapping from JSON file
-try:
-    with open(os.path.join(os.path.dirname(__file__), "feature_mapping.json")) as f:
-        FEATURE_MAPPING = json.load(f)
-except Exception as e:
-    logger.error(f"Failed to load feature mapping: {e}")
-    # Fallback or exit? For now, let's raise to fail fast as this is critical
-    raise RuntimeError(f"Failed to load feature mapping: {e}")
-
-@app.post("/predict")
-async def predict(features: PredictionRequest, db: AsyncSession = Depends(get_db)):
+    with traced_stage("parse"):
+        X, fields, src_ips, dst_ips = read_batch(await request.body())
+
+    if not len(X):
+        import numpy as np
+
+        # An empty batch gets an empty answer without touching the model
+        predictions, warnings = np.zeros(0, dtype=np.int64), None
+    else:
+        current = await _serving_model()
+        with traced_stage("inference"):
+            predictions, warnings = await asyncio.to_thread(score_matrix, current, X, fields, "arrow")
+        await record_attacks(predictions, X, fields, src_ips or [None] * len(predictions), dst_ips)
+    trace.get_current_span().set_attribute("mlids.batch_size", len(predictions))
+
+    if wants_json(request.headers.get("accept")):
+        result = {"prediction": predictions.tolist()}
+        if warnings:
+            result["validation_warnings"] = warnings.to_lists()
+        return result
+    return Response(content=write_predictions(predictions, warnings), media_type=ARROW_STREAM)
+
+
+@app.post(
+    "/predict/stream",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": PredictionRequest.model_json_schema(by_alias=True)}},
+        }
+    },
+)
+async def predict_stream(request: Request):
+    """
+    Score a stream of newline-delimited JSON flows over one connection.
+
+    Results are streamed back as NDJSON, one line per flow in input order;
+    see ``ndjson_stream``.
+    """
+    from .ndjson_stream import NDJSON, NDJSONStreamResponse, prediction_streamer
+
+    await _serving_model()
+    return NDJSONStreamResponse(prediction_streamer.stream(request), media_type=NDJSON)
+
+
+@app.post(
+    "/predict",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": PredictionRequest.model_json_schema(by_alias=True)},
+                ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+@traced("predict")
+async def predict(request: Request, db: AsyncSession = Depends(get_db)):
     """
     Make a prediction with the model.
+
+    The body is parsed here rather than by FastAPI so that reading and
+    validating it can be timed as its own stage. An Arrow IPC stream body
+    (``Content-Type: application/vnd.apache.arrow.stream``) is a batch of
+    flows, scored together; see ``arrow_ipc``.
     """
-    # Convert Pydantic model to dict, using aliases (snake_case)
-    features_dict = features.model_dump(by_alias=True)
-    logger.info(f"Predict endpoint called with {len(features_dict)} features")
-    
-    if not model_manager.initialized:
-        model_manager.load_model()
+    if is_arrow(request.headers.get("content-type")):
+        return await _predict_arrow(request)
+
+    # One snapshot per request: a concurrent hot-swap does not affect this request,
+    # and the body is parsed for exactly the features the snapshot's model uses
+    current = model_manager.current
+    with traced_stage("parse"):
+        body = await request.body()
+        try:
+            # Reduced-feature models only need (and only validate) their own columns.
+            # Before any model is loaded every field is parsed, so whichever loads is covered.
+            request_model = current.request_model if current is not None else PredictionRequest
+            features = request_model.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)],
+                body=body,
+            )
+
+    load_level = getattr(request.state, "load_level", LoadLevel.NORMAL)
+    admitted = overload_guard.admit_flow(load_level, features.src_ip)
+
+    if current is None:
+        current = await _serving_model()
+    if not admitted and not current.cascade:
+        raise HTTPException(
+            status_code=503,
+            detail="Server overloaded, flow not scored",
+            headers={"Retry-After": "1"},
+        )
     
     try:
-        # Map features and fill missing ones with 0
-        mapped_features = {FEATURE_MAPPING.get(k, k): v for k, v in features_dict.items()}
-        
-        # Create input vector based on model features, defaulting to 0 for missing or None values
-        input_vector = [mapped_features.get(feat, 0) or 0 for feat in model_manager.features]
-        
-        # Create input DataFrame with feature names to avoid warning
-        input_df = pd.DataFrame([input_vector], columns=model_manager.features)
+        with traced_stage("feature_mapping"):
+            # Convert Pydantic model to dict, using aliases (snake_case)
+            features_dict = features.model_dump(by_alias=True)
+            # Map features and fill missing ones with 0
+            mapped_features = {FEATURE_MAPPING.get(k, k): v for k, v in features_dict.items()}
+        logger.info(f"Predict endpoint called with {len(features_dict)} features")
 
-        _pred_start = _time.monotonic()
-        prediction = model_manager.model.predict(input_df)
-        PREDICTION_LATENCY.observe(_time.monotonic() - _pred_start)
+        # Create input vector based on model features, defaulting to 0 for missing or None values
+        input_vector = [mapped_features.get(feat, 0) or 0 for feat in current.features]
+
+        # A shed flow only gets the cascade screen; the full model sees it if the screen flags it
+        if not admitted:
+            import pandas as pd
+
+            if not current.model.suspicious(pd.DataFrame([input_vector], columns=current.features))[0]:
+                overload_guard.record_screened(escalated=0, cleared=1)
+                PREDICTIONS_TOTAL.labels(result="benign").inc()
+                return {"prediction": [current.model.benign_label]}
+            overload_guard.record_screened(escalated=1, cleared=0)
+
+        # Repeated identical flows (scans, floods) reuse the serving model's earlier answer
+        prediction = None
+        if prediction_cache.enabled:
+            cache_key = prediction_cache.key(input_vector)
+            prediction = prediction_cache.get(current, cache_key)
+
+        if prediction is None:
+            with traced_stage("frame_build"):
+                # Create input DataFrame with feature names to avoid warning
+                import pandas as pd
+
+                input_df = pd.DataFrame([input_vector], columns=current.features)
+
+            _pred_start = _time.monotonic()
+            with traced_stage("inference"):
+                prediction = current.model.predict(input_df)
+            PREDICTION_LATENCY.observe(_time.monotonic() - _pred_start)
+            if prediction_cache.enabled:
+                prediction_cache.put(current, cache_key, prediction)
 
         # Record prediction result
         pred_label = "attack" if prediction[0] != 0 else "benign"
         PREDICTIONS_TOTAL.labels(result=pred_label).inc()
+        span = trace.get_current_span()
+        span.set_attribute("mlids.prediction", str(prediction[0]))
+        span.set_attribute("mlids.src_ip", features.src_ip or "unknown")
         
         # Log predictions with error handling
         try:
@@ -260,6 +345,7 @@ async def predict(features: PredictionRequest, db: AsyncSession = Depends(get_db
                 # Log attack to database and file
                 attack_type = str(prediction[0])
                 src_ip = features.src_ip or "unknown"
+                overload_guard.mark_attacker(features.src_ip)
 
                 # Create alert in database
                 if db is not None:
@@ -275,16 +361,18 @@ async def predict(features: PredictionRequest, db: AsyncSession = Depends(get_db
                         logger.warning(f"Failed to create alert in database: {e}")
 
                 # Log to file
-                log_file = os.path.join(log_dir, "positive_predictions.log")
-                with open(log_file, "a") as f:
-                    f.write(f"Timestamp: {pd.Timestamp.now()}, Prediction: {prediction[0]}, SrcIP: {features.src_ip}\n")
+                with traced_stage("file_logging"):
+                    log_file = os.path.join(log_dir, "positive_predictions.log")
+                    with open(log_file, "a") as f:
+                        f.write(f"Timestamp: {_dt.now()}, Prediction: {prediction[0]}, SrcIP: {features.src_ip}\n")
             
             # Log negative predictions if enabled
             log_negative = os.environ.get("LOG_NEGATIVE_PREDICTIONS", "false").lower() == "true"
-            if prediction[0] == 0 and log_negative:
-                log_file = os.path.join(log_dir, "negative_predictions.log")
-                with open(log_file, "a") as f:
-                    f.write(f"Timestamp: {pd.Timestamp.now()}, Prediction: {prediction[0]}\n")
+            if prediction[0] == 0 and log_negative and overload_guard.should_log_negative(load_level):
+                with traced_stage("file_logging"):
+                    log_file = os.path.join(log_dir, "negative_predictions.log")
+                    with open(log_file, "a") as f:
+                        f.write(f"Timestamp: {_dt.now()}, Prediction: {prediction[0]}\n")
         except IOError as e:
             logger.warning(f"Failed to write prediction log: {e}")
         
@@ -301,6 +389,10 @@ async def predict(features: PredictionRequest, db: AsyncSession = Depends(get_db
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
+    # Allow `kill -HUP` to pick up rotated API keys without a restart
+    install_reload_signal()
+    configure_tracing()
+
     # Initialize database
     logger.info("Initializing database...")
     db_success = await init_db()
@@ -310,15 +402,42 @@ async def startup_event():
     else:
         logger.warning("Database initialization failed, running with limited functionality")
     
-    # Load ML model
-    try:
-        model_manager.load_model()
-    except Exception as e:
-        logger.warning(f"Model not available at startup: {e}")
+    # Fail scoring jobs left queued or running by a worker that exited
+    from .scoring_jobs import scoring_jobs
+    recovered = await asyncio.to_thread(scoring_jobs.recover)
+    if recovered:
+        logger.warning(f"Marked {recovered} interrupted scoring jobs as failed")
+
+    # Load ML model in the background so /health answers straight away
+    model_manager.start_background_load()
+    model_manager.start_watcher()
+
+    # Binary ingestion for co-located flow meters (numpy only loads if enabled)
+    app.state.local_ingest = None
+    if os.getenv("LOCAL_INGEST_SOCKET"):
+        from .local_ingest import LocalIngestServer
+        server = LocalIngestServer.from_env()
+        # A worker that does not get the socket stands by to take it over
+        await server.start()
+        app.state.local_ingest = server
+
+    # In-process flow capture replacing the external cicflowmeter sensor
+    app.state.flow_meter = None
+    if os.getenv("FLOW_METER_INTERFACE"):
+        from .flow_meter import FlowMeter
+        meter = FlowMeter.from_env()
+        if await meter.start():
+            app.state.flow_meter = meter
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down...")
+    model_manager.stop_watcher()
+    if getattr(app.state, "flow_meter", None) is not None:
+        await app.state.flow_meter.stop()
+    if getattr(app.state, "local_ingest", None) is not None:
+        await app.state.local_ingest.stop()
     await close_db()
+    shutdown_tracing()
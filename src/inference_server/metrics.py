@@ -1,7 +1,21 @@
-"""Prometheus metrics for ML-IDS inference server."""
+"""Prometheus metrics for ML-IDS inference server.
 
-from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+With several worker processes, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty
+directory shared by all workers *before* they start: each worker then writes
+its samples to mmap files there and ``/metrics`` aggregates all of them.
+Gauges declare how per-worker values are combined (``multiprocess_mode``);
+the mode is ignored in single-process mode.
+"""
+
+import os
+import time
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, Gauge, generate_latest, multiprocess,
+    CONTENT_TYPE_LATEST,
+)
 from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Counters
 PREDICTIONS_TOTAL = Counter(
@@ -10,12 +24,54 @@ PREDICTIONS_TOTAL = Counter(
     ["result"],
 )
 
+BATCH_FLOWS_TOTAL = Counter(
+    "mlids_batch_flows_total",
+    "Flows scored through batch ingestion paths",
+    ["source"],
+)
+
 ALERTS_CREATED_TOTAL = Counter(
     "mlids_alerts_created_total",
     "Total alerts created",
     ["severity"],
 )
 
+RATE_LIMIT_ADMITTED_TOTAL = Counter(
+    "mlids_rate_limit_admitted_total",
+    "Requests admitted by the per-key rate limiter",
+    ["api_key"],
+)
+
+RATE_LIMIT_REJECTED_TOTAL = Counter(
+    "mlids_rate_limit_rejected_total",
+    "Requests rejected by the per-key rate limiter",
+    ["api_key", "reason"],
+)
+
+OVERLOAD_SHED_TOTAL = Counter(
+    "mlids_overload_shed_total",
+    "Work shed by overload protection",
+    ["action"],
+)
+
+MODEL_SWAPS_TOTAL = Counter(
+    "mlids_model_swaps_total",
+    "Model hot-swap attempts by the background watcher",
+    ["result"],
+)
+
+CASCADE_FLOWS_TOTAL = Counter(
+    "mlids_cascade_flows_total",
+    "Flows decided by each cascade stage (screen: passed as benign, full: escalated)",
+    ["stage"],
+)
+
+PREDICTION_CACHE_REQUESTS_TOTAL = Counter(
+    "mlids_prediction_cache_requests_total",
+    "Prediction cache lookups",
+    ["result"],
+)
+
 # Histograms
 PREDICTION_LATENCY = Histogram(
     "mlids_prediction_latency_seconds",
@@ -25,23 +81,130 @@ PREDICTION_LATENCY = Histogram(
 REQUEST_DURATION = Histogram(
     "mlids_request_duration_seconds",
     "Total HTTP request duration",
+    ["method", "route", "status"],
+)
+
+PREDICT_STAGE_LATENCY = Histogram(
+    "mlids_predict_stage_seconds",
+    "Time spent in each stage of the prediction and alerting pipeline",
+    ["stage"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+             0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
 )
 
-# Gauges
+CASCADE_STAGE_SECONDS = Histogram(
+    "mlids_cascade_stage_seconds",
+    "Time spent in each cascade stage per predict call",
+    ["stage"],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+             0.05, 0.1, 0.25),
+)
+
+# Gauges. In multiprocess mode: the model counts as loaded only if every live
+# worker has it, connections/in-flight/limits add up, the level is the worst.
 MODEL_LOADED = Gauge(
     "mlids_model_loaded",
     "Whether the ML model is currently loaded (1=yes, 0=no)",
+    multiprocess_mode="livemin",
+)
+
+MODEL_WARMUP_SECONDS = Gauge(
+    "mlids_model_warmup_seconds",
+    "Duration of the synthetic warm-up run after the last model load",
+    multiprocess_mode="livemax",
 )
 
 ACTIVE_WS_CONNECTIONS = Gauge(
     "mlids_active_websocket_connections",
     "Number of active WebSocket connections",
+    multiprocess_mode="livesum",
+)
+
+OVERLOAD_CONCURRENCY_LIMIT = Gauge(
+    "mlids_overload_concurrency_limit",
+    "Current adaptive concurrency limit for prediction requests",
+    multiprocess_mode="livesum",
+)
+
+OVERLOAD_INFLIGHT = Gauge(
+    "mlids_overload_inflight_requests",
+    "Prediction requests currently in flight",
+    multiprocess_mode="livesum",
+)
+
+PREDICTION_CACHE_ENTRIES = Gauge(
+    "mlids_prediction_cache_entries",
+    "Entries in the prediction cache",
+    multiprocess_mode="livesum",
+)
+
+OVERLOAD_LEVEL = Gauge(
+    "mlids_overload_level",
+    "Load shedding level (0=normal, 1=shed logging, 2=sample benign, 3=reject)",
+    multiprocess_mode="livemax",
 )
 
 
+def is_multiprocess() -> bool:
+    """Whether metrics are shared between worker processes."""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
 def metrics_response() -> Response:
-    """Generate a Prometheus-compatible metrics response."""
+    """Generate a Prometheus-compatible metrics response.
+
+    In multiprocess mode the samples of all workers (live and, for counters
+    and histograms, exited ones) are aggregated from the shared directory.
+    """
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        content = generate_latest(registry)
+    else:
+        content = generate_latest()
     return Response(
-        content=generate_latest(),
+        content=content,
         media_type=CONTENT_TYPE_LATEST,
     )
+
+
+def stage_timer(stage: str):
+    """Context manager observing the wrapped block into PREDICT_STAGE_LATENCY.
+
+    Stages: parse, feature_mapping, frame_build, inference, dedup_check,
+    db_write, rule_evaluation, notifications, metric_write,
+    websocket_broadcast, file_logging.
+    """
+    return PREDICT_STAGE_LATENCY.labels(stage=stage).time()
+
+
+class RequestDurationMiddleware:
+    """Pure ASGI middleware recording REQUEST_DURATION per route template.
+
+    Routes are labelled by their template (e.g. ``/api/alerts/{alert_id}``)
+    so label cardinality stays bounded; unrouted requests are ``unmatched``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_DURATION.labels(
+                method=scope["method"], route=route, status=str(status["code"])
+            ).observe(time.perf_counter() - start)
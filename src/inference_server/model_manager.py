@@ -0,0 +1,753 @@
+"""Model loading, caching and zero-downtime hot-swap for the inference server.
+
+The serving model is held as an immutable ``LoadedModel`` snapshot. Request
+handlers read ``model_manager.current`` once and use that snapshot for the
+whole request, so replacing the reference swaps models atomically while
+in-flight requests finish on the model they started with.
+
+When ``MODEL_WATCH_ENABLED`` is true a background thread polls every
+``MODEL_WATCH_INTERVAL_SECONDS`` for a new model, either a new version in the
+MLflow registry (``MLFLOW_MODEL_NAME`` pointing at a stage, alias or
+``latest``) or a changed local cache (``MODEL_CACHE_DIR/model_meta.json``).
+Candidates are loaded, validated against ``FEATURE_MAPPING`` and warmed up off
+the request path; only then does the swap happen.
+
+At startup ``start_background_load`` loads the local cache and then refreshes
+from MLflow in a background thread, so the event loop (and ``/health``) is
+never blocked on S3. Progress is exposed as ``state``:
+
+    loading_cache   reading the local cache
+    serving_cache   serving the cached model
+    refreshing      loading from MLflow (the cached model, if any, keeps serving)
+    serving_mlflow  serving the model freshly loaded from MLflow
+    loading_file    reading MODEL_ONNX_PATH
+    serving_file    serving the ONNX graph at MODEL_ONNX_PATH
+    unavailable     no cache and MLflow failed or is not configured
+
+Every model is warmed up before it serves: ``MODEL_WARMUP_ITERATIONS`` rounds
+of single-row and ``MODEL_WARMUP_ROWS``-row predictions on a synthetic batch,
+so lazy initialisation (validation caches, BLAS/OpenMP threads, page faults)
+is not paid by the first real requests. ``ready`` is only true once that has
+succeeded; timings are kept in ``warmup``.
+
+``MODEL_BACKEND=compiled`` serves tree ensembles through the array-backed
+engine in ``tree_engine.py``; ``MODEL_BACKEND=onnx`` exports the estimator to
+ONNX (cached as ``model.onnx``) and serves it with ONNX Runtime. Both are
+used only after a prediction parity check.
+
+``MODEL_CASCADE_SCREEN_PATH`` puts a cheap binary benign screen in front of
+whichever model is served (see ``cascade.py``); the screen is compiled with
+the tree engine when possible and its threshold is chosen from the offline
+recall table against ``MODEL_CASCADE_RECALL_FLOOR``.
+
+``MODEL_ONNX_PATH`` serves a standalone ONNX graph instead of MLflow and the
+cache, e.g. the int8 FT-Transformer written by
+``notebooks/export_ft_transformer_cpu.py``. Its feature order and classes
+come from the JSON sidecar next to it (see ``onnx_backend``); the watcher
+swaps it in again when the file changes.
+
+mlflow, joblib and pandas are imported on first use (mlflow only when
+``MLFLOW_TRACKING_URI`` is set) to keep cold starts fast.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from functools import cached_property
+from datetime import datetime as _dt
+from typing import Any, List, Optional
+
+from fastapi import HTTPException
+
+from .metrics import MODEL_LOADED, MODEL_SWAPS_TOTAL, MODEL_WARMUP_SECONDS
+from .prediction_cache import prediction_cache
+
+logger = logging.getLogger(__name__)
+
+# Load feature mapping from JSON file
+try:
+    with open(os.path.join(os.path.dirname(__file__), "feature_mapping.json")) as f:
+        FEATURE_MAPPING = json.load(f)
+except Exception as e:
+    logger.error(f"Failed to load feature mapping: {e}")
+    # Fail fast: predictions are meaningless without the mapping
+    raise RuntimeError(f"Failed to load feature mapping: {e}")
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """An immutable snapshot of the serving model."""
+    model: Any
+    features: Optional[List[str]]
+    source: str = "none"
+    version: Optional[str] = None
+    loaded_at: Optional[str] = None
+    backend: str = "sklearn"
+    cascade: bool = False
+
+    @cached_property
+    def input_fields(self) -> Optional[frozenset]:
+        """Request fields (FEATURE_MAPPING keys) the model consumes, None if unknown."""
+        if self.features is None:
+            return None
+        used = set(self.features)
+        return frozenset(k for k, v in FEATURE_MAPPING.items() if v in used)
+
+    @property
+    def request_model(self):
+        """Request schema declaring only ``input_fields``."""
+        from .schemas import PredictionRequest, request_model_for
+
+        return PredictionRequest if self.input_fields is None else request_model_for(self.input_fields)
+
+    @property
+    def full_model(self):
+        """The multiclass serving model (the second stage when cascading)."""
+        return self.model.full if self.cascade else self.model
+
+    @property
+    def estimator(self):
+        """The original fitted estimator (what gets cached), whatever the backend."""
+        return self.full_model if self.backend == "sklearn" else self.full_model.estimator
+
+
+def _split_registry_uri(model_uri: str):
+    """Split ``models:/<name>/<stage|version|latest>`` or ``models:/<name>@<alias>``.
+
+    Returns ``(name, selector, is_alias)`` or None for non-registry URIs.
+    """
+    if not model_uri.startswith("models:/"):
+        return None
+    path = model_uri[len("models:/"):]
+    if "@" in path:
+        name, alias = path.split("@", 1)
+        return name, alias, True
+    if "/" not in path:
+        return None
+    name, selector = path.split("/", 1)
+    return name, selector, False
+
+
+def synthetic_frame(features: List[str], rows: int, seed: int = 0):
+    """A DataFrame of non-negative, heavy-tailed values roughly like flow statistics."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.exponential(100.0, size=(rows, len(features))), columns=features)
+
+
+def validate_features(features) -> List[str]:
+    """Return the model features that FEATURE_MAPPING cannot produce."""
+    if features is None:
+        return ["<model has no feature_names_in_>"]
+    known = set(FEATURE_MAPPING.values())
+    return [f for f in features if f not in known]
+
+
+class ModelManager:
+    MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", "/app/model_cache")
+    LOCAL_MODEL_PATH = os.path.join(MODEL_CACHE_DIR, "model.joblib")
+    LOCAL_META_PATH = os.path.join(MODEL_CACHE_DIR, "model_meta.json")
+    LOCAL_ONNX_PATH = os.path.join(MODEL_CACHE_DIR, "model.onnx")
+
+    def __init__(self):
+        self.current: Optional[LoadedModel] = None
+        self._swap_lock = threading.Lock()
+        # Serializes on-demand loads so concurrent first requests share one load
+        self._load_lock = threading.Lock()
+        self._cache_mtime: Optional[float] = None
+        self._file_mtime: Optional[float] = None
+        self._watch_stop = threading.Event()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._load_thread: Optional[threading.Thread] = None
+        self.state = "none"
+        self.warmup: Optional[dict] = None
+
+    # Attribute-style access to the current snapshot. The setters are kept for
+    # callers that patch the manager directly (tests, scripts/verify_refactor.py).
+
+    @property
+    def initialized(self) -> bool:
+        return self.current is not None
+
+    @initialized.setter
+    def initialized(self, value: bool):
+        if not value:
+            self.current = None
+            self.warmup = None
+
+    @property
+    def model(self):
+        return self.current.model if self.current else None
+
+    @model.setter
+    def model(self, value):
+        self._patch(model=value)
+
+    @property
+    def features(self):
+        return self.current.features if self.current else None
+
+    @features.setter
+    def features(self, value):
+        self._patch(features=value)
+
+    @property
+    def model_source(self) -> str:
+        return self.current.source if self.current else "none"
+
+    @property
+    def model_loaded_at(self) -> Optional[str]:
+        return self.current.loaded_at if self.current else None
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self.current.version if self.current else None
+
+    @property
+    def model_backend(self) -> Optional[str]:
+        return self.current.backend if self.current else None
+
+    @property
+    def request_model(self):
+        """Schema to parse /predict bodies with: only the fields the serving model uses."""
+        current = self.current
+        if current is None:
+            from .schemas import PredictionRequest
+
+            return PredictionRequest
+        return current.request_model
+
+    @property
+    def ready(self) -> bool:
+        """Whether the serving model has been warmed up and can take traffic."""
+        return self.current is not None and self.warmup is not None and "error" not in self.warmup
+
+    @property
+    def loading(self) -> bool:
+        """Whether a background load is still running."""
+        return self._load_thread is not None and self._load_thread.is_alive()
+
+    def _patch(self, **changes):
+        if self.current is None:
+            if all(v is None for v in changes.values()):
+                return
+            self.current = LoadedModel(model=None, features=None, source="manual",
+                                       loaded_at=_dt.utcnow().isoformat())
+        self.current = replace(self.current, **changes)
+        prediction_cache.invalidate(self.current)
+
+    def _save_to_cache(self, loaded: LoadedModel):
+        """Persist a model and its metadata to local disk."""
+        import joblib
+
+        try:
+            os.makedirs(self.MODEL_CACHE_DIR, exist_ok=True)
+            joblib.dump(loaded.estimator, self.LOCAL_MODEL_PATH)
+            # The ONNX export sits next to the estimator it was made from
+            if loaded.backend == "onnx":
+                loaded.full_model.save(self.LOCAL_ONNX_PATH)
+            elif os.path.exists(self.LOCAL_ONNX_PATH):
+                os.remove(self.LOCAL_ONNX_PATH)
+            meta = {
+                "features": list(loaded.features),
+                "timestamp": _dt.utcnow().isoformat(),
+                "source": loaded.source,
+                "version": loaded.version,
+            }
+            with open(self.LOCAL_META_PATH, "w") as f:
+                json.dump(meta, f)
+            self._cache_mtime = os.path.getmtime(self.LOCAL_META_PATH)
+            logger.info(f"Model cached locally at {self.MODEL_CACHE_DIR}")
+        except Exception as e:
+            logger.warning(f"Failed to cache model locally: {e}")
+
+    def _read_cache(self) -> Optional[LoadedModel]:
+        """Load the locally cached model, or None if there is none."""
+        import joblib
+
+        try:
+            if not os.path.exists(self.LOCAL_MODEL_PATH) or not os.path.exists(self.LOCAL_META_PATH):
+                return None
+            mtime = os.path.getmtime(self.LOCAL_META_PATH)
+            with open(self.LOCAL_META_PATH) as f:
+                meta = json.load(f)
+            model = joblib.load(self.LOCAL_MODEL_PATH)
+            self._cache_mtime = mtime
+            return LoadedModel(
+                model=model,
+                features=meta["features"],
+                source="cache",
+                version=meta.get("version"),
+                loaded_at=_dt.utcnow().isoformat(),
+            )
+        except Exception as e:
+            logger.error(f"Failed to load model from cache: {e}")
+            return None
+
+    def _load_from_cache(self) -> bool:
+        """Try loading a locally cached model. Returns True on success."""
+        loaded = self._read_cache()
+        if loaded is None:
+            return False
+        self._activate(loaded)
+        logger.info("Model loaded from local cache")
+        return True
+
+    def _resolve_registry_version(self, model_uri: str) -> Optional[str]:
+        """Resolve a registry URI to a concrete model version (None if not a registry URI)."""
+        parts = _split_registry_uri(model_uri)
+        if parts is None:
+            return None
+        name, selector, is_alias = parts
+        if not is_alias and selector.isdigit():
+            return selector
+
+        import mlflow
+        from mlflow.exceptions import MlflowException
+
+        client = mlflow.MlflowClient()
+        if is_alias:
+            return str(client.get_model_version_by_alias(name, selector).version)
+        stages = None if selector.lower() == "latest" else [selector]
+        versions = client.get_latest_versions(name, stages=stages)
+        if not versions:
+            raise MlflowException(f"No versions of {name} in {selector}")
+        return str(max(int(v.version) for v in versions))
+
+    def _load_from_mlflow(self, model_uri: str, version: Optional[str] = None) -> LoadedModel:
+        """Load a model from MLflow, pinned to ``version`` when given."""
+        import mlflow.sklearn
+
+        parts = _split_registry_uri(model_uri)
+        uri = f"models:/{parts[0]}/{version}" if parts and version else model_uri
+        model = mlflow.sklearn.load_model(uri)
+        # Some models might not have feature_names_in_
+        if hasattr(model, "feature_names_in_"):
+            features = list(model.feature_names_in_)
+        else:
+            logger.warning("Model does not have feature_names_in_. Feature mapping might be affected.")
+            features = None
+        return LoadedModel(
+            model=model,
+            features=features,
+            source="mlflow",
+            version=version,
+            loaded_at=_dt.utcnow().isoformat(),
+        )
+
+    def _load_from_file(self, path: str) -> LoadedModel:
+        """Load the standalone ONNX graph at ``path`` and its sidecar metadata."""
+        from .onnx_backend import load_onnx, read_sidecar
+
+        mtime = os.path.getmtime(path)
+        meta = read_sidecar(path)
+        predictor = load_onnx(path)
+        self._file_mtime = mtime
+        return LoadedModel(
+            model=predictor,
+            features=meta.get("feature_names"),
+            source="file",
+            version=meta.get("version"),
+            loaded_at=_dt.utcnow().isoformat(),
+            backend="onnx",
+        )
+
+    def _prepare(self, loaded: LoadedModel) -> LoadedModel:
+        """Apply the configured inference backend, then the cascade screen if any."""
+        return self._prepare_cascade(self._prepare_backend(loaded))
+
+    def _prepare_backend(self, loaded: LoadedModel) -> LoadedModel:
+        """Switch ``loaded`` to the inference backend selected by MODEL_BACKEND.
+
+        ``compiled`` converts tree ensembles to a CompiledTreeEnsemble, kept
+        only if it predicts identically to the estimator on a synthetic batch.
+        ``onnx`` serves the estimator exported to ONNX (reusing the cached
+        ``model.onnx`` when loading from cache) if at least
+        MODEL_ONNX_MIN_PARITY of a synthetic batch gets the same prediction.
+        Anything unsupported falls back to the stock estimator.
+        """
+        backend = os.getenv("MODEL_BACKEND", "sklearn").lower()
+        if backend == "sklearn" or loaded.backend != "sklearn" or loaded.features is None:
+            return loaded
+        if backend == "compiled":
+            return self._prepare_compiled(loaded)
+        if backend == "onnx":
+            return self._prepare_onnx(loaded)
+        logger.warning(f"Unknown MODEL_BACKEND '{backend}', using sklearn")
+        return loaded
+
+    def _prepare_compiled(self, loaded: LoadedModel) -> LoadedModel:
+        from .tree_engine import CompiledTreeEnsemble, UnsupportedModelError, check_parity
+
+        try:
+            compiled = CompiledTreeEnsemble.from_estimator(loaded.model)
+        except UnsupportedModelError as e:
+            logger.warning(f"Compiled backend unavailable, using sklearn: {e}")
+            return loaded
+        rows = int(os.getenv("MODEL_BACKEND_PARITY_ROWS", "1000"))
+        parity = check_parity(compiled, synthetic_frame(loaded.features, rows, seed=1))
+        if parity < 1.0:
+            logger.error(f"Compiled backend disagrees with the estimator on {1 - parity:.2%} "
+                         f"of {rows} rows, using sklearn")
+            return loaded
+        compiled.max_batch = int(os.getenv("MODEL_COMPILED_MAX_BATCH", "512"))
+        logger.info(f"Compiled backend: {compiled.n_trees} trees, {compiled.n_nodes} nodes, "
+                    f"depth {compiled.max_depth}, parity checked on {rows} rows")
+        return replace(loaded, model=compiled, backend="compiled")
+
+    def _prepare_onnx(self, loaded: LoadedModel) -> LoadedModel:
+        from .onnx_backend import OnnxPredictor, load_onnx
+
+        try:
+            if loaded.source == "cache" and os.path.exists(self.LOCAL_ONNX_PATH):
+                predictor = load_onnx(self.LOCAL_ONNX_PATH, features=loaded.features,
+                                      estimator=loaded.model)
+            else:
+                predictor = OnnxPredictor.from_estimator(loaded.model, loaded.features)
+        except Exception as e:
+            logger.warning(f"ONNX backend unavailable, using sklearn: {e}")
+            return loaded
+
+        import numpy as np
+
+        rows = int(os.getenv("MODEL_BACKEND_PARITY_ROWS", "1000"))
+        sample = synthetic_frame(loaded.features, rows, seed=1)
+        parity = float(np.mean(np.asarray(loaded.model.predict(sample)).ravel() == predictor.predict(sample)))
+        min_parity = float(os.getenv("MODEL_ONNX_MIN_PARITY", "0.999"))
+        if parity < min_parity:
+            logger.error(f"ONNX model agrees with the estimator on only {parity:.2%} "
+                         f"of {rows} rows, using sklearn")
+            return loaded
+        logger.info(f"ONNX backend: parity {parity:.2%} on {rows} rows, "
+                    f"{predictor.intra_op_threads} intra-op threads "
+                    f"({predictor.batch_threads or 'auto'} from {predictor.batch_min_rows} rows)")
+        return replace(loaded, model=predictor, backend="onnx")
+
+    def _prepare_cascade(self, loaded: LoadedModel) -> LoadedModel:
+        """Put the screen at MODEL_CASCADE_SCREEN_PATH in front of ``loaded``.
+
+        Serves ``loaded`` alone when no screen is configured or it is unusable.
+        """
+        path = os.getenv("MODEL_CASCADE_SCREEN_PATH")
+        if not path or loaded.cascade or loaded.features is None:
+            return loaded
+
+        import joblib
+
+        from .cascade import CascadePredictor, read_screen_meta, select_threshold
+        from .tree_engine import CompiledTreeEnsemble, UnsupportedModelError
+
+        try:
+            screen = joblib.load(path)
+            meta = read_screen_meta(path)
+            screen_features = meta["features"]
+            missing = [f for f in screen_features if f not in loaded.features]
+            if missing:
+                raise ValueError(f"screen features not produced for the model: {missing[:5]}")
+            recall_floor = float(os.getenv("MODEL_CASCADE_RECALL_FLOOR", "0.999"))
+            if os.getenv("MODEL_CASCADE_THRESHOLD"):
+                threshold = float(os.getenv("MODEL_CASCADE_THRESHOLD"))
+                recall_floor = None
+            else:
+                chosen = select_threshold(meta["thresholds"], recall_floor)
+                threshold = chosen["threshold"]
+                logger.info(f"Cascade screen threshold {threshold}: offline attack recall "
+                            f"{chosen['attack_recall']:.4%}, benign screened {chosen['benign_screened']:.2%}")
+        except Exception as e:
+            logger.error(f"Cascade screen unavailable, serving the full model alone: {e}")
+            return loaded
+
+        try:
+            screen = CompiledTreeEnsemble.from_estimator(screen)
+        except UnsupportedModelError as e:
+            logger.info(f"Cascade screen not compiled: {e}")
+        cascade = CascadePredictor(screen, loaded.model, loaded.features, screen_features,
+                                   threshold, recall_floor=recall_floor,
+                                   benign_label=meta.get("benign_label", 0))
+        return replace(loaded, model=cascade, cascade=True)
+
+    @property
+    def cascade_stats(self) -> Optional[dict]:
+        """Per-stage counts and latency of the serving cascade (None when not cascading)."""
+        current = self.current
+        return current.model.stats() if current is not None and current.cascade else None
+
+    def _activate(self, loaded: LoadedModel, warmup: Optional[dict] = None):
+        """Make ``loaded`` the serving model, warming it up first unless already done."""
+        if warmup is None:
+            loaded = self._prepare(loaded)
+            try:
+                warmup = self._warm_up(loaded)
+            except Exception as e:
+                # Serve anyway (there is nothing better), but stay not-ready
+                logger.error(f"Model warm-up failed: {e}")
+                warmup = {"error": str(e)}
+        if loaded.input_fields is not None and len(loaded.input_fields) < len(FEATURE_MAPPING):
+            logger.info(f"Model uses {len(loaded.input_fields)} of {len(FEATURE_MAPPING)} request "
+                        f"features; requests are parsed for those only")
+        with self._swap_lock:
+            self.current = loaded
+            self.warmup = warmup
+            # Cached predictions belong to the previous model
+            prediction_cache.invalidate(loaded)
+        MODEL_LOADED.set(1)
+
+    def load_model(self):
+        """Load the ML model from MLflow, falling back to local cache.
+
+        Concurrent callers wait for the load already in progress instead of
+        starting their own.
+        """
+        if self.initialized:
+            return
+        with self._load_lock:
+            if self.initialized:
+                return
+            self._load_model()
+
+    def _load_model(self):
+        if os.getenv("MODEL_ONNX_PATH"):
+            self._serve_file(os.getenv("MODEL_ONNX_PATH"))
+            if not self.initialized:
+                raise HTTPException(status_code=503, detail="Model not available: cannot load MODEL_ONNX_PATH")
+            return
+
+        tracking_uri = os.environ.get("MLFLOW_TRACKING_URI")
+        model_name = os.environ.get("MLFLOW_MODEL_NAME", "models:/ML_IDS_Model_v1/Production")
+
+        # Try MLflow first
+        if tracking_uri:
+            import mlflow
+
+            mlflow.set_tracking_uri(tracking_uri)
+            try:
+                loaded = self._load_from_mlflow(model_name)
+                self._activate(loaded)
+                self.state = "serving_mlflow"
+                logger.info("Model loaded successfully from MLflow.")
+                if loaded.features is not None:
+                    self._save_to_cache(self.current)
+                return
+            except Exception as e:
+                logger.warning(f"MLflow model load failed: {e}. Trying local cache...")
+
+        # Fallback to local cache
+        if self._load_from_cache():
+            self.state = "serving_cache"
+            return
+
+        self.state = "unavailable"
+        raise HTTPException(status_code=503, detail="Model not available: MLflow unreachable and no local cache")
+
+    def _serve_file(self, path: str):
+        """Serve the ONNX graph at ``path`` (MODEL_ONNX_PATH) if it is usable."""
+        try:
+            loaded = self._load_from_file(path)
+        except Exception as e:
+            logger.error(f"Failed to load ONNX model from {path}: {e}")
+            self.state = "unavailable"
+            return
+        unknown = validate_features(loaded.features)
+        if unknown:
+            logger.error(f"ONNX model {path}: features not in FEATURE_MAPPING: {unknown[:5]}")
+            self.state = "unavailable"
+            return
+        self._activate(loaded)
+        self.state = "serving_file"
+        logger.info(f"Model loaded from {path}")
+
+    def _background_load(self):
+        """Serve the cached model first, then refresh it from MLflow."""
+        if os.getenv("MODEL_ONNX_PATH"):
+            self.state = "loading_file"
+            self._serve_file(os.getenv("MODEL_ONNX_PATH"))
+            return
+
+        tracking_uri = os.environ.get("MLFLOW_TRACKING_URI")
+        model_name = os.environ.get("MLFLOW_MODEL_NAME", "models:/ML_IDS_Model_v1/Production")
+
+        self.state = "loading_cache"
+        if self._load_from_cache():
+            self.state = "serving_cache"
+
+        if not tracking_uri:
+            if not self.initialized:
+                self.state = "unavailable"
+                logger.warning("No cached model and MLFLOW_TRACKING_URI not set")
+            return
+
+        self.state = "refreshing"
+        try:
+            import mlflow
+
+            mlflow.set_tracking_uri(tracking_uri)
+            version = None
+            try:
+                version = self._resolve_registry_version(model_name)
+            except Exception as e:
+                logger.warning(f"Could not resolve registry version of {model_name}: {e}")
+            if version is not None and version == self.model_version:
+                logger.info(f"Cached model is already version {version}, skipping MLflow download")
+                self.state = "serving_cache"
+                return
+            loaded = self._load_from_mlflow(model_name, version)
+            self._activate(loaded)
+            self.state = "serving_mlflow"
+            logger.info("Model refreshed from MLflow.")
+            if loaded.features is not None:
+                self._save_to_cache(self.current)
+        except Exception as e:
+            logger.warning(f"MLflow model refresh failed: {e}")
+            self.state = "serving_cache" if self.initialized else "unavailable"
+
+    def start_background_load(self):
+        """Load the model off the event loop (cache first, then MLflow)."""
+        if self.loading:
+            return
+        self._load_thread = threading.Thread(
+            target=self._background_load, name="model-loader", daemon=True
+        )
+        self._load_thread.start()
+
+    def _warm_up(self, loaded: LoadedModel) -> dict:
+        """Run synthetic single-row and batch predictions and return their timings."""
+        rows = int(os.getenv("MODEL_WARMUP_ROWS", "64"))
+        iterations = int(os.getenv("MODEL_WARMUP_ITERATIONS", "3"))
+        if rows <= 0 or iterations <= 0:
+            return {"skipped": True}
+        if loaded.features is None:
+            raise ValueError("model has no feature list to build a warm-up batch from")
+
+        batch = synthetic_frame(loaded.features, rows)
+        single = batch.iloc[:1]
+
+        timings = {"single_row_ms": [], "batch_ms": []}
+        start = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            loaded.model.predict(single)
+            t1 = time.perf_counter()
+            loaded.model.predict(batch)
+            t2 = time.perf_counter()
+            timings["single_row_ms"].append(round((t1 - t0) * 1000, 3))
+            timings["batch_ms"].append(round((t2 - t1) * 1000, 3))
+        total = time.perf_counter() - start
+
+        MODEL_WARMUP_SECONDS.set(total)
+        logger.info(f"Model warm-up: {iterations}x (1 + {rows} rows) in {total * 1000:.1f} ms, "
+                    f"single row {timings['single_row_ms'][0]:.2f} -> {timings['single_row_ms'][-1]:.2f} ms")
+        return {"rows": rows, "iterations": iterations, "seconds": round(total, 4), **timings}
+
+    def try_swap(self, candidate: LoadedModel) -> bool:
+        """Validate and warm up ``candidate``, then make it the serving model.
+
+        Returns False (keeping the current model) if the candidate is unusable.
+        """
+        unknown = validate_features(candidate.features)
+        if unknown:
+            logger.error(f"Rejecting model {candidate.source}:{candidate.version}: "
+                         f"features not in FEATURE_MAPPING: {unknown[:5]}")
+            MODEL_SWAPS_TOTAL.labels(result="rejected").inc()
+            return False
+        try:
+            candidate = self._prepare(candidate)
+            warmup = self._warm_up(candidate)
+        except Exception as e:
+            logger.error(f"Rejecting model {candidate.source}:{candidate.version}: warm-up failed: {e}")
+            MODEL_SWAPS_TOTAL.labels(result="rejected").inc()
+            return False
+
+        previous = self.current
+        self._activate(candidate, warmup)
+        self.state = f"serving_{candidate.source}"
+        MODEL_SWAPS_TOTAL.labels(result="swapped").inc()
+        logger.info(f"Swapped model {previous.source if previous else 'none'}:"
+                    f"{previous.version if previous else None} -> {candidate.source}:{candidate.version}")
+        return True
+
+    def check_for_update(self) -> bool:
+        """Poll MLflow and the local cache once; swap in a newer model if found.
+
+        Returns True if the serving model changed.
+        """
+        onnx_path = os.getenv("MODEL_ONNX_PATH")
+        if onnx_path:
+            try:
+                mtime = os.path.getmtime(onnx_path)
+            except OSError:
+                return False
+            if self._file_mtime is not None and mtime <= self._file_mtime:
+                return False
+            try:
+                candidate = self._load_from_file(onnx_path)
+            except Exception as e:
+                logger.warning(f"Failed to reload ONNX model from {onnx_path}: {e}")
+                return False
+            return self.try_swap(candidate)
+
+        tracking_uri = os.environ.get("MLFLOW_TRACKING_URI")
+        model_name = os.environ.get("MLFLOW_MODEL_NAME", "models:/ML_IDS_Model_v1/Production")
+
+        if tracking_uri and _split_registry_uri(model_name):
+            try:
+                import mlflow
+
+                mlflow.set_tracking_uri(tracking_uri)
+                version = self._resolve_registry_version(model_name)
+                if version is not None and version != self.model_version:
+                    logger.info(f"New model version {version} in MLflow registry, loading")
+                    candidate = self._load_from_mlflow(model_name, version)
+                    if self.try_swap(candidate):
+                        self._save_to_cache(self.current)
+                        return True
+                    return False
+            except Exception as e:
+                logger.warning(f"Model registry poll failed: {e}")
+
+        # A cache replaced on disk (by an operator or another replica's refresh)
+        try:
+            mtime = os.path.getmtime(self.LOCAL_META_PATH)
+        except OSError:
+            return False
+        if self._cache_mtime is not None and mtime <= self._cache_mtime:
+            return False
+        candidate = self._read_cache()
+        if candidate is None or (candidate.version is not None and candidate.version == self.model_version):
+            return False
+        return self.try_swap(candidate)
+
+    def _watch(self, interval: float):
+        while not self._watch_stop.wait(interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                logger.error(f"Model watcher error: {e}")
+
+    def start_watcher(self):
+        """Start the background model watcher if MODEL_WATCH_ENABLED is true."""
+        if os.getenv("MODEL_WATCH_ENABLED", "false").lower() not in ("true", "1", "yes"):
+            return
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+        interval = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "60"))
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch, args=(interval,), name="model-watcher", daemon=True
+        )
+        self._watch_thread.start()
+        logger.info(f"Model watcher started (every {interval:.0f}s)")
+
+    def stop_watcher(self):
+        """Stop the background model watcher."""
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=5)
+            self._watch_thread = None
+
+
+model_manager = ModelManager()
@@ -0,0 +1,219 @@
+"""Streaming NDJSON prediction over one long-lived connection.
+
+``POST /predict/stream`` takes a chunked body of newline-delimited JSON
+flows, each object shaped like a ``/predict`` body, and streams back one
+NDJSON result line per flow in input order:
+
+    {"prediction": 0}
+    {"prediction": 3, "validation_warnings": ["syn_flag_cnt: value 2.0 clamped to 1"]}
+    {"error": "invalid flow: Expecting value: line 1 column 1 (char 0)"}
+
+Flows are scored in micro-batches: every complete line received so far
+(up to ``PREDICT_STREAM_BATCH_SIZE`` per batch) is parsed into one matrix
+and predicted in a single model call off the event loop, without pydantic.
+Nothing is buffered beyond the current batch. The next part of the body is
+read only after the previous results have been handed to the server, so a
+client that stops reading results, or a server that falls behind, holds
+the other side back through TCP flow control.
+
+Overload protection and the per-key rate limiter see each micro-batch,
+not the connection, as one request: flows are shed per micro-batch as on
+``/predict``, and a micro-batch over the caller's rate or concurrency
+limit gets an ``error`` result for each of its flows while the stream
+goes on.
+
+Only the features the serving model uses are read from each flow. Blank
+lines are skipped. A malformed line gets an ``error`` result and the
+stream goes on; a line longer than ``PREDICT_STREAM_MAX_LINE_BYTES`` ends
+the stream.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional, Tuple
+
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .metrics import RATE_LIMIT_ADMITTED_TOTAL, RATE_LIMIT_REJECTED_TOTAL
+from .model_manager import FEATURE_MAPPING, LoadedModel, model_manager
+from .overload import LoadLevel, overload_guard
+from .rate_limit import (
+    ANONYMOUS_KEY_ID, RateLimiter, is_rate_limit_enabled, rate_limited_paths, rate_limiter,
+)
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "application/x-ndjson"
+_SHED = json.dumps({"error": "Server overloaded, flow not scored"}).encode()
+
+
+class NDJSONStreamResponse(StreamingResponse):
+    """StreamingResponse that leaves ``receive`` to the body iterator.
+
+    StreamingResponse normally polls ``receive`` for a disconnect while it
+    streams, which would swallow request body chunks the results are
+    computed from. A disconnect still ends the stream, through
+    ``request.stream()``.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+
+@lru_cache(maxsize=8)
+def _fields_for(features: Tuple[str, ...]) -> List[str]:
+    """Request fields read from each flow: the ones the model uses."""
+    wanted = set(features)
+    return [field for field, name in FEATURE_MAPPING.items() if name in wanted or field in wanted]
+
+
+def score_lines(current: LoadedModel, lines: List[bytes], level: LoadLevel):
+    """Parse and score a micro-batch of NDJSON lines.
+
+    Returns (result lines, predictions, features, fields, src_ips, dst_ips)
+    for the scored flows, so attack rows can be recorded afterwards.
+    """
+    import numpy as np
+
+    from .batch_scoring import score_matrix, to_model_matrix
+    from .schemas import sanitize_feature_matrix
+
+    fields = _fields_for(tuple(current.features))
+    X = np.zeros((len(lines), len(fields)), dtype=np.float32)
+    results: List[bytes] = [b""] * len(lines)
+    scored, src_ips, dst_ips, shed = [], [], [], []
+    for i, line in enumerate(lines):
+        try:
+            flow = json.loads(line)
+            if not isinstance(flow, dict):
+                raise ValueError("expected a JSON object")
+            X[i] = [flow.get(field) or 0.0 for field in fields]
+        except (ValueError, TypeError) as e:
+            results[i] = json.dumps({"error": f"invalid flow: {e}"}).encode()
+            continue
+        if not overload_guard.admit_flow(level, flow.get("src_ip")):
+            shed.append((i, flow.get("src_ip"), flow.get("dst_ip")))
+            continue
+        scored.append(i)
+        src_ips.append(flow.get("src_ip"))
+        dst_ips.append(flow.get("dst_ip"))
+
+    if shed and current.cascade:
+        # Shed flows only get the cascade screen; the full model sees those it flags
+        rows = [i for i, _, _ in shed]
+        screened = sanitize_feature_matrix(X[rows], fields)
+        suspicious = current.model.suspicious(to_model_matrix(screened, fields, current.features))
+        cleared = json.dumps({"prediction": np.asarray(current.model.benign_label).item()}).encode()
+        for (i, src_ip, dst_ip), flagged in zip(shed, suspicious):
+            if flagged:
+                scored.append(i)
+                src_ips.append(src_ip)
+                dst_ips.append(dst_ip)
+            else:
+                results[i] = cleared
+        overload_guard.record_screened(escalated=int(suspicious.sum()), cleared=int((~suspicious).sum()))
+    else:
+        for i, _, _ in shed:
+            results[i] = _SHED
+
+    X = X[scored]
+    if not scored:
+        return b"\n".join(results) + b"\n", np.zeros(0, dtype=np.int64), X, fields, src_ips, dst_ips
+    predictions, warnings = score_matrix(current, X, fields, "stream")
+    for j, i in enumerate(scored):
+        result = {"prediction": predictions[j].item()}
+        if warnings:
+            messages = warnings.messages(j)
+            if messages:
+                result["validation_warnings"] = messages
+        results[i] = json.dumps(result).encode()
+    return b"\n".join(results) + b"\n", predictions, X, fields, src_ips, dst_ips
+
+
+class PredictionStreamer:
+    """Turns an NDJSON request body into a stream of NDJSON results."""
+
+    def __init__(self, batch_size: int = 1024, max_line_bytes: int = 1 << 20,
+                 limiter: Optional[RateLimiter] = None):
+        self.batch_size = batch_size
+        self.max_line_bytes = max_line_bytes
+        self.limiter = limiter or rate_limiter
+
+    @classmethod
+    def from_env(cls) -> "PredictionStreamer":
+        return cls(
+            batch_size=int(os.getenv("PREDICT_STREAM_BATCH_SIZE", "1024")),
+            max_line_bytes=int(os.getenv("PREDICT_STREAM_MAX_LINE_BYTES", "1048576")),
+        )
+
+    async def stream(self, request: Request) -> AsyncIterator[bytes]:
+        flows = 0
+        pending = b""
+        # Micro-batches are charged to the caller's key, like /predict requests
+        key_id = None
+        if is_rate_limit_enabled() and request.scope["path"].startswith(rate_limited_paths()):
+            key_id = request.scope.get("state", {}).get("api_key_id", ANONYMOUS_KEY_ID)
+        async for chunk in request.stream():
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            lines = [line for line in lines if line.strip()]
+            for start in range(0, len(lines), self.batch_size):
+                batch = lines[start:start + self.batch_size]
+                yield await self._score(batch, key_id)
+                flows += len(batch)
+            if len(pending) > self.max_line_bytes:
+                yield json.dumps({"error": "line exceeds PREDICT_STREAM_MAX_LINE_BYTES"}).encode() + b"\n"
+                logger.warning(f"Prediction stream closed after {flows} flows: line too long")
+                return
+        if pending.strip():
+            yield await self._score([pending], key_id)
+            flows += 1
+        logger.info(f"Prediction stream finished: {flows} flows")
+
+    async def _score(self, lines: List[bytes], key_id: Optional[str] = None) -> bytes:
+        if key_id is None:
+            return await self._score_admitted(lines)
+        reason, _ = self.limiter.acquire(key_id)
+        if reason is not None:
+            RATE_LIMIT_REJECTED_TOTAL.labels(api_key=key_id, reason=reason).inc()
+            throttled = json.dumps({"error": f"Rate limit exceeded ({reason}), flow not scored"}).encode()
+            return b"\n".join([throttled] * len(lines)) + b"\n"
+        RATE_LIMIT_ADMITTED_TOTAL.labels(api_key=key_id).inc()
+        try:
+            return await self._score_admitted(lines)
+        finally:
+            self.limiter.release(key_id)
+
+    async def _score_admitted(self, lines: List[bytes]) -> bytes:
+        from .batch_scoring import record_attacks
+
+        # Each batch uses the model serving at the time, so a long stream follows hot-swaps
+        current = model_manager.current
+        # Each micro-batch is one request in flight for overload protection, like a /predict call
+        tracked = overload_guard.enabled
+        if tracked:
+            overload_guard.limiter.on_start()
+        level = overload_guard.current_level()
+        start = time.monotonic()
+        try:
+            output, predictions, X, fields, src_ips, dst_ips = await asyncio.to_thread(
+                score_lines, current, lines, level
+            )
+        finally:
+            if tracked:
+                overload_guard.limiter.on_complete(time.monotonic() - start)
+                overload_guard.publish_metrics(overload_guard.current_level())
+        await record_attacks(predictions, X, fields, src_ips, dst_ips)
+        return output
+
+
+prediction_streamer = PredictionStreamer.from_env()
@@ -6,14 +6,13 @@ Supports multiple notification channels configured in the database.
 
 import os
 import logging
-import aiohttp
-import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Dict, Any, List
 from datetime import datetime
 
 from .models import NotificationChannel, NotificationChannelType, Alert
+from .tracing import mark_span_error, traced, tracer
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +23,7 @@ class NotificationService:
     def __init__(self):
         self.enabled = os.getenv("ALERT_NOTIFICATION_ENABLED", "false").lower() == "true"
     
+    @traced("notifications.send_alert_notification")
     async def send_alert_notification(
         self,
         alert: Alert,
@@ -50,26 +50,32 @@ class NotificationService:
                 logger.debug(f"Channel {channel.name} is disabled, skipping")
                 continue
             
-            try:
-                if channel.channel_type == NotificationChannelType.EMAIL:
-                    success = await self._send_email(alert, channel)
-                    results[channel.name] = success
-                
-                elif channel.channel_type == NotificationChannelType.SLACK:
-                    success = await self._send_slack(alert, channel)
-                    results[channel.name] = success
-                
-                elif channel.channel_type == NotificationChannelType.WEBHOOK:
-                    success = await self._send_webhook(alert, channel)
-                    results[channel.name] = success
+            with tracer.start_as_current_span("notification.channel") as span:
+                span.set_attribute("mlids.channel", channel.name)
+                span.set_attribute("mlids.channel_type", str(channel.channel_type.value))
+                try:
+                    if channel.channel_type == NotificationChannelType.EMAIL:
+                        success = await self._send_email(alert, channel)
+                        results[channel.name] = success
+                    
+                    elif channel.channel_type == NotificationChannelType.SLACK:
+                        success = await self._send_slack(alert, channel)
+                        results[channel.name] = success
+                    
+                    elif channel.channel_type == NotificationChannelType.WEBHOOK:
+                        success = await self._send_webhook(alert, channel)
+                        results[channel.name] = success
+                    
+                    else:
+                        logger.warning(f"Unknown channel type: {channel.channel_type}")
+                        results[channel.name] = False
                 
-                else:
-                    logger.warning(f"Unknown channel type: {channel.channel_type}")
+                except Exception as e:
+                    logger.error(f"Error sending notification via {channel.name}: {e}")
                     results[channel.name] = False
-            
-            except Exception as e:
-                logger.error(f"Error sending notification via {channel.name}: {e}")
-                results[channel.name] = False
+
+                if not results[channel.name]:
+                    mark_span_error(f"Notification via {channel.name} failed")
         
         return results
     
@@ -143,7 +149,9 @@ This is an automated alert from the ML-IDS system.
             msg.attach(part1)
             msg.attach(part2)
             
-            # Send email
+            # Send email (imported here so servers without channels never load it)
+            import aiosmtplib
+
             await aiosmtplib.send(
                 msg,
                 hostname=config.get('smtp_host'),
@@ -225,6 +233,8 @@ This is an automated alert from the ML-IDS system.
             }
             
             # Send to Slack
+            import aiohttp
+
             async with aiohttp.ClientSession() as session:
                 async with session.post(webhook_url, json=payload) as response:
                     if response.status == 200:
@@ -262,6 +272,8 @@ This is an automated alert from the ML-IDS system.
             
             # Send webhook
             headers = config.get('headers', {})
+            import aiohttp
+
             async with aiohttp.ClientSession() as session:
                 async with session.post(webhook_url, json=payload, headers=headers) as response:
                     if 200 <= response.status < 300:
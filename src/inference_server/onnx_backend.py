@@ -0,0 +1,175 @@
+"""ONNX Runtime inference backend.
+
+``export_onnx`` converts a fitted sklearn estimator (or ``XGBClassifier``,
+via onnxmltools) into an ONNX graph with a single ``float32 [N, n_features]``
+input. ``OnnxPredictor`` serves any such graph with ONNX Runtime on CPU:
+graphs with a ``label`` output (converted classifiers) return it directly,
+others (e.g. an exported neural network emitting logits) are decoded with
+argmax over their first output.
+
+Single flows and batches want different threading: one intra-op thread keeps
+per-call latency low, while large batches (the FT-Transformer in particular)
+are several times faster spread over all cores. Calls with at least
+``ONNX_BATCH_MIN_ROWS`` rows therefore run on a second session with
+``ONNX_BATCH_INTRA_OP_THREADS`` threads (0 lets ONNX Runtime use one per
+physical core), created on first use.
+
+A standalone graph (not exported from an estimator here) carries its feature
+order and class labels in a JSON sidecar next to it, ``<name>.json``, with
+``feature_names`` and ``classes`` keys; ``load_onnx`` reads it when present.
+
+Optional dependencies: serving needs ``onnxruntime``; exporting also needs
+``skl2onnx`` (and ``onnxmltools`` for XGBoost). Neither is imported until
+used, so the server runs without them when the backend is not selected.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ai.onnx.ml opset 3 is the newest TreeEnsemble version all supported runtimes accept
+TARGET_OPSET = {"": 17, "ai.onnx.ml": 3}
+
+
+class OnnxExportError(RuntimeError):
+    """The estimator could not be converted to ONNX."""
+
+
+def export_onnx(estimator, n_features: int) -> bytes:
+    """Convert ``estimator`` to a serialized ONNX model."""
+    try:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+    except ImportError as e:
+        raise OnnxExportError(f"skl2onnx is not installed: {e}")
+
+    if type(estimator).__name__ == "XGBClassifier":
+        _register_xgboost_converter(type(estimator))
+
+    try:
+        onx = convert_sklearn(
+            estimator,
+            initial_types=[("input", FloatTensorType([None, n_features]))],
+            options={id(estimator): {"zipmap": False}},
+            target_opset=TARGET_OPSET,
+        )
+    except Exception as e:
+        raise OnnxExportError(f"Cannot convert {type(estimator).__name__} to ONNX: {e}")
+    return onx.SerializeToString()
+
+
+def _register_xgboost_converter(xgb_class):
+    try:
+        from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+        from skl2onnx import update_registered_converter
+        from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+    except ImportError as e:
+        raise OnnxExportError(f"onnxmltools is required to export XGBoost models: {e}")
+
+    update_registered_converter(
+        xgb_class, "XGBoostXGBClassifier",
+        calculate_linear_classifier_output_shapes, convert_xgboost,
+        options={"nocl": [True, False], "zipmap": [True, False, "columns"]},
+    )
+
+
+class OnnxPredictor:
+    """Runs an ONNX classifier with ONNX Runtime, with an estimator-like ``predict``."""
+
+    def __init__(
+        self,
+        model_bytes: bytes,
+        features: Optional[Sequence[str]] = None,
+        classes: Optional[Sequence] = None,
+        intra_op_threads: Optional[int] = None,
+        estimator=None,
+        batch_threads: Optional[int] = None,
+        batch_min_rows: Optional[int] = None,
+    ):
+        # Single flows dominate: one thread avoids pool wake-up latency per call
+        self.intra_op_threads = intra_op_threads or int(os.getenv("ONNX_INTRA_OP_THREADS", "1"))
+        self.batch_threads = (batch_threads if batch_threads is not None
+                              else int(os.getenv("ONNX_BATCH_INTRA_OP_THREADS", "0")))
+        self.batch_min_rows = batch_min_rows or int(os.getenv("ONNX_BATCH_MIN_ROWS", "32"))
+        self.model_bytes = model_bytes
+        self.session = self._make_session(self.intra_op_threads)
+        self._batch_session = None
+        self._batch_lock = threading.Lock()
+
+        self.estimator = estimator
+        self.input_name = self.session.get_inputs()[0].name
+        outputs: List[str] = [o.name for o in self.session.get_outputs()]
+        self.label_output = "label" if "label" in outputs else None
+        self.score_output = outputs[0]
+        self.classes_ = np.asarray(classes if classes is not None else getattr(estimator, "classes_", []))
+        if features is not None:
+            self.feature_names_in_ = np.asarray(features, dtype=object)
+
+    def _make_session(self, intra_op_threads: int):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(self.model_bytes, options, providers=["CPUExecutionProvider"])
+
+    def _session_for(self, rows: int):
+        if rows < self.batch_min_rows or self.batch_threads == self.intra_op_threads:
+            return self.session
+        if self._batch_session is None:
+            with self._batch_lock:
+                if self._batch_session is None:
+                    self._batch_session = self._make_session(self.batch_threads)
+        return self._batch_session
+
+    @classmethod
+    def from_estimator(cls, estimator, features: Sequence[str], **kwargs) -> "OnnxPredictor":
+        return cls(export_onnx(estimator, len(features)), features=features,
+                   estimator=estimator, **kwargs)
+
+    def predict(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        session = self._session_for(X.shape[0])
+        if self.label_output is not None:
+            return session.run([self.label_output], {self.input_name: X})[0].ravel()
+        scores = session.run([self.score_output], {self.input_name: X})[0]
+        indices = np.argmax(scores, axis=1)
+        return self.classes_.take(indices) if len(self.classes_) else indices
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.model_bytes)
+
+
+def sidecar_path(path: str) -> str:
+    """The metadata file that accompanies the ONNX graph at ``path``."""
+    return os.path.splitext(path)[0] + ".json"
+
+
+def read_sidecar(path: str) -> dict:
+    """Metadata for the ONNX graph at ``path`` ({} when it has no sidecar)."""
+    try:
+        with open(sidecar_path(path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_onnx(path: str, **kwargs) -> OnnxPredictor:
+    """Load a serialized ONNX model from ``path``.
+
+    ``features`` and ``classes`` default to those in the graph's sidecar.
+    """
+    meta = read_sidecar(path)
+    kwargs.setdefault("features", meta.get("feature_names"))
+    kwargs.setdefault("classes", meta.get("classes"))
+    with open(path, "rb") as f:
+        return OnnxPredictor(f.read(), **kwargs)
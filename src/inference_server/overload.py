@@ -0,0 +1,262 @@
+"""Adaptive admission control and load shedding for the prediction path.
+
+An AIMD limiter sizes the number of concurrent ``/predict`` requests from
+observed latency: the limit grows by ``1/limit`` for every request that
+finishes under ``OVERLOAD_LATENCY_TARGET_MS`` and is cut multiplicatively
+(at most once per target interval) when requests run slower.
+
+Utilisation (in-flight / limit) maps to a load level that degrades service
+in stages:
+
+    NORMAL         everything runs
+    SHED_LOGGING   negative-prediction file logging is skipped
+    SAMPLE_BENIGN  flows from sources with no recent attack are sampled
+    REJECT         only sources with a recent attack are scored
+
+Beyond ``limit * (1 + OVERLOAD_ATTACK_RESERVE)`` requests get a fast ``503``
+before their body is read. The reserve between the limit and that hard cap
+keeps detection working for sources already seen attacking.
+
+Sampling and rejection go by source, not by content: a source with no
+recent attack cannot be told apart before scoring. With a cascade screen
+(``MODEL_CASCADE_SCREEN_PATH``) flows that are not admitted still go
+through the cheap screen, and those it finds suspicious are scored by the
+full model, so a new attacker's first flows are caught. Without a screen
+they are not scored at all. Protection is off unless
+``OVERLOAD_PROTECTION_ENABLED=true``.
+"""
+
+import logging
+import os
+import random
+import time
+from collections import OrderedDict
+from enum import IntEnum
+from typing import Callable, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import (
+    OVERLOAD_CONCURRENCY_LIMIT, OVERLOAD_INFLIGHT, OVERLOAD_LEVEL, OVERLOAD_SHED_TOTAL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LoadLevel(IntEnum):
+    NORMAL = 0
+    SHED_LOGGING = 1
+    SAMPLE_BENIGN = 2
+    REJECT = 3
+
+
+class AdaptiveConcurrencyLimiter:
+    """Additive-increase / multiplicative-decrease concurrency limit."""
+
+    def __init__(
+        self,
+        initial: float = 32,
+        min_limit: float = 4,
+        max_limit: float = 256,
+        latency_target: float = 0.25,
+        backoff: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limit = float(initial)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.clock = clock
+        self.inflight = 0
+        self._last_decrease = float("-inf")
+
+    def on_start(self) -> None:
+        self.inflight += 1
+
+    def on_complete(self, latency: float) -> None:
+        """Release one slot and adapt the limit to the request's latency."""
+        self.inflight = max(0, self.inflight - 1)
+        if latency > self.latency_target:
+            now = self.clock()
+            # One decrease per target interval so a burst of slow responses
+            # to the same congestion episode does not collapse the limit.
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def on_drop(self) -> None:
+        """Release a slot without a latency sample (request was shed)."""
+        self.inflight = max(0, self.inflight - 1)
+
+    @property
+    def utilisation(self) -> float:
+        return self.inflight / self.limit
+
+
+class OverloadGuard:
+    """Admission decisions for the prediction endpoints."""
+
+    def __init__(
+        self,
+        limiter: AdaptiveConcurrencyLimiter,
+        enabled: bool = True,
+        benign_sample_rate: float = 0.1,
+        attack_reserve: float = 0.25,
+        shed_logging_at: float = 0.5,
+        sample_benign_at: float = 0.8,
+        attacker_ttl: float = 300.0,
+        max_tracked_attackers: int = 10000,
+        rng: Optional[random.Random] = None,
+    ):
+        self.limiter = limiter
+        self.enabled = enabled
+        self.benign_sample_rate = benign_sample_rate
+        self.attack_reserve = attack_reserve
+        self.shed_logging_at = shed_logging_at
+        self.sample_benign_at = sample_benign_at
+        self.attacker_ttl = attacker_ttl
+        self.max_tracked_attackers = max_tracked_attackers
+        self._attackers: "OrderedDict[str, float]" = OrderedDict()
+        self._rng = rng or random.Random()
+
+    @classmethod
+    def from_env(cls) -> "OverloadGuard":
+        limiter = AdaptiveConcurrencyLimiter(
+            initial=float(os.getenv("OVERLOAD_INITIAL_CONCURRENCY", "32")),
+            min_limit=float(os.getenv("OVERLOAD_MIN_CONCURRENCY", "4")),
+            max_limit=float(os.getenv("OVERLOAD_MAX_CONCURRENCY", "256")),
+            latency_target=float(os.getenv("OVERLOAD_LATENCY_TARGET_MS", "250")) / 1000,
+        )
+        return cls(
+            limiter,
+            enabled=os.getenv("OVERLOAD_PROTECTION_ENABLED", "false").lower() in ("true", "1", "yes"),
+            benign_sample_rate=float(os.getenv("OVERLOAD_BENIGN_SAMPLE_RATE", "0.1")),
+            attack_reserve=float(os.getenv("OVERLOAD_ATTACK_RESERVE", "0.25")),
+            attacker_ttl=float(os.getenv("OVERLOAD_ATTACKER_TTL_SECONDS", "300")),
+        )
+
+    def current_level(self) -> LoadLevel:
+        utilisation = self.limiter.utilisation
+        if utilisation > 1.0:
+            return LoadLevel.REJECT
+        if utilisation >= self.sample_benign_at:
+            return LoadLevel.SAMPLE_BENIGN
+        if utilisation >= self.shed_logging_at:
+            return LoadLevel.SHED_LOGGING
+        return LoadLevel.NORMAL
+
+    def over_hard_limit(self) -> bool:
+        return self.limiter.inflight >= self.limiter.limit * (1.0 + self.attack_reserve)
+
+    def mark_attacker(self, src_ip: Optional[str]) -> None:
+        """Remember a source that just produced a positive prediction."""
+        if not src_ip or src_ip == "unknown":
+            return
+        self._attackers[src_ip] = time.monotonic() + self.attacker_ttl
+        self._attackers.move_to_end(src_ip)
+        while len(self._attackers) > self.max_tracked_attackers:
+            self._attackers.popitem(last=False)
+
+    def is_recent_attacker(self, src_ip: Optional[str]) -> bool:
+        if not src_ip:
+            return False
+        expires = self._attackers.get(src_ip)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._attackers[src_ip]
+            return False
+        return True
+
+    def should_log_negative(self, level: LoadLevel) -> bool:
+        if level >= LoadLevel.SHED_LOGGING:
+            OVERLOAD_SHED_TOTAL.labels(action="negative_logging").inc()
+            return False
+        return True
+
+    def admit_flow(self, level: LoadLevel, src_ip: Optional[str]) -> bool:
+        """Decide whether a parsed flow is scored at the given load level."""
+        if level < LoadLevel.SAMPLE_BENIGN or self.is_recent_attacker(src_ip):
+            return True
+        if level == LoadLevel.SAMPLE_BENIGN and self._rng.random() < self.benign_sample_rate:
+            return True
+        OVERLOAD_SHED_TOTAL.labels(
+            action="sampled" if level == LoadLevel.SAMPLE_BENIGN else "rejected"
+        ).inc()
+        return False
+
+    def record_screened(self, escalated: int, cleared: int) -> None:
+        """Count flows that were not admitted but went through the cascade screen."""
+        if escalated:
+            OVERLOAD_SHED_TOTAL.labels(action="screen_escalated").inc(escalated)
+        if cleared:
+            OVERLOAD_SHED_TOTAL.labels(action="screen_cleared").inc(cleared)
+
+    def publish_metrics(self, level: LoadLevel) -> None:
+        OVERLOAD_LEVEL.set(int(level))
+        OVERLOAD_INFLIGHT.set(self.limiter.inflight)
+        OVERLOAD_CONCURRENCY_LIMIT.set(self.limiter.limit)
+
+
+overload_guard = OverloadGuard.from_env()
+
+
+def overload_response(detail: str = "Server overloaded, retry later") -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": detail}, headers={"Retry-After": "1"})
+
+
+class OverloadProtectionMiddleware:
+    """Pure ASGI middleware tracking /predict concurrency and latency.
+
+    Stores the load level at admission in ``scope["state"]["load_level"]``
+    for the route to apply the finer-grained shedding stages. Paths in
+    ``exclude`` hold a connection open for a long time (``/predict/stream``)
+    and count their micro-batches themselves instead.
+    """
+
+    def __init__(self, app: ASGIApp, guard: Optional[OverloadGuard] = None, paths=("/predict",),
+                 exclude=("/predict/stream",)):
+        self.app = app
+        self.guard = guard or overload_guard
+        self.paths = tuple(paths)
+        self.exclude = tuple(exclude)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (not self.guard.enabled or scope["type"] != "http" or not scope["path"].startswith(self.paths)
+                or scope["path"].startswith(self.exclude)):
+            await self.app(scope, receive, send)
+            return
+
+        guard = self.guard
+        if guard.over_hard_limit():
+            OVERLOAD_SHED_TOTAL.labels(action="rejected").inc()
+            guard.publish_metrics(LoadLevel.REJECT)
+            await overload_response()(scope, receive, send)
+            return
+
+        guard.limiter.on_start()
+        level = guard.current_level()
+        scope.setdefault("state", {})["load_level"] = level
+        guard.publish_metrics(level)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if status["code"] == 503:
+                # Shed by the route: no meaningful latency sample
+                guard.limiter.on_drop()
+            else:
+                guard.limiter.on_complete(time.monotonic() - start)
+            guard.publish_metrics(guard.current_level())
@@ -0,0 +1,101 @@
+"""Bounded LRU cache of predictions for repeated identical flows.
+
+Scans and floods (PortScan, DoS Hulk) produce long runs of flows with
+bit-identical feature vectors. With ``PREDICTION_CACHE_SIZE`` > 0, ``/predict``
+looks the model input vector up here before calling ``model.predict`` and
+repeated flows skip inference entirely.
+
+The key is the packed float64 bytes of the input vector, optionally rounded
+to ``PREDICTION_CACHE_DECIMALS`` decimals so near-identical flows share an
+entry (at the price of exactness); dict hashing of those bytes is the fast
+hash. Entries belong to one serving model: ``ModelManager`` calls
+``invalidate`` with every newly activated model, which empties the cache,
+and lookups or stores made for any other model (e.g. a request still
+finishing on the previous one) are ignored.
+
+Lookups are counted in ``mlids_prediction_cache_requests_total{result}``
+(hit ratio = hit / (hit + miss)) and the size in
+``mlids_prediction_cache_entries``.
+"""
+
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+from .metrics import PREDICTION_CACHE_ENTRIES, PREDICTION_CACHE_REQUESTS_TOTAL
+
+
+class PredictionCache:
+    """LRU map from (serving model, input vector) to the model's prediction."""
+
+    def __init__(self, max_entries: int = 0, decimals: Optional[int] = None):
+        self.max_entries = max_entries
+        self.decimals = decimals
+        self._entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._owner: Any = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "PredictionCache":
+        decimals = os.getenv("PREDICTION_CACHE_DECIMALS")
+        return cls(
+            max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", "0")),
+            decimals=int(decimals) if decimals else None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, values: Sequence[float]) -> bytes:
+        if self.decimals is not None:
+            values = [round(v, self.decimals) for v in values]
+        return array("d", values).tobytes()
+
+    def get(self, model: Any, key: bytes) -> Optional[Any]:
+        """The cached prediction of ``model`` for ``key``, or None."""
+        with self._lock:
+            prediction = self._entries.get(key) if model is self._owner else None
+            if prediction is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        PREDICTION_CACHE_REQUESTS_TOTAL.labels(result="hit" if prediction is not None else "miss").inc()
+        return prediction
+
+    def put(self, model: Any, key: bytes, prediction: Any) -> None:
+        with self._lock:
+            if model is not self._owner:
+                return
+            self._entries[key] = prediction
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+        PREDICTION_CACHE_ENTRIES.set(size)
+
+    def invalidate(self, model: Any) -> None:
+        """Drop every entry and accept entries for ``model`` only from now on."""
+        with self._lock:
+            self._entries.clear()
+            self._owner = model
+        PREDICTION_CACHE_ENTRIES.set(0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+prediction_cache = PredictionCache.from_env()
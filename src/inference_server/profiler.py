@@ -0,0 +1,138 @@
+"""Statistical stack sampler for live profiling of the inference server.
+
+A background thread snapshots every other thread's Python stack with
+``sys._current_frames()`` at a fixed interval. Nothing is installed into the
+profiled threads (no ``sys.setprofile``), so the event loop and executor
+threads run at full speed; the cost is the sampler's own CPU time, reported
+alongside the result so it can be checked against the overhead budget.
+
+Output formats:
+    collapsed   ``thread;outer;...;inner count`` lines (flamegraph.pl, speedscope)
+    speedscope  speedscope JSON, one sampled profile per thread
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+Stack = Tuple[Frame, ...]
+
+
+@dataclass
+class ProfileResult:
+    """Aggregated samples from one profiling session."""
+    interval: float
+    duration: float
+    samples: int = 0
+    cpu_seconds: float = 0.0
+    stacks: Counter = field(default_factory=Counter)  # (thread name, stack) -> count
+
+    @property
+    def overhead(self) -> float:
+        """Sampler CPU time as a fraction of wall time."""
+        return self.cpu_seconds / self.duration if self.duration else 0.0
+
+    def to_collapsed(self) -> str:
+        lines = []
+        for (thread_name, stack), count in sorted(self.stacks.items(), key=lambda kv: -kv[1]):
+            frames = [thread_name] + [f"{func} ({file}:{line})" for func, file, line in stack]
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self) -> dict:
+        frame_index: Dict[Frame, int] = {}
+        frames: List[dict] = []
+        per_thread: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+
+        for (thread_name, stack), count in self.stacks.items():
+            indices = []
+            for frame in stack:
+                idx = frame_index.get(frame)
+                if idx is None:
+                    idx = frame_index[frame] = len(frames)
+                    func, file, line = frame
+                    frames.append({"name": func, "file": file, "line": line})
+                indices.append(idx)
+            samples, weights = per_thread.setdefault(thread_name, ([], []))
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        profiles = []
+        for thread_name, (samples, weights) in sorted(per_thread.items()):
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            })
+
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": f"ml-ids {self.duration:.1f}s @ {self.interval * 1000:.0f}ms",
+            "exporter": "ml-ids profiler",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+class StackSampler:
+    """Samples the Python stacks of all threads except its own."""
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+
+    def _walk(self, frame) -> Stack:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def run(self, duration: float) -> ProfileResult:
+        """Sample for ``duration`` seconds in the calling thread and return the profile."""
+        own_ident = threading.get_ident()
+        result = ProfileResult(interval=self.interval, duration=duration)
+        names: Dict[int, str] = {}
+        names_refreshed = 0.0
+
+        cpu_start = time.thread_time()
+        start = time.monotonic()
+        next_tick = start
+        while True:
+            now = time.monotonic()
+            if now - start >= duration:
+                break
+            if now - names_refreshed >= 1.0:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                names_refreshed = now
+
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                thread_name = names.get(ident, f"thread-{ident}")
+                result.stacks[(thread_name, self._walk(frame))] += 1
+            result.samples += 1
+
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (e.g. GIL contention); resynchronise instead of bursting
+                next_tick = time.monotonic()
+
+        result.duration = time.monotonic() - start
+        result.cpu_seconds = time.thread_time() - cpu_start
+        return result
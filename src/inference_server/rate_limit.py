@@ -0,0 +1,200 @@
+"""Per-API-key rate limiting and concurrency caps for prediction endpoints.
+
+Each caller (identified by the ``api_key_id`` set by ``APIKeyMiddleware``,
+or ``anonymous`` in dev mode) gets an in-memory token bucket and an
+in-flight request cap. Rejections return ``429`` with ``Retry-After``.
+
+``/predict/stream`` holds one connection open for many flows, so the
+middleware leaves it alone: ``ndjson_stream`` charges each micro-batch as
+one request against the same per-key limiter instead.
+
+Configuration:
+    ML_IDS_RATE_LIMIT_ENABLED       enable limiting (default false)
+    ML_IDS_RATE_LIMIT_RPS           sustained requests/second per key (default 200)
+    ML_IDS_RATE_LIMIT_BURST         bucket size per key (default 2x RPS)
+    ML_IDS_RATE_LIMIT_CONCURRENCY   max in-flight requests per key (default 32)
+    ML_IDS_RATE_LIMIT_PATHS         comma-separated path prefixes (default /predict)
+    ML_IDS_RATE_LIMITS              per-key overrides, e.g.
+                                    ``key-1a2b3c4d=50:100:8,anonymous=10:20:2``
+                                    (rps:burst:concurrency)
+"""
+
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .metrics import RATE_LIMIT_ADMITTED_TOTAL, RATE_LIMIT_REJECTED_TOTAL
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_KEY_ID = "anonymous"
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Limits applied to one API key."""
+    rate: float
+    burst: float
+    concurrency: int
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` tokens/second."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def try_acquire(self, now: float, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens. Returns 0 on success, else seconds until available."""
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (cost - self.tokens) / self.rate
+
+
+def _parse_overrides(raw: str) -> Dict[str, Tuple[float, float, Optional[int]]]:
+    """Parse ``key_id=rps:burst:concurrency`` entries (burst/concurrency optional)."""
+    overrides = {}
+    for entry in raw.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            key_id, spec = entry.split("=", 1)
+            parts = spec.split(":")
+            rate = float(parts[0])
+            burst = float(parts[1]) if len(parts) > 1 and parts[1] else rate * 2
+            concurrency = int(parts[2]) if len(parts) > 2 and parts[2] else None
+        except (ValueError, IndexError):
+            logger.warning(f"Ignoring malformed rate limit override: {entry!r}")
+            continue
+        overrides[key_id.strip()] = (rate, burst, concurrency)
+    return overrides
+
+
+class RateLimiter:
+    """Tracks token buckets and in-flight counts per API key id."""
+
+    def __init__(
+        self,
+        default: RateLimit,
+        overrides: Optional[Dict[str, RateLimit]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.default = default
+        self.overrides = overrides or {}
+        self.clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._inflight: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        rate = float(os.getenv("ML_IDS_RATE_LIMIT_RPS", "200"))
+        burst = float(os.getenv("ML_IDS_RATE_LIMIT_BURST", str(rate * 2)))
+        concurrency = int(os.getenv("ML_IDS_RATE_LIMIT_CONCURRENCY", "32"))
+        default = RateLimit(rate, burst, concurrency)
+        overrides = {
+            key_id: RateLimit(r, b, c if c is not None else concurrency)
+            for key_id, (r, b, c) in _parse_overrides(os.getenv("ML_IDS_RATE_LIMITS", "")).items()
+        }
+        return cls(default, overrides)
+
+    def limit_for(self, key_id: str) -> RateLimit:
+        return self.overrides.get(key_id, self.default)
+
+    def acquire(self, key_id: str) -> Tuple[Optional[str], float]:
+        """Try to admit a request.
+
+        Returns ``(None, 0)`` when admitted (the caller must ``release``), or
+        ``(reason, retry_after_seconds)`` when rejected.
+        """
+        limit = self.limit_for(key_id)
+        if self._inflight.get(key_id, 0) >= limit.concurrency:
+            return "concurrency", 1.0
+
+        now = self.clock()
+        bucket = self._buckets.get(key_id)
+        if bucket is None:
+            bucket = self._buckets[key_id] = TokenBucket(limit.rate, limit.burst, now)
+        wait = bucket.try_acquire(now)
+        if wait > 0:
+            return "rate", wait
+
+        self._inflight[key_id] = self._inflight.get(key_id, 0) + 1
+        return None, 0.0
+
+    def release(self, key_id: str) -> None:
+        self._inflight[key_id] = max(0, self._inflight.get(key_id, 0) - 1)
+
+    def inflight(self, key_id: str) -> int:
+        return self._inflight.get(key_id, 0)
+
+
+def is_rate_limit_enabled() -> bool:
+    return os.getenv("ML_IDS_RATE_LIMIT_ENABLED", "false").lower() in ("true", "1", "yes")
+
+
+def rate_limited_paths() -> Tuple[str, ...]:
+    return tuple(p.strip() for p in os.getenv("ML_IDS_RATE_LIMIT_PATHS", "/predict").split(",") if p.strip())
+
+
+rate_limiter = RateLimiter.from_env()
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware applying ``RateLimiter`` to configured path prefixes.
+
+    Must be installed inside ``APIKeyMiddleware`` so the caller is already
+    identified when it runs. Paths in ``exclude`` hold a connection open for
+    a long time (``/predict/stream``) and charge their micro-batches
+    themselves instead.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None, exclude=("/predict/stream",)):
+        self.app = app
+        self.enabled = is_rate_limit_enabled()
+        self.limiter = limiter or rate_limiter
+        self.paths = rate_limited_paths()
+        self.exclude = tuple(exclude)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (not self.enabled or scope["type"] != "http" or not scope["path"].startswith(self.paths)
+                or scope["path"].startswith(self.exclude)):
+            await self.app(scope, receive, send)
+            return
+
+        key_id = scope.get("state", {}).get("api_key_id", ANONYMOUS_KEY_ID)
+        reason, retry_after = self.limiter.acquire(key_id)
+        if reason is not None:
+            RATE_LIMIT_REJECTED_TOTAL.labels(api_key=key_id, reason=reason).inc()
+            retry_after_header = str(max(1, math.ceil(retry_after))) if math.isfinite(retry_after) else "60"
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": f"Rate limit exceeded ({reason})"},
+                headers={"Retry-After": retry_after_header},
+            )
+            await response(scope, receive, send)
+            return
+
+        RATE_LIMIT_ADMITTED_TOTAL.labels(api_key=key_id).inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(key_id)
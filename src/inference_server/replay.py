@@ -0,0 +1,231 @@
+"""Offline replay: score captured traffic at full speed instead of in real time.
+
+Streams a pcap (through the in-process flow meter), a CICFlowMeter CSV
+such as ``data/CIC-IDS2017/Data.csv`` or a Parquet file of such flows in
+chunks, scores every chunk as one vectorized batch on a pool of worker
+processes, and appends the predictions to a Parquet file. Attack rows can optionally be stored as
+alerts with ``AlertService.create_alerts_bulk``. Each worker loads the
+model the same way the server does (``MODEL_ONNX_PATH``, MLflow, local
+cache, backend and cascade settings), so replayed predictions match live
+ones.
+
+Usage:
+    python -m src.inference_server.replay capture.pcap -o predictions.parquet
+    python -m src.inference_server.replay data/CIC-IDS2017/Data.csv --workers 8 --alerts
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .batch_scoring import _FIELD_FOR_COLUMN, REQUEST_FIELDS, predict_matrix
+from .model_manager import model_manager
+from .schemas import sanitize_feature_matrix
+
+logger = logging.getLogger(__name__)
+
+PCAP_EXTENSIONS = (".pcap", ".pcapng", ".cap")
+# Flow identifiers copied from the input to the output (CICFlowMeter CSV names)
+ID_COLUMNS = ("Flow ID", "Src IP", "Src Port", "Dst IP", "Dst Port", "Protocol", "Timestamp")
+
+
+@dataclass
+class Chunk:
+    """A batch of flows: float32 features (columns named by ``fields``) and identifiers."""
+
+    features: np.ndarray
+    fields: List[str]
+    ids: pd.DataFrame
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+
+def frame_to_chunk(frame: pd.DataFrame) -> Chunk:
+    """Split a CICFlowMeter frame into a feature matrix and identifier columns."""
+    frame.columns = frame.columns.str.strip()
+    columns, fields = [], []
+    for column in frame.columns:
+        field = _FIELD_FOR_COLUMN.get(column)
+        if field is not None and field not in fields:
+            columns.append(column)
+            fields.append(field)
+    if not fields:
+        raise ValueError("no FEATURE_MAPPING columns in input")
+    # Non-numeric cells (e.g. "Infinity" in older exports) become NaN, then 0
+    values = frame[columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32)
+    ids = frame[[c for c in ID_COLUMNS if c in frame.columns]].astype(str).reset_index(drop=True)
+    return Chunk(values, fields, ids)
+
+
+def read_csv_chunks(source, chunksize: int) -> Iterator[Chunk]:
+    """Chunks of a CSV path or binary file object."""
+    for frame in pd.read_csv(source, chunksize=chunksize, skipinitialspace=True, low_memory=False):
+        yield frame_to_chunk(frame)
+
+
+def read_parquet_chunks(path: str, chunksize: int) -> Iterator[Chunk]:
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+        yield frame_to_chunk(batch.to_pandas())
+
+
+def read_pcap_chunks(path: str, chunksize: int) -> Iterator[Chunk]:
+    from .flow_meter import iter_pcap
+
+    for batch in iter_pcap(path, batch_size=chunksize):
+        ids = pd.DataFrame(batch.flows, columns=["Src IP", "Src Port", "Dst IP", "Dst Port", "Protocol"])
+        ids["Timestamp"] = batch.start_times
+        yield Chunk(batch.features, REQUEST_FIELDS, ids)
+
+
+def read_chunks(path: str, chunksize: int = 65536) -> Iterator[Chunk]:
+    """Chunks of a pcap, Parquet or CSV file, chosen by extension."""
+    if path.lower().endswith(PCAP_EXTENSIONS):
+        return read_pcap_chunks(path, chunksize)
+    if path.lower().endswith(".parquet"):
+        return read_parquet_chunks(path, chunksize)
+    return read_csv_chunks(path, chunksize)
+
+
+class PredictionWriter:
+    """Appends the identifiers and predictions of scored chunks to a Parquet file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = None
+
+    def write(self, chunk: Chunk, predictions: np.ndarray) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(chunk.ids.assign(prediction=predictions), preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _init_worker():
+    logging.basicConfig(level=logging.WARNING)
+    model_manager.load_model()
+
+
+def _score(X: np.ndarray, fields: List[str]) -> np.ndarray:
+    return predict_matrix(model_manager.current, X, fields, "replay")
+
+
+def attack_alerts(chunk: Chunk, predictions: np.ndarray) -> List[dict]:
+    """``create_alerts_bulk`` input for the attack rows of a scored chunk."""
+    src = chunk.ids["Src IP"] if "Src IP" in chunk.ids else None
+    dst = chunk.ids["Dst IP"] if "Dst IP" in chunk.ids else None
+    return [
+        {
+            "attack_type": str(predictions[i]),
+            "src_ip": src.iat[i] if src is not None else "unknown",
+            "dst_ip": dst.iat[i] if dst is not None else None,
+            "features": dict(zip(chunk.fields, chunk.features[i].tolist())),
+        }
+        for i in np.flatnonzero(predictions != 0)
+    ]
+
+
+async def _store_alerts(alerts: List[dict]) -> int:
+    from . import database
+    from .alert_service import alert_service
+
+    async with database.async_session_maker() as db:
+        return len(await alert_service.create_alerts_bulk(db, alerts))
+
+
+async def replay(path: str, output: Optional[str] = None, chunksize: int = 65536,
+                 workers: Optional[int] = None, alerts: bool = False) -> dict:
+    """Score every flow in ``path``; returns throughput and result counts.
+
+    Args:
+        path: pcap/pcapng, CICFlowMeter CSV or Parquet file.
+        output: Parquet file for the identifiers and predictions.
+        chunksize: Flows per batch.
+        workers: Scoring processes (default: CPU count; 0 scores in-process).
+        alerts: Store attack rows as alerts (requires a database).
+    """
+    from . import database
+
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if alerts and not await database.init_db():
+        raise RuntimeError("--alerts needs a database (DATABASE_URL)")
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 0 else None
+    if pool is None:
+        model_manager.load_model()
+    writer = PredictionWriter(output) if output else None
+    stats = {"flows": 0, "attacks": 0, "alerts": 0}
+    start = time.perf_counter()
+
+    async def finish(chunk: Chunk, future) -> None:
+        predictions = await asyncio.wrap_future(future) if pool else future
+        stats["flows"] += len(predictions)
+        stats["attacks"] += int(np.count_nonzero(predictions != 0))
+        if writer is not None:
+            writer.write(chunk, predictions)
+        if alerts:
+            stats["alerts"] += await _store_alerts(attack_alerts(chunk, predictions))
+
+    try:
+        pending = deque()
+        for chunk in read_chunks(path, chunksize):
+            # Sanitize here too, so stored alert features match what was scored
+            sanitize_feature_matrix(chunk.features, chunk.fields)
+            if pool is None:
+                await finish(chunk, _score(chunk.features, chunk.fields))
+                continue
+            pending.append((chunk, pool.submit(_score, chunk.features, chunk.fields)))
+            # Bounded read-ahead keeps memory flat on day-long captures
+            while len(pending) > 2 * workers:
+                await finish(*pending.popleft())
+        while pending:
+            await finish(*pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if writer is not None:
+            writer.close()
+        if alerts:
+            await database.close_db()
+
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    stats["flows_per_second"] = round(stats["flows"] / stats["seconds"]) if stats["seconds"] else None
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="pcap/pcapng or CICFlowMeter CSV")
+    parser.add_argument("-o", "--output", help="Parquet file for the predictions")
+    parser.add_argument("--chunksize", type=int, default=65536)
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes (0: in-process)")
+    parser.add_argument("--alerts", action="store_true", help="store attack rows as alerts")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stats = asyncio.run(replay(args.input, args.output, args.chunksize, args.workers, args.alerts))
+    print(f"{stats['flows']} flows in {stats['seconds']}s ({stats['flows_per_second']} flows/s), "
+          f"{stats['attacks']} attacks, {stats['alerts']} alerts")
+
+
+if __name__ == "__main__":
+    main()
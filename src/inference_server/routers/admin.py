@@ -0,0 +1,48 @@
+"""
+API router for administrative endpoints.
+
+All routes require an admin API key (ML_IDS_ADMIN_API_KEYS).
+"""
+
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from ..auth import require_admin
+from ..profiler import StackSampler
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+# Only one profiling session at a time; concurrent samplers would double the overhead
+_profile_lock = asyncio.Lock()
+
+
+@router.get("/profile")
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=120, description="Sampling duration in seconds"),
+    interval_ms: float = Query(10.0, ge=1, le=1000, description="Sampling interval in milliseconds"),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$", description="Output format"),
+):
+    """
+    Sample the stacks of every server thread (event loop and executors) for
+    the given duration and return a collapsed-stack or speedscope profile.
+
+    The sampler runs in a worker thread so the event loop keeps serving
+    requests while it is being profiled.
+    """
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+
+    async with _profile_lock:
+        sampler = StackSampler(interval=interval_ms / 1000)
+        result = await asyncio.to_thread(sampler.run, seconds)
+
+    headers = {
+        "X-Profile-Samples": str(result.samples),
+        "X-Profile-Overhead": f"{result.overhead:.4f}",
+    }
+    if format == "speedscope":
+        headers["Content-Disposition"] = 'attachment; filename="mlids-profile.speedscope.json"'
+        return JSONResponse(result.to_speedscope(), headers=headers)
+    return PlainTextResponse(result.to_collapsed(), headers=headers)
@@ -0,0 +1,94 @@
+"""
+API router for asynchronous batch scoring jobs.
+"""
+
+import os
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+
+from ..schemas import ScoringJobResponse
+from ..scoring_jobs import scoring_jobs
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+def _response(job: dict) -> dict:
+    done = job["status"] == "completed" and os.path.exists(scoring_jobs.result_path(job["job_id"]))
+    return {**job, "result_url": f"/api/jobs/{job['job_id']}/result" if done else None}
+
+
+@router.post(
+    "/score",
+    response_model=ScoringJobResponse,
+    status_code=202,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
+async def submit_scoring_job(
+    request: Request,
+    filename: str = Query(..., description="Name of the uploaded file: .csv, .csv.gz or .parquet"),
+):
+    """
+    Upload a file of flows for background scoring.
+
+    The body is the raw CICFlowMeter CSV (optionally .gz) or Parquet file;
+    it is written to disk as it arrives, never parsed as a form. Columns may
+    use the CICFlowMeter feature names or the /predict field names; Flow
+    ID, Src/Dst IP and Port, Protocol and Timestamp columns are copied to
+    the result. Poll the returned job for progress.
+    """
+    length = request.headers.get("content-length")
+    content_length = int(length) if length and length.isdigit() else None
+    return _response(await scoring_jobs.submit(filename, request.stream(), content_length))
+
+
+@router.get("", response_model=List[ScoringJobResponse])
+async def list_scoring_jobs():
+    """
+    List scoring jobs, most recent first.
+    """
+    return [_response(job) for job in scoring_jobs.list_jobs()]
+
+
+@router.get("/{job_id}", response_model=ScoringJobResponse)
+async def get_scoring_job(job_id: str):
+    """
+    Get the status and progress of a scoring job.
+    """
+    job = scoring_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _response(job)
+
+
+@router.get("/{job_id}/result")
+async def download_scoring_result(job_id: str):
+    """
+    Download the predictions of a completed job as Parquet.
+    """
+    job = scoring_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    path = scoring_jobs.result_path(job_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Job produced no predictions")
+    return FileResponse(path, media_type="application/vnd.apache.parquet",
+                        filename=f"predictions-{job_id}.parquet")
+
+
+@router.delete("/{job_id}")
+async def cancel_scoring_job(job_id: str):
+    """
+    Cancel a job (a running job stops after its current chunk) and delete its files.
+    """
+    if not scoring_jobs.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"message": "Job deleted"}
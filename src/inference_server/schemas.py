@@ -1,8 +1,85 @@
 import math
-from pydantic import BaseModel, Field, field_validator, model_validator
-from typing import List, Optional
+from functools import lru_cache
+from pydantic import BaseModel, Field, create_model, field_validator, model_validator
+from typing import TYPE_CHECKING, FrozenSet, List, Optional, Sequence, Type
 
-class PredictionRequest(BaseModel):
+if TYPE_CHECKING:
+    import numpy as np
+
+# Fields that must be non-negative
+NON_NEGATIVE_FIELDS = frozenset({
+    "flow_duration", "tot_fwd_pkts", "tot_bwd_pkts",
+    "totlen_fwd_pkts", "totlen_bwd_pkts",
+    "fwd_pkt_len_max", "fwd_pkt_len_min", "fwd_pkt_len_mean",
+    "bwd_pkt_len_max", "bwd_pkt_len_min", "bwd_pkt_len_mean",
+    "pkt_len_min", "pkt_len_max", "pkt_len_mean",
+    "fwd_act_data_pkts",
+    "subflow_fwd_pkts", "subflow_fwd_byts",
+    "subflow_bwd_pkts", "subflow_bwd_byts",
+})
+
+# Flag fields that should be 0 or 1
+FLAG_FIELDS = frozenset({
+    "fin_flag_cnt", "syn_flag_cnt", "rst_flag_cnt", "psh_flag_cnt",
+    "ack_flag_cnt", "urg_flag_cnt", "cwr_flag_count", "ece_flag_cnt",
+})
+
+
+class FlowFeaturesBase(BaseModel):
+    """
+    Validation shared by PredictionRequest and its reduced-feature variants.
+
+    Declares no flow features itself; range checks skip fields a subclass
+    does not declare.
+    """
+    # Optional metadata for observability
+    src_ip: Optional[str] = Field(None, alias="src_ip")
+
+    # Validation warnings collected during model validation
+    _validation_warnings: List[str] = []
+
+    _NON_NEGATIVE_FIELDS = NON_NEGATIVE_FIELDS
+    _FLAG_FIELDS = FLAG_FIELDS
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def replace_nan_inf(cls, v, info):
+        """Replace NaN and Inf values with 0.0."""
+        if info.field_name == "src_ip":
+            return v
+        if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
+            return 0.0
+        return v
+
+    @model_validator(mode="after")
+    def validate_ranges(self):
+        """Clamp out-of-range values and collect warnings."""
+        warnings = []
+
+        for field_name in self._NON_NEGATIVE_FIELDS:
+            val = getattr(self, field_name, None)
+            if val is not None and val < 0:
+                warnings.append(f"{field_name}: negative value {val} clamped to 0")
+                setattr(self, field_name, 0.0)
+
+        for field_name in self._FLAG_FIELDS:
+            val = getattr(self, field_name, None)
+            if val is not None:
+                if val < 0:
+                    warnings.append(f"{field_name}: value {val} clamped to 0")
+                    setattr(self, field_name, 0.0)
+                elif val > 1:
+                    warnings.append(f"{field_name}: value {val} clamped to 1")
+                    setattr(self, field_name, 1.0)
+
+        self._validation_warnings = warnings
+        return self
+
+    class Config:
+        populate_by_name = True
+
+
+class PredictionRequest(FlowFeaturesBase):
     """
     Pydantic model for prediction request features.
     Defaults are set to 0.0 to allow partial updates and backward compatibility,
@@ -84,67 +161,117 @@ class PredictionRequest(BaseModel):
     idle_std: float = Field(0.0, alias="idle_std")
     idle_max: float = Field(0.0, alias="idle_max")
     idle_min: float = Field(0.0, alias="idle_min")
-    
-    # Optional metadata for observability
-    src_ip: Optional[str] = Field(None, alias="src_ip")
 
-    # Validation warnings collected during model validation
-    _validation_warnings: List[str] = []
 
-    # Fields that must be non-negative
-    _NON_NEGATIVE_FIELDS = {
-        "flow_duration", "tot_fwd_pkts", "tot_bwd_pkts",
-        "totlen_fwd_pkts", "totlen_bwd_pkts",
-        "fwd_pkt_len_max", "fwd_pkt_len_min", "fwd_pkt_len_mean",
-        "bwd_pkt_len_max", "bwd_pkt_len_min", "bwd_pkt_len_mean",
-        "pkt_len_min", "pkt_len_max", "pkt_len_mean",
-        "fwd_act_data_pkts",
-        "subflow_fwd_pkts", "subflow_fwd_byts",
-        "subflow_bwd_pkts", "subflow_bwd_byts",
-    }
+def sanitize_feature_matrix(X: "np.ndarray", fields: Sequence[str]) -> "np.ndarray":
+    """Apply PredictionRequest's value rules to a float matrix in place.
 
-    # Flag fields that should be 0 or 1
-    _FLAG_FIELDS = {
-        "fin_flag_cnt", "syn_flag_cnt", "rst_flag_cnt", "psh_flag_cnt",
-        "ack_flag_cnt", "urg_flag_cnt", "cwr_flag_count", "ece_flag_cnt",
-    }
+    ``fields`` names the columns of ``X`` (request field names). NaN/Inf
+    become 0, non-negative fields are clamped at 0 and flags to [0, 1],
+    without collecting per-row warnings.
+    """
+    import numpy as np
 
-    @field_validator("*", mode="before")
-    @classmethod
-    def replace_nan_inf(cls, v, info):
-        """Replace NaN and Inf values with 0.0."""
-        if info.field_name == "src_ip":
-            return v
-        if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
-            return 0.0
-        return v
+    np.nan_to_num(X, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    non_negative = [i for i, f in enumerate(fields) if f in NON_NEGATIVE_FIELDS]
+    flags = [i for i, f in enumerate(fields) if f in FLAG_FIELDS]
+    if non_negative:
+        X[:, non_negative] = np.maximum(X[:, non_negative], 0.0)
+    if flags:
+        X[:, flags] = np.clip(X[:, flags], 0.0, 1.0)
+    return X
 
-    @model_validator(mode="after")
-    def validate_ranges(self):
-        """Clamp out-of-range values and collect warnings."""
+
+# Bit i of a row's warning mask: WARNING_FIELDS[i] was out of range and clamped
+WARNING_FIELDS = tuple(sorted(NON_NEGATIVE_FIELDS)) + tuple(sorted(FLAG_FIELDS))
+
+
+class MatrixWarnings:
+    """Per-row validation warnings of a feature matrix.
+
+    ``masks`` holds one bitmask per row over WARNING_FIELDS. The original
+    values are kept only for rows with warnings, so messages can be
+    rendered on demand, worded as PredictionRequest's.
+    """
+
+    def __init__(self, masks: "np.ndarray", rows: "np.ndarray", values: "np.ndarray", bits: Sequence[int]):
+        self.masks = masks
+        self._row_index = {int(row): k for k, row in enumerate(rows)}
+        self._values = values
+        self._bits = list(bits)
+
+    def __bool__(self) -> bool:
+        return bool(self._row_index)
+
+    def messages(self, row: int) -> List[str]:
+        """Warnings of one row, as PredictionRequest.validate_ranges words them."""
+        k = self._row_index.get(row)
+        if k is None:
+            return []
+        # numpy scalars print float32 values the way a JSON client wrote them (-0.1, not -0.10000000149)
+        mask, values = int(self.masks[row]), self._values[k]
         warnings = []
+        for col, bit in enumerate(self._bits):
+            if not mask >> bit & 1:
+                continue
+            field, val = WARNING_FIELDS[bit], values[col]
+            if field in NON_NEGATIVE_FIELDS:
+                warnings.append(f"{field}: negative value {val!s} clamped to 0")
+            else:
+                warnings.append(f"{field}: value {val!s} clamped to {0 if val < 0 else 1}")
+        return warnings
 
-        for field_name in self._NON_NEGATIVE_FIELDS:
-            val = getattr(self, field_name, None)
-            if val is not None and val < 0:
-                warnings.append(f"{field_name}: negative value {val} clamped to 0")
-                setattr(self, field_name, 0.0)
+    def to_lists(self) -> List[List[str]]:
+        """Warnings of every row."""
+        return [self.messages(i) for i in range(len(self.masks))]
 
-        for field_name in self._FLAG_FIELDS:
-            val = getattr(self, field_name, None)
-            if val is not None:
-                if val < 0:
-                    warnings.append(f"{field_name}: value {val} clamped to 0")
-                    setattr(self, field_name, 0.0)
-                elif val > 1:
-                    warnings.append(f"{field_name}: value {val} clamped to 1")
-                    setattr(self, field_name, 1.0)
 
-        self._validation_warnings = warnings
-        return self
+def validate_feature_matrix(X: "np.ndarray", fields: Sequence[str]) -> MatrixWarnings:
+    """Apply PredictionRequest's value rules to a float matrix in place, with warnings.
+
+    Same rules as ``sanitize_feature_matrix``; clamping a value records a
+    warning bit for its row, as ``validate_ranges`` records a message for a
+    single request. NaN/Inf are replaced silently, as in ``replace_nan_inf``.
+    """
+    import numpy as np
+
+    np.nan_to_num(X, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    checked = [(i, WARNING_FIELDS.index(f)) for i, f in enumerate(fields) if f in WARNING_FIELDS]
+    columns = [i for i, _ in checked]
+    bits = [bit for _, bit in checked]
+    if not checked:
+        empty = np.zeros(0, dtype=np.intp)
+        return MatrixWarnings(np.zeros(len(X), dtype=np.uint64), empty, X[:0, :0], bits)
+
+    sub = X[:, columns]
+    is_flag = np.array([WARNING_FIELDS[bit] in FLAG_FIELDS for bit in bits])
+    clamped = (sub < 0) | (is_flag & (sub > 1))
+    masks = clamped.astype(np.uint64) @ (np.uint64(1) << np.asarray(bits, dtype=np.uint64))
+    rows = np.flatnonzero(masks)
+    values = sub[rows]
+    if rows.size:
+        np.maximum(sub, 0.0, out=sub)
+        np.minimum(sub, np.where(is_flag, 1.0, np.inf).astype(X.dtype), out=sub)
+        X[:, columns] = sub
+    return MatrixWarnings(masks, rows, values, bits)
 
-    class Config:
-        populate_by_name = True
+
+@lru_cache(maxsize=8)
+def request_model_for(fields: FrozenSet[str]) -> Type[FlowFeaturesBase]:
+    """A PredictionRequest variant that declares only ``fields`` (plus src_ip).
+
+    Used for models trained on a feature subset: other keys in the request
+    body are skipped by the JSON parser instead of being validated, clamped
+    and mapped. Returns PredictionRequest itself when ``fields`` covers it.
+    """
+    all_fields = set(PredictionRequest.model_fields) - {"src_ip"}
+    if all_fields <= fields:
+        return PredictionRequest
+    declared = {
+        name: (float, Field(0.0, alias=name))
+        for name in PredictionRequest.model_fields if name in fields
+    }
+    return create_model(f"PredictionRequest{len(declared)}", __base__=FlowFeaturesBase, **declared)
 
 
 # Alert and Incident Schemas
@@ -220,3 +347,23 @@ class IncidentUpdate(BaseModel):
     severity: Optional[str] = None
     assigned_to: Optional[str] = None
     notes: Optional[str] = None
+
+
+# Scoring Job Schemas
+
+class ScoringJobResponse(BaseModel):
+    """Response model for a batch scoring job"""
+    job_id: str
+    status: str
+    filename: str
+    format: str
+    input_bytes: int
+    rows_scored: int
+    attacks: int
+    progress: float
+    model_version: Optional[str]
+    error: Optional[str]
+    created_at: str
+    started_at: Optional[str]
+    finished_at: Optional[str]
+    result_url: Optional[str]
@@ -0,0 +1,312 @@
+"""Asynchronous scoring jobs for uploaded CICFlowMeter CSV or Parquet files.
+
+``POST /api/jobs/score`` takes the file as the raw request body, writes
+it to ``SCORING_JOBS_DIR`` as it arrives and returns at once. A body over
+``SCORING_JOBS_MAX_UPLOAD_MB`` is refused from its ``Content-Length``
+before any of it is read, or as soon as it grows past the limit. A
+background task then reads the file in chunks of ``SCORING_JOBS_CHUNK_ROWS``
+flows and scores each chunk as one vectorized batch off the event loop,
+through ``batch_scoring``. The model that was
+serving when the job started is used for all of its chunks. Identifiers
+and predictions are appended to a Parquet result file, so neither the
+upload nor the result is ever held in memory.
+
+Each job's state lives in ``<SCORING_JOBS_DIR>/<job id>/job.json``, which
+is rewritten after every chunk. Any worker can therefore report progress,
+serve the result or cancel a job, whichever worker accepted the upload.
+At most ``SCORING_JOBS_CONCURRENCY`` jobs run at once per worker. Only
+the ``SCORING_JOBS_RETAIN`` most recent finished jobs are kept.
+
+A job records the worker (host and pid) that runs it. When a worker
+starts, a queued or running job whose worker on this host has exited
+(after a crash or a restart), or whose state has not been written for
+``SCORING_JOBS_STALE_HOURS`` (a worker on another host), is marked failed
+and its upload is deleted.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import tempfile
+import time
+import uuid
+from datetime import datetime as _dt
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException
+
+from .model_manager import model_manager
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {".csv": "csv", ".csv.gz": "csv", ".parquet": "parquet"}
+FINISHED = ("completed", "failed", "cancelled")
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _input_format(filename: str) -> Optional[str]:
+    name = filename.lower()
+    for ext, fmt in FORMATS.items():
+        if name.endswith(ext):
+            return fmt
+    return None
+
+
+class ScoringJobManager:
+    """Accepts uploads, runs scoring jobs and reports their state."""
+
+    def __init__(self, directory: str, max_upload_bytes: int = 10 << 30, chunk_rows: int = 65536,
+                 concurrency: int = 1, retain: int = 50, stale_after: float = 86400.0):
+        self.directory = directory
+        self.max_upload_bytes = max_upload_bytes
+        self.chunk_rows = chunk_rows
+        self.retain = retain
+        self.stale_after = stale_after
+        self._concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+        self._worker = f"{socket.gethostname()}:{os.getpid()}"
+
+    @classmethod
+    def from_env(cls) -> "ScoringJobManager":
+        return cls(
+            directory=os.getenv("SCORING_JOBS_DIR", os.path.join(tempfile.gettempdir(), "mlids-scoring-jobs")),
+            max_upload_bytes=int(float(os.getenv("SCORING_JOBS_MAX_UPLOAD_MB", "10240")) * (1 << 20)),
+            chunk_rows=int(os.getenv("SCORING_JOBS_CHUNK_ROWS", "65536")),
+            concurrency=int(os.getenv("SCORING_JOBS_CONCURRENCY", "1")),
+            retain=int(os.getenv("SCORING_JOBS_RETAIN", "50")),
+            stale_after=float(os.getenv("SCORING_JOBS_STALE_HOURS", "24")) * 3600,
+        )
+
+    # ---- Job state on disk ----
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id)
+
+    def _save(self, job: dict) -> None:
+        path = os.path.join(self._job_dir(job["job_id"]), "job.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(job, f)
+        os.replace(tmp, path)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        if not _JOB_ID.fullmatch(job_id):
+            return None
+        try:
+            with open(os.path.join(self._job_dir(job_id), "job.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def list_jobs(self) -> List[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        jobs = [job for job in map(self.get, os.listdir(self.directory)) if job is not None]
+        return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+    def result_path(self, job_id: str) -> str:
+        return os.path.join(self._job_dir(job_id), "predictions.parquet")
+
+    def _cancel_path(self, job_id: str) -> str:
+        return os.path.join(self._job_dir(job_id), "cancel")
+
+    # ---- API ----
+
+    async def submit(self, filename: str, body: AsyncIterator[bytes],
+                     content_length: Optional[int] = None) -> dict:
+        """Write an upload body to disk as it arrives and queue it for scoring."""
+        fmt = _input_format(filename or "")
+        if fmt is None:
+            raise HTTPException(status_code=400, detail=f"Unsupported file type, expected one of {sorted(FORMATS)}")
+        if content_length is not None and content_length > self.max_upload_bytes:
+            raise HTTPException(status_code=413, detail="Upload exceeds SCORING_JOBS_MAX_UPLOAD_MB")
+
+        job_id = uuid.uuid4().hex
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+        input_path = os.path.join(job_dir, "input" + (".parquet" if fmt == "parquet" else ".csv"))
+        if filename.lower().endswith(".gz"):
+            input_path += ".gz"
+
+        size = 0
+        try:
+            with open(input_path, "wb") as out:
+                async for data in body:
+                    size += len(data)
+                    if size > self.max_upload_bytes:
+                        raise HTTPException(status_code=413, detail="Upload exceeds SCORING_JOBS_MAX_UPLOAD_MB")
+                    if data:
+                        await asyncio.to_thread(out.write, data)
+        except BaseException:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "filename": filename,
+            "format": fmt,
+            "input_bytes": size,
+            "rows_scored": 0,
+            "attacks": 0,
+            "progress": 0.0,
+            "model_version": None,
+            "error": None,
+            "worker": self._worker,
+            "created_at": _dt.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self._save(job)
+        self._prune()
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        task = asyncio.create_task(self._run(job, input_path), name=job_id)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        logger.info(f"Scoring job {job_id} queued: {filename} ({size} bytes)")
+        return job
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancel a job and delete its files (a running job stops after its current chunk)."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job["status"] == "running":
+            open(self._cancel_path(job_id), "w").close()
+        else:
+            shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+        return job
+
+    # ---- Execution ----
+
+    async def _run(self, job: dict, input_path: str) -> None:
+        async with self._semaphore:
+            if os.path.isdir(self._job_dir(job["job_id"])):
+                await asyncio.to_thread(self._score, job, input_path)
+
+    def _score(self, job: dict, input_path: str) -> None:
+        from .batch_scoring import predict_matrix
+        from .replay import PredictionWriter, read_csv_chunks, read_parquet_chunks
+
+        job_id = job["job_id"]
+        writer = PredictionWriter(self.result_path(job_id) + ".tmp")
+        try:
+            job.update(status="running", started_at=_dt.utcnow().isoformat())
+            self._save(job)
+            if not model_manager.initialized:
+                model_manager.load_model()
+            current = model_manager.current
+            job["model_version"] = current.version
+
+            if job["format"] == "parquet":
+                import pyarrow.parquet as pq
+
+                total_rows = pq.ParquetFile(input_path).metadata.num_rows
+                chunks, handle = read_parquet_chunks(input_path, self.chunk_rows), None
+            else:
+                # Progress is the position in the (compressed) upload
+                total_rows = None
+                handle = open(input_path, "rb")
+                source = gzip.GzipFile(fileobj=handle) if input_path.endswith(".gz") else handle
+                chunks = read_csv_chunks(source, self.chunk_rows)
+
+            try:
+                for chunk in chunks:
+                    if os.path.exists(self._cancel_path(job_id)):
+                        job["status"] = "cancelled"
+                        break
+                    predictions = predict_matrix(current, chunk.features, chunk.fields, "scoring_job")
+                    writer.write(chunk, predictions)
+                    job["rows_scored"] += len(predictions)
+                    job["attacks"] += int((predictions != 0).sum())
+                    if total_rows:
+                        job["progress"] = round(job["rows_scored"] / total_rows, 4)
+                    elif handle is not None:
+                        job["progress"] = round(min(handle.tell() / max(job["input_bytes"], 1), 1.0), 4)
+                    self._save(job)
+            finally:
+                if handle is not None:
+                    handle.close()
+            writer.close()
+        except Exception as e:
+            writer.close()
+            if not os.path.isdir(self._job_dir(job_id)):
+                # Cancelled while queued: its directory is already gone
+                job["status"] = "cancelled"
+            else:
+                logger.error(f"Scoring job {job_id} failed: {e}")
+                job.update(status="failed", error=getattr(e, "detail", None) or str(e) or type(e).__name__)
+
+        if job["status"] == "cancelled":
+            shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+            logger.info(f"Scoring job {job_id} cancelled")
+            return
+        if job["status"] == "running":
+            if os.path.exists(writer.path):
+                os.replace(writer.path, self.result_path(job_id))
+            job.update(status="completed", progress=1.0)
+            logger.info(f"Scoring job {job_id} completed: {job['rows_scored']} flows, {job['attacks']} attacks")
+        job["finished_at"] = _dt.utcnow().isoformat()
+        # The upload is no longer needed; the result stays until pruned
+        for path in (input_path, writer.path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._save(job)
+
+    def _orphaned(self, job: dict) -> bool:
+        """Whether an unfinished job has lost the worker that was running it."""
+        if job["status"] in FINISHED:
+            return False
+        host, _, pid = (job.get("worker") or "").rpartition(":")
+        if host != socket.gethostname() or not pid.isdigit():
+            # Another host's worker cannot be checked; rely on its state being rewritten
+            path = os.path.join(self._job_dir(job["job_id"]), "job.json")
+            return time.time() - os.path.getmtime(path) > self.stale_after
+        if int(pid) == os.getpid():
+            # Same pid as a previous run (e.g. pid 1 in a container): live only if queued here
+            return job["job_id"] not in {task.get_name() for task in self._tasks}
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def recover(self) -> int:
+        """Fail the jobs left queued or running by a worker that exited, and prune."""
+        recovered = 0
+        for job in self.list_jobs():
+            try:
+                if not self._orphaned(job):
+                    continue
+                job.update(status="failed", error="Worker exited before the job finished",
+                           finished_at=_dt.utcnow().isoformat())
+                job_dir = self._job_dir(job["job_id"])
+                for name in os.listdir(job_dir):
+                    if name.startswith("input") or name.endswith(".tmp"):
+                        os.remove(os.path.join(job_dir, name))
+                self._save(job)
+            except FileNotFoundError:
+                # Deleted meanwhile
+                continue
+            recovered += 1
+            logger.warning(f"Scoring job {job['job_id']} failed: worker {job.get('worker')} exited")
+        self._prune()
+        return recovered
+
+    def _prune(self) -> None:
+        finished = [job for job in self.list_jobs() if job["status"] in FINISHED]
+        for job in finished[self.retain:]:
+            shutil.rmtree(self._job_dir(job["job_id"]), ignore_errors=True)
+
+
+scoring_jobs = ScoringJobManager.from_env()
@@ -0,0 +1,205 @@
+"""OpenTelemetry tracing for the predict → alert → notify → broadcast path.
+
+Tracing is off unless ``ML_IDS_TRACING_ENABLED`` is true; the API then hands
+out non-recording spans and instrumentation costs next to nothing.
+
+When enabled, finished spans go through ``TailSamplingSpanProcessor``, which
+holds each trace until its local root span ends and then keeps it if it was
+slow (``ML_IDS_TRACING_SLOW_MS``, default 500) or contains an error, plus a
+``ML_IDS_TRACING_SAMPLE_RATE`` fraction (default 0.01) of the rest.
+
+Exporters (``ML_IDS_TRACING_EXPORTER``):
+    file     JSON lines to ``ML_IDS_TRACING_FILE`` (default $LOG_DIR/traces.jsonl)
+    otlp     OTLP/HTTP to ``OTEL_EXPORTER_OTLP_ENDPOINT``; needs the optional
+             ``opentelemetry-exporter-otlp-proto-http`` package
+    console  stdout, for local debugging
+"""
+
+import functools
+import logging
+import os
+import random
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Optional, Sequence
+
+from opentelemetry import trace
+from opentelemetry.trace import Status, StatusCode
+
+from .metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("ml-ids")
+
+_provider = None
+
+
+def traced(name: str):
+    """Decorator running an async function inside a span called ``name``."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def traced_stage(stage: str):
+    """Time a pipeline stage into PREDICT_STAGE_LATENCY and wrap it in a span."""
+    with tracer.start_as_current_span(f"stage.{stage}"), stage_timer(stage):
+        yield
+
+
+def mark_span_error(description: str) -> None:
+    """Flag the current span as failed (for errors that are not exceptions)."""
+    trace.get_current_span().set_status(Status(StatusCode.ERROR, description))
+
+
+def _is_local_root(span) -> bool:
+    return span.parent is None or span.parent.is_remote
+
+
+class TailSamplingSpanProcessor:
+    """Buffers spans per trace and decides what to keep once the root ends.
+
+    Kept traces are forwarded span by span to ``delegate`` (normally a
+    ``BatchSpanProcessor``), so export stays off the request path.
+    """
+
+    def __init__(
+        self,
+        delegate,
+        slow_threshold_ms: float = 500.0,
+        sample_rate: float = 0.01,
+        max_pending_traces: int = 10000,
+        rng: Optional[random.Random] = None,
+    ):
+        self.delegate = delegate
+        self.slow_threshold_ns = int(slow_threshold_ms * 1_000_000)
+        self.sample_rate = sample_rate
+        self.max_pending_traces = max_pending_traces
+        self._pending: "OrderedDict[int, List]" = OrderedDict()
+        # Decisions for finished traces, so late child spans follow their root
+        self._decided: "OrderedDict[int, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._rng = rng or random.Random()
+
+    def on_start(self, span, parent_context=None) -> None:
+        self.delegate.on_start(span, parent_context=parent_context)
+
+    def _keep(self, root, spans: Sequence) -> bool:
+        if root.end_time - root.start_time >= self.slow_threshold_ns:
+            return True
+        if any(s.status.status_code == StatusCode.ERROR for s in spans):
+            return True
+        return self._rng.random() < self.sample_rate
+
+    def on_end(self, span) -> None:
+        trace_id = span.context.trace_id
+        with self._lock:
+            decided = self._decided.get(trace_id)
+            if decided is not None:
+                spans = [span] if decided else []
+            elif not _is_local_root(span):
+                self._pending.setdefault(trace_id, []).append(span)
+                while len(self._pending) > self.max_pending_traces:
+                    self._pending.popitem(last=False)
+                return
+            else:
+                spans = self._pending.pop(trace_id, [])
+                spans.append(span)
+                keep = self._keep(span, spans)
+                self._decided[trace_id] = keep
+                while len(self._decided) > self.max_pending_traces:
+                    self._decided.popitem(last=False)
+                if not keep:
+                    spans = []
+
+        for s in spans:
+            self.delegate.on_end(s)
+
+    def shutdown(self) -> None:
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
+
+
+class JsonLinesSpanExporter:
+    """Writes each span as one JSON object per line (a local collector stand-in)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        try:
+            lines = [span.to_json(indent=None) for span in spans]
+            with self._lock, open(self.path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+            return SpanExportResult.SUCCESS
+        except Exception as e:
+            logger.warning(f"Failed to export spans to {self.path}: {e}")
+            return SpanExportResult.FAILURE
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+def _make_exporter(kind: str):
+    if kind == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            return OTLPSpanExporter()
+        except ImportError:
+            logger.warning("opentelemetry-exporter-otlp-proto-http not installed, exporting traces to file")
+    elif kind == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        return ConsoleSpanExporter()
+
+    log_dir = os.environ.get("LOG_DIR", "/app/logs")
+    path = os.getenv("ML_IDS_TRACING_FILE", os.path.join(log_dir, "traces.jsonl"))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return JsonLinesSpanExporter(path)
+
+
+def configure_tracing() -> bool:
+    """Install the SDK tracer provider if tracing is enabled. Returns True if installed."""
+    global _provider
+    if os.getenv("ML_IDS_TRACING_ENABLED", "false").lower() not in ("true", "1", "yes"):
+        return False
+    if _provider is not None:
+        return True
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    exporter = _make_exporter(os.getenv("ML_IDS_TRACING_EXPORTER", "file").lower())
+    processor = TailSamplingSpanProcessor(
+        BatchSpanProcessor(exporter),
+        slow_threshold_ms=float(os.getenv("ML_IDS_TRACING_SLOW_MS", "500")),
+        sample_rate=float(os.getenv("ML_IDS_TRACING_SAMPLE_RATE", "0.01")),
+    )
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "ml-ids")})
+    )
+    _provider.add_span_processor(processor)
+    trace.set_tracer_provider(_provider)
+    logger.info(f"Tracing enabled ({type(exporter).__name__})")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush and stop the tracer provider, if one was installed."""
+    if _provider is not None:
+        _provider.shutdown()
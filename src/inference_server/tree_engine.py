@@ -0,0 +1,328 @@
+"""Array-backed inference engine for tree-ensemble classifiers.
+
+``CompiledTreeEnsemble`` flattens every tree of a fitted ensemble into shared
+contiguous node arrays and scores a batch by walking all rows through all
+trees at once, one numpy step per tree level. That removes the per-call
+validation, per-tree Python loop and joblib dispatch of the stock
+``predict``, which dominate latency for the single-flow requests the server
+mostly sees.
+
+Supported estimators:
+    sklearn  DecisionTreeClassifier, RandomForestClassifier, ExtraTreesClassifier
+    xgboost  XGBClassifier (gbtree booster; duck-typed, xgboost is not imported)
+
+All (row, tree) pairs descend one level per numpy step and leave the active
+set at their leaf. Missing values (NaN) follow each split's learned default
+direction. Rows are processed in chunks to bound the size of the
+``rows x trees`` node matrix.
+
+The array walk wins clearly for the small batches the server mostly scores;
+for large batches the estimator's native loops are faster, so batches above
+``max_batch`` rows are delegated to the original estimator.
+"""
+
+import json
+from typing import Optional
+
+import numpy as np
+
+# Upper bound on rows * trees per traversal chunk (~8 MB per node index array)
+_CHUNK_CELLS = 1 << 20
+
+SKLEARN_ENSEMBLES = ("DecisionTreeClassifier", "RandomForestClassifier", "ExtraTreesClassifier")
+
+
+class UnsupportedModelError(TypeError):
+    """The estimator cannot be converted to a CompiledTreeEnsemble."""
+
+
+class CompiledTreeEnsemble:
+    """A tree ensemble flattened into arrays, with a vectorized ``predict``.
+
+    Exposes ``predict``, ``classes_`` and ``feature_names_in_`` so it can stand
+    in for the original estimator, which is kept as ``estimator``.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        missing_left: np.ndarray,
+        leaf_value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        classes: np.ndarray,
+        aggregation: str,
+        strict: bool,
+        estimator,
+        group_starts: Optional[np.ndarray] = None,
+        base_margin: Optional[np.ndarray] = None,
+        max_batch: Optional[int] = None,
+    ):
+        self.feature = feature.astype(np.intp)
+        self.threshold = threshold
+        self.left = left.astype(np.intp)
+        self.right = right.astype(np.intp)
+        self.is_leaf = self.left == np.arange(len(self.left))
+        self.missing_left = missing_left
+        self.leaf_value = leaf_value
+        self.roots = roots.astype(np.intp)
+        self.max_depth = max_depth
+        self.classes_ = classes
+        # "mean_proba": average per-tree class distributions (sklearn forests)
+        # "margin": sum leaf margins per class group (gradient boosting)
+        self.aggregation = aggregation
+        # xgboost goes left on x < threshold, sklearn on x <= threshold
+        self.strict = strict
+        self.estimator = estimator
+        self.group_starts = group_starts
+        self.base_margin = base_margin
+        # Larger batches go to the estimator, whose native loops win there
+        self.max_batch = max_batch
+        if hasattr(estimator, "feature_names_in_"):
+            self.feature_names_in_ = estimator.feature_names_in_
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    # ------------------------------------------------------------------
+    # Conversion
+
+    @classmethod
+    def from_estimator(cls, estimator) -> "CompiledTreeEnsemble":
+        """Convert a fitted estimator; raises UnsupportedModelError otherwise."""
+        name = type(estimator).__name__
+        if name in SKLEARN_ENSEMBLES:
+            return cls._from_sklearn(estimator)
+        if name == "XGBClassifier":
+            return cls._from_xgboost(estimator)
+        raise UnsupportedModelError(f"No compiled backend for {name}")
+
+    @classmethod
+    def _from_sklearn(cls, estimator) -> "CompiledTreeEnsemble":
+        if getattr(estimator, "n_outputs_", 1) != 1:
+            raise UnsupportedModelError("Multi-output trees are not supported")
+        trees = getattr(estimator, "estimators_", None) or [estimator]
+        n_classes = len(estimator.classes_)
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for tree_est in trees:
+            tree = tree_est.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left < 0
+            idx = np.arange(n, dtype=np.int32) + offset
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(_float32_floor(tree.threshold))
+            lefts.append(np.where(is_leaf, idx, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, idx, tree.children_right + offset).astype(np.int32))
+            missing.append(np.asarray(getattr(tree, "missing_go_to_left", np.zeros(n)), dtype=bool))
+
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            values.append(np.divide(value, totals, out=np.zeros_like(value), where=totals > 0))
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        leaf_value = np.concatenate(values)
+        if leaf_value.shape[1] != n_classes:
+            raise UnsupportedModelError("Trees disagree with the ensemble on the number of classes")
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            missing_left=np.concatenate(missing),
+            leaf_value=leaf_value,
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            classes=np.asarray(estimator.classes_),
+            aggregation="mean_proba",
+            strict=False,
+            estimator=estimator,
+        )
+
+    @classmethod
+    def _from_xgboost(cls, estimator) -> "CompiledTreeEnsemble":
+        booster = estimator.get_booster()
+        model = json.loads(bytes(booster.save_raw("json")))
+        gbm = model["learner"]["gradient_booster"]
+        if gbm.get("name") != "gbtree":
+            raise UnsupportedModelError(f"Unsupported xgboost booster {gbm.get('name')}")
+        trees = gbm["model"]["trees"]
+        tree_info = np.asarray(gbm["model"]["tree_info"], dtype=np.int32)
+
+        # predict() stops at the best iteration when early stopping was used
+        try:
+            best = estimator.best_iteration
+        except AttributeError:
+            best = None
+        if best is not None and "iteration_indptr" in gbm["model"]:
+            n_used = gbm["model"]["iteration_indptr"][best + 1]
+            trees, tree_info = trees[:n_used], tree_info[:n_used]
+
+        if any(t.get("categories_nodes") for t in trees):
+            raise UnsupportedModelError("Categorical splits are not supported")
+
+        # Group trees by output class so margins can be summed with reduceat
+        order = np.argsort(tree_info, kind="stable")
+        n_groups = int(tree_info.max()) + 1 if len(tree_info) else 1
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for i in order:
+            t = trees[i]
+            left = np.asarray(t["left_children"], dtype=np.int32)
+            right = np.asarray(t["right_children"], dtype=np.int32)
+            cond = np.asarray(t["split_conditions"], dtype=np.float32)
+            is_leaf = left < 0
+            n = len(left)
+            idx = np.arange(n, dtype=np.int32) + offset
+
+            features.append(np.where(is_leaf, 0, t["split_indices"]).astype(np.int32))
+            thresholds.append(cond)
+            lefts.append(np.where(is_leaf, idx, left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, idx, right + offset).astype(np.int32))
+            missing.append(np.asarray(t["default_left"], dtype=bool))
+            # Leaf values are stored in split_conditions
+            values.append(np.where(is_leaf, cond, 0.0).astype(np.float64))
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, _depth(left, right))
+
+        sorted_info = tree_info[order]
+        group_starts = np.searchsorted(sorted_info, np.arange(n_groups)).astype(np.int64)
+        if len(np.unique(sorted_info)) != n_groups:
+            raise UnsupportedModelError("Every output group needs at least one tree")
+
+        compiled = cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            missing_left=np.concatenate(missing),
+            leaf_value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            classes=np.asarray(getattr(estimator, "classes_", np.arange(max(n_groups, 2)))),
+            aggregation="margin",
+            strict=True,
+            estimator=estimator,
+            group_starts=group_starts,
+            base_margin=np.zeros(n_groups),
+        )
+        # The base score's encoding differs between xgboost versions and
+        # objectives, so measure it: booster margin minus the summed leaves.
+        probe = np.zeros((1, booster.num_features()), dtype=np.float32)
+        margin = np.asarray(
+            booster.inplace_predict(probe, predict_type="margin",
+                                    iteration_range=(0, best + 1) if best is not None else (0, 0)),
+            dtype=np.float64,
+        ).reshape(1, -1)
+        compiled.base_margin = margin[0] - compiled._scores(probe)[0]
+        return compiled
+
+    # ------------------------------------------------------------------
+    # Inference
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf index reached in every tree, shape (rows, trees).
+
+        All (row, tree) pairs advance one level per step; pairs that reach a
+        leaf drop out of the active set, so the work is proportional to the
+        actual path lengths rather than the deepest tree.
+        """
+        n, n_features = X.shape
+        flat = X.ravel()
+        node = np.tile(self.roots, n)
+        row_offset = np.repeat(np.arange(n, dtype=np.intp) * n_features, self.n_trees)
+        has_nan = np.isnan(flat).any()
+        active = np.flatnonzero(~self.is_leaf[node])
+        while active.size:
+            current = node[active]
+            x = flat[row_offset[active] + self.feature[current]]
+            thr = self.threshold[current]
+            go_left = x < thr if self.strict else x <= thr
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.missing_left[current], go_left)
+            nxt = np.where(go_left, self.left[current], self.right[current])
+            node[active] = nxt
+            active = active[~self.is_leaf[nxt]]
+        return node.reshape(n, self.n_trees)
+
+    def _scores(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities (forests) or margins (boosting), shape (rows, groups)."""
+        chunk = max(1, _CHUNK_CELLS // max(self.n_trees, 1))
+        out = []
+        for start in range(0, X.shape[0], chunk):
+            leaves = self._leaves(X[start:start + chunk])
+            if self.aggregation == "mean_proba":
+                out.append(self.leaf_value[leaves].mean(axis=1))
+            else:
+                sums = np.add.reduceat(self.leaf_value[leaves], self.group_starts, axis=1)
+                out.append(sums + self.base_margin)
+        return np.concatenate(out) if out else np.zeros((0, len(self.classes_)))
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.aggregation != "mean_proba":
+            raise AttributeError("predict_proba is only available for forests")
+        return self._scores(np.asarray(X, dtype=np.float32))
+
+    def predict(self, X) -> np.ndarray:
+        if self.max_batch is not None and len(X) > self.max_batch:
+            return np.asarray(self.estimator.predict(X))
+        return self.predict_compiled(X)
+
+    def predict_compiled(self, X) -> np.ndarray:
+        """Predict with the array engine regardless of batch size."""
+        scores = self._scores(np.asarray(X, dtype=np.float32))
+        if scores.shape[1] == 1:
+            # Binary boosting: a single logit
+            return self.classes_.take((scores[:, 0] > 0).astype(np.intp))
+        return self.classes_.take(np.argmax(scores, axis=1))
+
+
+def _float32_floor(values: np.ndarray) -> np.ndarray:
+    """Largest float32 <= each value.
+
+    sklearn compares float32 inputs against float64 thresholds; for float32 x,
+    ``x <= t`` is equivalent to ``x <= floor32(t)``, which keeps the node
+    arrays and comparisons in float32.
+    """
+    rounded = values.astype(np.float32)
+    above = rounded > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _depth(left: np.ndarray, right: np.ndarray) -> int:
+    """Depth of a tree given its child arrays (root is node 0)."""
+    depth, frontier = 0, [0]
+    while frontier:
+        nxt = [c for i in frontier for c in (left[i], right[i]) if c >= 0]
+        if not nxt:
+            break
+        depth += 1
+        frontier = nxt
+    return depth
+
+
+def check_parity(compiled: CompiledTreeEnsemble, X) -> float:
+    """Fraction of rows on which ``compiled`` and its source estimator agree."""
+    expected = np.asarray(compiled.estimator.predict(X)).ravel()
+    actual = compiled.predict_compiled(X)
+    if len(expected) == 0:
+        return 1.0
+    return float(np.mean(expected == actual))
@@ -10,6 +10,7 @@ from fastapi import WebSocket
 import json
 
 from .metrics import ACTIVE_WS_CONNECTIONS
+from .tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,7 @@ class WebSocketManager:
         ACTIVE_WS_CONNECTIONS.set(len(self.active_connections))
         logger.info(f"WebSocket connection closed. Remaining connections: {len(self.active_connections)}")
     
+    @traced("websocket.broadcast")
     async def broadcast(self, message:  dict):
         """
         Broadcast a message to all connected clients.
@@ -0,0 +1,26 @@
+"""Fixtures shared by the serving tests."""
+
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from src.inference_server.model_manager import LoadedModel, model_manager
+
+FEATURES = ["Flow Duration", "Total Fwd Packet"]
+
+
+@pytest.fixture
+def serve_tree(monkeypatch):
+    """Serve a two-feature tree through ``model_manager.current``.
+
+    ``serve_tree(labels)`` fits the tree so that a flow with few forward
+    packets gets ``labels[0]`` and one with many (500 and up) gets
+    ``labels[1]``. Extra keyword arguments go to ``LoadedModel``.
+    """
+    def serve(labels, model_class=DecisionTreeClassifier, **loaded):
+        X = pd.DataFrame({"Flow Duration": [1.0, 1.0], "Total Fwd Packet": [2.0, 500.0]})
+        model = model_class(random_state=0).fit(X, list(labels))
+        current = LoadedModel(model=model, features=FEATURES, source="mlflow", **loaded)
+        monkeypatch.setattr(model_manager, "current", current)
+        return current
+    return serve
@@ -0,0 +1,84 @@
+"""Tests for Arrow IPC batches on /predict."""
+
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+from src.inference_server.arrow_ipc import ARROW_STREAM, read_batch
+from src.inference_server.main import app
+
+client = TestClient(app)
+
+
+def _stream(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _predict(table: pa.Table, **headers):
+    return client.post("/predict", content=_stream(table), headers={"Content-Type": ARROW_STREAM, **headers})
+
+
+@pytest.fixture(autouse=True)
+def served(serve_tree):
+    serve_tree([0, 4])
+
+
+def test_read_batch_maps_field_and_feature_names():
+    table = pa.table({
+        "Flow Duration": pa.array([1.5, None]),
+        "tot_fwd_pkts": pa.array([3, 7], pa.int32()),
+        "unknown": ["a", "b"],
+        "src_ip": ["10.0.0.1", None],
+    })
+    X, fields, src_ips, dst_ips = read_batch(_stream(table))
+    assert fields == ["flow_duration", "tot_fwd_pkts"]
+    assert X.dtype == "float32" and X[0].tolist() == [1.5, 3.0] and X[1, 1] == 7.0
+    assert src_ips == ["10.0.0.1", None] and dst_ips is None
+
+
+def test_arrow_batch_round_trip():
+    table = pa.table({
+        "flow_duration": pa.array([10.0] * 6, pa.float32()),
+        # A negative count is clamped to 0, as in a JSON request
+        "tot_fwd_pkts": pa.array([1.0, 600.0, -5.0, 900.0, 2.0, 3.0], pa.float32()),
+    })
+    response = _predict(table)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == ARROW_STREAM
+    result = pa.ipc.open_stream(response.content).read_all()
+    assert result.column_names == ["prediction", "validation_warnings"]
+    assert result.column("prediction").to_pylist() == [0, 4, 0, 4, 0, 0]
+    assert result.column("validation_warnings").to_pylist()[2] == ["tot_fwd_pkts: negative value -5.0 clamped to 0"]
+
+    # Clients that only take JSON get the same answer as JSON
+    response = _predict(table, Accept="application/json")
+    body = response.json()
+    assert body["prediction"] == [0, 4, 0, 4, 0, 0]
+    assert [len(w) for w in body["validation_warnings"]] == [0, 0, 1, 0, 0, 0]
+    assert 'mlids_batch_flows_total{source="arrow"}' in client.get("/metrics").text
+
+
+def test_arrow_batch_errors():
+    response = client.post("/predict", content=b"not arrow", headers={"Content-Type": ARROW_STREAM})
+    assert response.status_code == 400
+
+    response = _predict(pa.table({"src_ip": ["10.0.0.1"]}))
+    assert response.status_code == 400
+
+    response = _predict(pa.table({"flow_duration": ["slow"]}))
+    assert response.status_code == 400
+
+
+def test_arrow_documented_in_openapi():
+    content = client.get("/openapi.json").json()["paths"]["/predict"]["post"]["requestBody"]["content"]
+    assert ARROW_STREAM in content and "application/json" in content
+
+
+def test_empty_arrow_batch():
+    table = pa.table({"flow_duration": pa.array([], pa.float64())})
+    result = pa.ipc.open_stream(_predict(table).content).read_all()
+    assert result.column_names == ["prediction"] and result.num_rows == 0
+    assert _predict(table, Accept="application/json").json() == {"prediction": []}
@@ -1,13 +1,18 @@
 """Tests for API Key authentication middleware."""
 
+import asyncio
 import os
+import signal
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from starlette.websockets import WebSocketDisconnect
 
-from src.inference_server.auth import APIKeyMiddleware, get_api_keys, is_auth_enabled, verify_ws_api_key
+from src.inference_server.auth import (
+    APIKeyMiddleware, APIKeyStore, get_api_keys, hash_api_key, install_reload_signal, is_auth_enabled,
+    verify_ws_api_key,
+)
 
 
 def _make_app(env_vars: dict = None):
@@ -107,6 +112,14 @@ class TestMiddleware:
         resp = client.get("/predict")
         assert resp.status_code == 200
 
+    def test_prehashed_key_succeeds(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_AUTH_ENABLED", "true")
+        monkeypatch.setenv("ML_IDS_API_KEYS", "sha256:" + hash_api_key("secret-key").hex())
+        app = _make_app()
+        client = TestClient(app)
+        resp = client.get("/predict", headers={"X-API-Key": "secret-key"})
+        assert resp.status_code == 200
+
     def test_no_keys_configured_allows_request(self, monkeypatch):
         monkeypatch.setenv("ML_IDS_AUTH_ENABLED", "true")
         monkeypatch.delenv("ML_IDS_API_KEYS", raising=False)
@@ -116,6 +129,91 @@ class TestMiddleware:
         assert resp.status_code == 200
 
 
+class TestAPIKeyStore:
+    def test_match_returns_digest(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_API_KEYS", "key1,key2")
+        monkeypatch.delenv("ML_IDS_API_KEYS_FILE", raising=False)
+        store = APIKeyStore()
+        store.reload()
+        assert store.match("key2") == hash_api_key("key2")
+        assert store.match("key3") is None
+        assert store.match(None) is None
+
+    def test_plaintext_not_retained(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_API_KEYS", "key1")
+        monkeypatch.delenv("ML_IDS_API_KEYS_FILE", raising=False)
+        store = APIKeyStore()
+        store.reload()
+        assert store.digests == frozenset({hash_api_key("key1")})
+
+    def test_prehashed_entry(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_API_KEYS", "sha256:" + hash_api_key("hidden").hex())
+        monkeypatch.delenv("ML_IDS_API_KEYS_FILE", raising=False)
+        store = APIKeyStore()
+        store.reload()
+        assert store.match("hidden") is not None
+
+    def test_malformed_prehashed_entry_ignored(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_API_KEYS", "sha256:nothex")
+        monkeypatch.delenv("ML_IDS_API_KEYS_FILE", raising=False)
+        store = APIKeyStore()
+        store.reload()
+        assert not store.has_keys()
+
+    def test_env_read_once(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_API_KEYS", "old-key")
+        monkeypatch.delenv("ML_IDS_API_KEYS_FILE", raising=False)
+        store = APIKeyStore()
+        store.reload()
+        monkeypatch.setenv("ML_IDS_API_KEYS", "new-key")
+        assert store.match("old-key") is not None
+        store.reload()
+        assert store.match("new-key") is not None
+        assert store.match("old-key") is None
+
+    def test_keys_file_change_reloads(self, monkeypatch, tmp_path):
+        keys_file = tmp_path / "keys"
+        keys_file.write_text("# sensors\nfile-key-1\n")
+        monkeypatch.delenv("ML_IDS_API_KEYS", raising=False)
+        monkeypatch.setenv("ML_IDS_API_KEYS_FILE", str(keys_file))
+        monkeypatch.setenv("ML_IDS_API_KEYS_RELOAD_INTERVAL", "0")
+        store = APIKeyStore()
+        store.reload()
+        assert store.has_keys()
+        assert store.match("file-key-1") is not None
+
+        keys_file.write_text("file-key-2\n")
+        os.utime(keys_file, (0, 12345))
+        assert store.has_keys()
+        assert store.match("file-key-2") is not None
+        assert store.match("file-key-1") is None
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="no SIGHUP on this platform")
+    def test_sighup_reloads_on_event_loop(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_API_KEYS", "old-key")
+        monkeypatch.delenv("ML_IDS_API_KEYS_FILE", raising=False)
+        store = APIKeyStore()
+        store.reload()
+        monkeypatch.setenv("ML_IDS_API_KEYS", "new-key")
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            assert install_reload_signal(store)
+            try:
+                os.kill(os.getpid(), signal.SIGHUP)
+                # Not reloaded inside the interrupted code, only once the loop runs callbacks
+                assert store.match("new-key") is None
+                await asyncio.sleep(0.05)
+            finally:
+                loop.remove_signal_handler(signal.SIGHUP)
+
+        asyncio.run(main())
+        assert store.match("new-key") is not None
+
+    def test_signal_not_installed_without_loop(self):
+        assert install_reload_signal(APIKeyStore()) is False
+
+
 class TestWebSocketAuth:
     @pytest.mark.asyncio
     async def test_ws_auth_disabled(self, monkeypatch):
@@ -0,0 +1,172 @@
+"""Tests for two-stage cascade inference."""
+
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier
+
+from src.inference_server.cascade import CascadePredictor, select_threshold
+from src.inference_server.model_manager import LoadedModel, ModelManager
+from src.inference_server.tree_engine import CompiledTreeEnsemble
+
+FEATURES = ["Flow Duration", "Total Fwd Packet", "Total Bwd packets"]
+SCREEN_FEATURES = ["Total Bwd packets"]
+TABLE = [
+    {"threshold": 0.1, "attack_recall": 1.0, "benign_screened": 0.80},
+    {"threshold": 0.3, "attack_recall": 0.999, "benign_screened": 0.90},
+    {"threshold": 0.5, "attack_recall": 0.98, "benign_screened": 0.95},
+]
+
+
+class RecordingModel:
+    """Full-model stand-in that labels every row it sees as attack class 3."""
+
+    classes_ = np.array([0, 3])
+
+    def __init__(self):
+        self.rows_seen = 0
+
+    def predict(self, X):
+        self.rows_seen += len(X)
+        return np.full(len(X), 3)
+
+
+def _screen():
+    """Attack iff many backward packets."""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"Total Bwd packets": rng.uniform(0, 100, 2000)})
+    return ExtraTreesClassifier(n_estimators=4, max_depth=3, random_state=0).fit(X, X["Total Bwd packets"] > 50)
+
+
+def _flows(bwd_packets):
+    return pd.DataFrame({"Flow Duration": 1.0, "Total Fwd Packet": 2.0,
+                         "Total Bwd packets": bwd_packets}, columns=FEATURES)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(ModelManager, "MODEL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ModelManager, "LOCAL_MODEL_PATH", str(tmp_path / "model.joblib"))
+    monkeypatch.setattr(ModelManager, "LOCAL_META_PATH", str(tmp_path / "model_meta.json"))
+    path = tmp_path / "cascade_screen.joblib"
+    joblib.dump(_screen(), path)
+    (tmp_path / "cascade_screen.json").write_text(json.dumps({"features": SCREEN_FEATURES, "thresholds": TABLE}))
+    monkeypatch.setenv("MODEL_CASCADE_SCREEN_PATH", str(path))
+    return ModelManager()
+
+
+def test_select_threshold_highest_meeting_floor():
+    assert select_threshold(TABLE, 0.999)["threshold"] == 0.3
+    assert select_threshold(TABLE, 0.9)["threshold"] == 0.5
+    with pytest.raises(ValueError):
+        select_threshold(TABLE, 1.01)
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_only_suspicious_flows_reach_full_model(compiled):
+    screen = CompiledTreeEnsemble.from_estimator(_screen()) if compiled else _screen()
+    full = RecordingModel()
+    cascade = CascadePredictor(screen, full, FEATURES, SCREEN_FEATURES, threshold=0.5)
+
+    predictions = cascade.predict(_flows([5.0, 95.0, 10.0, 80.0]))
+    assert list(predictions) == [0, 3, 0, 3]
+    assert full.rows_seen == 2
+
+    stats = cascade.stats()
+    assert (stats["screened_benign"], stats["escalated"], stats["screen_hit_rate"]) == (2, 2, 0.5)
+
+
+def test_all_benign_batch_skips_full_model():
+    full = RecordingModel()
+    cascade = CascadePredictor(_screen(), full, FEATURES, SCREEN_FEATURES, threshold=0.5)
+    assert list(cascade.predict(_flows([1.0, 2.0]))) == [0, 0]
+    assert full.rows_seen == 0
+
+
+def test_model_manager_wraps_model_in_cascade(manager):
+    full = RecordingModel()
+    manager._activate(LoadedModel(model=full, features=FEATURES, source="mlflow"))
+
+    assert manager.current.cascade
+    assert manager.current.model.threshold == 0.3
+    assert manager.current.estimator is full
+    assert list(manager.model.predict(_flows([5.0, 95.0]))) == [0, 3]
+    assert manager.cascade_stats["escalated"] >= 1
+
+
+def test_threshold_override(manager, monkeypatch):
+    monkeypatch.setenv("MODEL_CASCADE_THRESHOLD", "0.05")
+    manager._activate(LoadedModel(model=RecordingModel(), features=FEATURES, source="mlflow"))
+    assert manager.current.model.threshold == 0.05
+    assert manager.cascade_stats["recall_floor"] is None
+
+
+def test_unreachable_recall_floor_serves_full_model(manager, monkeypatch):
+    monkeypatch.setenv("MODEL_CASCADE_RECALL_FLOOR", "1.01")
+    manager._activate(LoadedModel(model=RecordingModel(), features=FEATURES, source="mlflow"))
+    assert not manager.current.cascade
+    assert manager.cascade_stats is None
+
+
+@pytest.fixture
+def saturated(monkeypatch):
+    """Overload protection on, with every /predict admitted at REJECT level."""
+    from src.inference_server.overload import AdaptiveConcurrencyLimiter, overload_guard
+
+    limiter = AdaptiveConcurrencyLimiter(initial=10)
+    limiter.inflight = 10
+    monkeypatch.setattr(overload_guard, "enabled", True)
+    monkeypatch.setattr(overload_guard, "limiter", limiter)
+    monkeypatch.setattr(overload_guard, "is_recent_attacker", lambda src_ip: False)
+
+
+def _serve(monkeypatch, model, cascade):
+    from src.inference_server.model_manager import model_manager
+
+    monkeypatch.setattr(model_manager, "current",
+                        LoadedModel(model=model, features=FEATURES, source="mlflow", cascade=cascade))
+
+
+def test_shed_flows_still_screened(saturated, monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.inference_server.main import app
+
+    full = RecordingModel()
+    _serve(monkeypatch, CascadePredictor(_screen(), full, FEATURES, SCREEN_FEATURES, threshold=0.5), True)
+    client = TestClient(app)
+
+    # A new source's attack is escalated by the screen, its benign flows are cleared by it
+    assert client.post("/predict", json={"tot_bwd_pkts": 95.0, "src_ip": "10.9.9.9"}).json()["prediction"] == [3]
+    assert client.post("/predict", json={"tot_bwd_pkts": 5.0, "src_ip": "10.9.9.8"}).json()["prediction"] == [0]
+    assert full.rows_seen == 1
+    assert 'mlids_overload_shed_total{action="screen_escalated"}' in client.get("/metrics").text
+
+
+def test_shed_flows_rejected_without_screen(saturated, monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.inference_server.main import app
+
+    _serve(monkeypatch, RecordingModel(), False)
+    response = TestClient(app).post("/predict", json={"tot_bwd_pkts": 95.0, "src_ip": "10.9.9.9"})
+    assert response.status_code == 503
+
+
+def test_shed_stream_flows_still_screened(saturated, monkeypatch):
+    import asyncio
+
+    from src.inference_server.ndjson_stream import PredictionStreamer
+
+    class Body:
+        async def stream(self):
+            yield b'{"tot_bwd_pkts": 95.0}\n{"tot_bwd_pkts": 5.0}\n'
+
+    async def collect():
+        return b"".join([part async for part in PredictionStreamer().stream(Body())])
+
+    full = RecordingModel()
+    _serve(monkeypatch, CascadePredictor(_screen(), full, FEATURES, SCREEN_FEATURES, threshold=0.5), True)
+    assert [json.loads(line) for line in asyncio.run(collect()).splitlines()] == [{"prediction": 3}, {"prediction": 0}]
+    assert full.rows_seen == 1
@@ -0,0 +1,164 @@
+"""Tests for the in-process flow meter.
+
+The expected values are worked out by hand from the CICFlowMeter feature
+definitions (payload lengths, microsecond times, sample deviations).
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.inference_server.batch_scoring import REQUEST_FIELDS
+from src.inference_server.flow_meter import ACK, FIN, PSH, SYN, TCP, UDP, FlowMeter, FlowTable
+from src.inference_server.model_manager import LoadedModel, model_manager
+
+A, B = "10.0.0.1", "10.0.0.2"
+
+# (time, forward, payload, header, flags, window): handshake, request, response, FIN
+TCP_FLOW = [
+    (1.0000, True, 0, 40, SYN, 8192),
+    (1.0001, False, 0, 40, SYN | ACK, 29200),
+    (1.0002, True, 0, 20, ACK, 8192),
+    (1.0010, True, 100, 20, PSH | ACK, 8192),
+    (1.0030, False, 1000, 20, PSH | ACK, 29200),
+    (1.0040, True, 0, 20, FIN | ACK, 8192),
+]
+
+
+def _add(table, packets, proto=TCP):
+    for ts, forward, payload, header, flags, window in packets:
+        if forward:
+            table.add(ts, A, 40000, B, 80, proto, payload, header, flags, window)
+        else:
+            table.add(ts, B, 80, A, 40000, proto, payload, header, flags, window)
+
+
+def _rows(batch):
+    return [dict(zip(REQUEST_FIELDS, row.tolist())) for row in batch.features]
+
+
+def test_tcp_flow_features():
+    table = FlowTable()
+    _add(table, TCP_FLOW)
+
+    # The FIN finished the flow
+    assert len(table) == 0 and table.pending == 1
+    batch = table.pop_finished()
+    assert batch.flows == [(A, 40000, B, 80, TCP)]
+    f = _rows(batch)[0]
+
+    expected = {
+        "flow_duration": 4000, "tot_fwd_pkts": 4, "tot_bwd_pkts": 2,
+        "totlen_fwd_pkts": 100, "totlen_bwd_pkts": 1000,
+        "fwd_pkt_len_max": 100, "fwd_pkt_len_min": 0, "fwd_pkt_len_mean": 25, "fwd_pkt_len_std": 50,
+        "bwd_pkt_len_max": 1000, "bwd_pkt_len_min": 0, "bwd_pkt_len_mean": 500,
+        "bwd_pkt_len_std": np.std([0, 1000], ddof=1),
+        "flow_byts_s": 275000, "flow_pkts_s": 1500, "fwd_pkts_s": 1000, "bwd_pkts_s": 500,
+        "flow_iat_mean": 800, "flow_iat_std": np.std([100, 100, 800, 2000, 1000], ddof=1),
+        "flow_iat_max": 2000, "flow_iat_min": 100,
+        "fwd_iat_tot": 4000, "fwd_iat_mean": 4000 / 3, "fwd_iat_max": 3000, "fwd_iat_min": 200,
+        "bwd_iat_tot": 2900, "bwd_iat_mean": 2900, "bwd_iat_std": 0, "bwd_iat_min": 2900,
+        "fwd_psh_flags": 1, "bwd_psh_flags": 1, "fwd_urg_flags": 0,
+        "fwd_header_len": 100, "bwd_header_len": 60,
+        "pkt_len_max": 1000, "pkt_len_mean": 1100 / 6,
+        "pkt_len_var": np.var([0, 0, 0, 100, 1000, 0], ddof=1),
+        "fin_flag_cnt": 1, "syn_flag_cnt": 2, "rst_flag_cnt": 0, "psh_flag_cnt": 2, "ack_flag_cnt": 5,
+        "down_up_ratio": 0, "pkt_size_avg": 1100 / 6, "fwd_seg_size_avg": 25, "bwd_seg_size_avg": 500,
+        "fwd_byts_b_avg": 0, "subflow_fwd_pkts": 4, "subflow_fwd_byts": 100,
+        "subflow_bwd_pkts": 2, "subflow_bwd_byts": 1000,
+        "init_fwd_win_byts": 8192, "init_bwd_win_byts": 29200,
+        "fwd_act_data_pkts": 1, "fwd_seg_size_min": 20,
+        # The FIN packet does not extend the active period
+        "active_mean": 3000, "active_std": 0, "active_max": 3000, "idle_mean": 0,
+    }
+    for name, value in expected.items():
+        assert f[name] == pytest.approx(value, rel=1e-5, abs=1e-3), name
+
+
+def test_timeout_splits_flow_and_records_idle_time():
+    table = FlowTable(flow_timeout=120, activity_timeout=5)
+    udp = [(10.0, True, 50, 8, 0, -1), (11.0, True, 50, 8, 0, -1), (20.0, True, 50, 8, 0, -1),
+           (200.0, True, 50, 8, 0, -1)]
+    _add(table, udp, proto=UDP)
+    assert table.pending == 1 and len(table) == 1
+
+    f = _rows(table.pop_finished())[0]
+    assert f["flow_duration"] == pytest.approx(10e6)
+    assert f["active_mean"] == pytest.approx(1e6)
+    # A 9 s gap, then the remainder of the 120 s timeout
+    assert (f["idle_min"], f["idle_max"]) == pytest.approx((9e6, 110e6))
+    assert f["subflow_fwd_pkts"] == 1  # 3 packets over 2 subflows
+    assert f["init_fwd_win_byts"] == -1
+
+    table.flush()
+    assert _rows(table.pop_finished())[0]["tot_fwd_pkts"] == 1
+
+
+def test_bulk_transfer():
+    table = FlowTable()
+    _add(table, [(1.0 + 0.1 * i, True, 100, 20, ACK, 1024) for i in range(5)])
+    table.flush()
+    f = _rows(table.pop_finished())[0]
+    assert f["fwd_byts_b_avg"] == 500
+    assert f["fwd_pkts_b_avg"] == 5
+    assert f["fwd_blk_rate_avg"] == pytest.approx(1250)
+    assert f["bwd_byts_b_avg"] == 0
+
+
+def test_expire_and_slot_reuse():
+    table = FlowTable(flow_timeout=120)
+    table.add(0.0, A, 1, B, 2, UDP, 10, 8)
+    table.add(100.0, A, 3, B, 4, UDP, 10, 8)
+    assert table.expire(130.0) == 1
+    assert table.pop_finished().flows == [(A, 1, B, 2, UDP)]
+
+    table.add(131.0, B, 5, A, 6, UDP, 10, 8)
+    assert len(table._flows) == 2  # the freed row was reused
+    table.flush()
+    assert sorted(table.pop_finished().flows) == [(A, 3, B, 4, UDP), (B, 5, A, 6, UDP)]
+
+
+def test_pcap_matches_direct_accounting(tmp_path):
+    pytest.importorskip("scapy")
+    from scapy.layers.inet import IP, TCP as TCPLayer
+    from scapy.layers.l2 import Ether
+    from scapy.utils import wrpcap
+
+    from src.inference_server.flow_meter import iter_pcap
+
+    packets = []
+    for ts, forward, payload, _, flags, window in TCP_FLOW:
+        src, dst, sport, dport = (A, B, 40000, 80) if forward else (B, A, 80, 40000)
+        pkt = Ether() / IP(src=src, dst=dst) / TCPLayer(sport=sport, dport=dport, flags=flags, window=window) / (b"x" * payload)
+        pkt.time = ts
+        packets.append(pkt)
+    path = tmp_path / "flow.pcap"
+    wrpcap(str(path), packets)
+
+    table = FlowTable()
+    _add(table, [(ts, fwd, payload, 20, flags, window) for ts, fwd, payload, _, flags, window in TCP_FLOW])
+    expected = table.pop_finished().features
+
+    batches = list(iter_pcap(str(path)))
+    assert len(batches) == 1
+    np.testing.assert_allclose(batches[0].features, expected, rtol=1e-5)
+
+
+def test_flow_meter_scores_finished_flows(tmp_path, monkeypatch):
+    class AttackModel:
+        def predict(self, X):
+            return np.full(len(X), 4)
+
+    monkeypatch.setattr(model_manager, "current", None)
+    meter = FlowMeter("lo", lock_path=str(tmp_path / "meter.lock"))
+    _add(meter.table, TCP_FLOW)
+
+    # Finished flows wait until a model is loaded
+    assert asyncio.run(meter.score_finished()) == 0
+    assert meter.table.pending == 1
+
+    monkeypatch.setattr(model_manager, "current",
+                        LoadedModel(model=AttackModel(), features=["Flow Duration"], source="mlflow"))
+    assert asyncio.run(meter.score_finished()) == 1
+    assert meter.flows_scored == 1 and meter.table.pending == 0
@@ -1,5 +1,5 @@
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, PropertyMock
 import pytest
 import sys
 import os
@@ -108,3 +108,103 @@ def test_health_endpoint():
     assert "database" in response.json()
 
 
+
+def test_predict_records_stage_and_request_metrics():
+    """Each pipeline stage and the route-labelled request duration are observed."""
+    response = client.post("/predict", json={'flow_duration': 1000.0})
+    assert response.status_code == 200
+
+    metrics = client.get("/metrics").text
+    for stage in ("parse", "feature_mapping", "frame_build", "inference"):
+        assert f'mlids_predict_stage_seconds_count{{stage="{stage}"}}' in metrics
+    assert 'mlids_request_duration_seconds_count{method="POST",route="/predict",status="200"}' in metrics
+
+
+def test_predict_body_schema_documented():
+    """Manual body parsing keeps the request schema in the OpenAPI spec."""
+    spec = client.get("/openapi.json").json()
+    body = spec["paths"]["/predict"]["post"]["requestBody"]
+    assert "flow_duration" in body["content"]["application/json"]["schema"]["properties"]
+
+
+def test_predict_validation_error_location():
+    response = client.post("/predict", json={'flow_duration': "invalid_string"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "flow_duration"]
+
+
+def test_predict_503_while_model_loading():
+    """Requests arriving before the background load finishes get a retryable 503."""
+    with patch.object(type(model_manager), "loading", new_callable=PropertyMock, return_value=True):
+        response = client.post("/predict", json={"flow_duration": 1000.0})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+
+def test_health_reports_model_state():
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert "model_state" in response.json()
+
+
+def test_liveness_and_readiness_probes():
+    assert client.get("/health/live").json() == {"status": "alive"}
+
+    model_manager.initialized = False
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+
+    # A lazy load through /predict warms the model up and flips readiness
+    assert client.post("/predict", json={"flow_duration": 1000.0}).status_code == 200
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert client.get("/health").json()["model_warmup"]["iterations"] > 0
+
+
+def test_repeated_flow_served_from_prediction_cache(monkeypatch):
+    from src.inference_server.prediction_cache import prediction_cache
+
+    monkeypatch.setattr(prediction_cache, "max_entries", 16)
+    flow = {"flow_duration": 1234.0, "tot_fwd_pkts": 3.0}
+    assert client.post("/predict", json=flow).status_code == 200
+    model = model_manager.current.model
+    calls = model.predict.call_count
+
+    response = client.post("/predict", json=flow)
+    assert response.json()["prediction"] == [0]
+    assert model.predict.call_count == calls
+    assert client.get("/health").json()["prediction_cache"]["hits"] >= 1
+
+    # A model swap starts from an empty cache
+    model_manager.initialized = False
+    model_manager.model = None
+    client.post("/predict", json=flow)
+    last_input = model_manager.current.model.predict.call_args[0][0]
+    assert last_input["Flow Duration"].tolist() == [1234.0]
+    assert 'mlids_prediction_cache_requests_total{result="hit"}' in client.get("/metrics").text
+
+
+def test_hot_swap_during_parse_keeps_request_snapshot(monkeypatch):
+    """A request is parsed and scored by the same snapshot, even if a swap lands in between."""
+    from src.inference_server.model_manager import LoadedModel
+
+    reduced_model, full_model = MagicMock(), MagicMock()
+    reduced_model.predict.return_value = np.array([0])
+    full_model.predict.return_value = np.array([0])
+    full = LoadedModel(model=full_model, features=['Flow Duration', 'Total Fwd Packet'], source="mlflow")
+
+    class SwappedWhileParsing(LoadedModel):
+        @property
+        def request_model(self):
+            model_manager.current = full
+            return super().request_model
+
+    monkeypatch.setattr(model_manager, "current",
+                        SwappedWhileParsing(model=reduced_model, features=['Flow Duration'], source="mlflow"))
+    response = client.post("/predict", json={'flow_duration': 7.0, 'tot_fwd_pkts': 3.0})
+
+    assert response.status_code == 200
+    assert model_manager.current is full
+    full_model.predict.assert_not_called()
+    assert reduced_model.predict.call_args[0][0]["Flow Duration"].tolist() == [7.0]
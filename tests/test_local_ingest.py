@@ -0,0 +1,139 @@
+"""Tests for binary flow ingestion over a Unix domain socket."""
+
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from src.inference_server import local_ingest
+from src.inference_server.batch_scoring import REQUEST_FIELDS, to_model_matrix
+from src.inference_server.local_ingest import LocalIngestClient, LocalIngestServer
+from src.inference_server.model_manager import LoadedModel, model_manager
+from src.inference_server.overload import overload_guard
+
+FEATURES = ["Total Fwd Packet", "Flow Duration"]
+
+
+class ThresholdModel:
+    """Attack (class 2) iff the flow has more than 10 forward packets."""
+
+    def __init__(self):
+        self.frames = []
+
+    def predict(self, X):
+        self.frames.append(X)
+        return np.where(X["Total Fwd Packet"].to_numpy() > 10, 2, 0)
+
+
+def _run(server, fn):
+    """Start ``server``, run the blocking client code ``fn`` in a thread, stop."""
+    async def main():
+        assert await server.start()
+        try:
+            return await asyncio.to_thread(fn)
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_manager, "current", None)
+    return LocalIngestServer(str(tmp_path / "ingest.sock"))
+
+
+def _flows(fwd_packets, duration=5.0):
+    X = np.zeros((len(fwd_packets), len(REQUEST_FIELDS)), dtype=np.float32)
+    X[:, REQUEST_FIELDS.index("tot_fwd_pkts")] = fwd_packets
+    X[:, REQUEST_FIELDS.index("flow_duration")] = duration
+    return X
+
+
+def test_frames_are_scored_in_batches(server, monkeypatch):
+    model = ThresholdModel()
+    monkeypatch.setattr(model_manager, "current", LoadedModel(model=model, features=FEATURES, source="mlflow"))
+
+    def produce():
+        with LocalIngestClient(server.path) as client:
+            first = client.score(_flows([1, 50, 3]), src_ips=["10.0.0.1", "10.0.0.2", None],
+                                 dst_ips=["10.0.0.9"] * 3)
+            second = client.score(_flows([20]))
+        return first, second
+
+    first, second = _run(server, produce)
+    assert first.tolist() == [0, 2, 0]
+    assert second.tolist() == [2]
+    assert len(model.frames) == 2
+    assert list(model.frames[0].columns) == FEATURES
+    assert model.frames[0]["Flow Duration"].tolist() == [5.0] * 3
+    assert overload_guard.is_recent_attacker("10.0.0.2")
+
+
+def test_invalid_values_are_sanitized(server, monkeypatch):
+    model = ThresholdModel()
+    monkeypatch.setattr(model_manager, "current", LoadedModel(model=model, features=FEATURES, source="mlflow"))
+
+    def produce():
+        with LocalIngestClient(server.path) as client:
+            return client.score(_flows([np.nan, -4.0], duration=np.inf))
+
+    assert _run(server, produce).tolist() == [0, 0]
+    frame = model.frames[0]
+    assert frame["Total Fwd Packet"].tolist() == [0.0, 0.0]
+    assert frame["Flow Duration"].tolist() == [0.0, 0.0]
+
+
+def test_unavailable_without_model(server):
+    def produce():
+        with LocalIngestClient(server.path) as client:
+            return client.score(_flows([1]))
+
+    assert _run(server, produce) is None
+
+
+def test_bad_frame_rejected(server):
+    def produce():
+        with LocalIngestClient(server.path) as client:
+            client.sock.sendall(local_ingest.REQUEST_HEADER.pack(b"MLIF", 1, 3, 1))
+            return local_ingest.RESPONSE_HEADER.unpack(client._recv_exactly(local_ingest.RESPONSE_HEADER.size))
+
+    assert _run(server, produce) == (b"MLIR", local_ingest.STATUS_BAD_FRAME, 0)
+
+
+def test_second_worker_does_not_steal_socket(server):
+    async def main():
+        assert await server.start()
+        try:
+            return await LocalIngestServer(server.path).start()
+        finally:
+            await server.stop()
+
+    assert asyncio.run(main()) is False
+
+
+def test_standby_worker_takes_over_socket(server):
+    async def main():
+        assert await server.start()
+        standby = LocalIngestServer(server.path, claim_interval=0.01)
+        assert not await standby.start()
+        # The serving worker is recycled: its stop() must not remove the standby's socket
+        await server.stop()
+        for _ in range(200):
+            if standby._server is not None:
+                break
+            await asyncio.sleep(0.01)
+        try:
+            return standby._server is not None and os.path.exists(server.path)
+        finally:
+            await standby.stop()
+
+    assert asyncio.run(main())
+    assert not os.path.exists(server.path)
+
+
+def test_to_model_matrix_reorders_columns():
+    X = np.arange(6, dtype=np.float32).reshape(2, 3)
+    fields = ["flow_duration", "tot_fwd_pkts", "tot_bwd_pkts"]
+    out = to_model_matrix(X, fields, ["Total Fwd Packet", "Flow Duration", "Fwd IAT Min"])
+    assert out.tolist() == [[1, 0, 0], [4, 3, 0]]
@@ -0,0 +1,61 @@
+"""Tests for aggregating Prometheus metrics across worker processes."""
+
+import os
+import subprocess
+import sys
+
+from prometheus_client import multiprocess
+
+from src.inference_server.metrics import metrics_response
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+from src.inference_server.metrics import PREDICTIONS_TOTAL, MODEL_LOADED, ACTIVE_WS_CONNECTIONS
+PREDICTIONS_TOTAL.labels(result="attack").inc({attacks})
+MODEL_LOADED.set({loaded})
+ACTIVE_WS_CONNECTIONS.set(3)
+"""
+
+
+def _run_worker(tmp_path, attacks, loaded):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    proc = subprocess.run(
+        [sys.executable, "-c", WORKER.format(attacks=attacks, loaded=loaded)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+
+
+def _sample(body, name):
+    for line in body.splitlines():
+        if line.startswith(name + " ") or line.startswith(name + "{"):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_metrics_aggregated_across_workers(tmp_path, monkeypatch):
+    # Each subprocess stands in for a running worker: live gauge files are only
+    # removed by mark_process_dead, which the gunicorn master calls on exit.
+    _run_worker(tmp_path, attacks=2, loaded=1)
+    _run_worker(tmp_path, attacks=3, loaded=0)
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+    body = metrics_response().body.decode()
+    assert _sample(body, 'mlids_predictions_total{result="attack"}') == 5.0
+    assert _sample(body, "mlids_active_websocket_connections") == 6.0
+    # The model only counts as loaded when every worker has it
+    assert _sample(body, "mlids_model_loaded") == 0.0
+
+
+def test_dead_worker_gauges_dropped(tmp_path, monkeypatch):
+    _run_worker(tmp_path, attacks=1, loaded=1)
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    pids = {f.split("_")[-1].split(".")[0] for f in os.listdir(tmp_path) if f.startswith("gauge_live")}
+    for pid in pids:
+        multiprocess.mark_process_dead(int(pid), str(tmp_path))
+
+    body = metrics_response().body.decode()
+    # Counters survive worker exit; live gauges do not
+    assert _sample(body, 'mlids_predictions_total{result="attack"}') == 1.0
+    assert _sample(body, "mlids_active_websocket_connections") is None
@@ -0,0 +1,214 @@
+"""Tests for model hot-swapping in ModelManager."""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.inference_server.schemas import PredictionRequest
+from src.inference_server.model_manager import (
+    LoadedModel, ModelManager, _split_registry_uri, validate_features,
+)
+
+FEATURES = ["Flow Duration", "Total Fwd Packet"]
+
+
+class ConstantModel:
+    """Picklable stand-in for an sklearn estimator."""
+
+    def __init__(self, label, features=FEATURES):
+        self.label = label
+        self.feature_names_in_ = list(features)
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return [self.label] * len(X)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(ModelManager, "MODEL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ModelManager, "LOCAL_MODEL_PATH", str(tmp_path / "model.joblib"))
+    monkeypatch.setattr(ModelManager, "LOCAL_META_PATH", str(tmp_path / "model_meta.json"))
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", "http://mock-mlflow")
+    monkeypatch.setenv("MLFLOW_MODEL_NAME", "models:/ML_IDS_Model_v1/Production")
+    return ModelManager()
+
+
+def _loaded(label, version, features=FEATURES):
+    return LoadedModel(model=ConstantModel(label, features), features=list(features),
+                       source="mlflow", version=version)
+
+
+def test_split_registry_uri():
+    assert _split_registry_uri("models:/ids/Production") == ("ids", "Production", False)
+    assert _split_registry_uri("models:/ids@champion") == ("ids", "champion", True)
+    assert _split_registry_uri("runs:/abc/model") is None
+
+
+def test_validate_features():
+    assert validate_features(FEATURES) == []
+    assert validate_features(["Flow Duration", "Bogus"]) == ["Bogus"]
+    assert validate_features(None)
+
+
+def test_swap_is_atomic_for_in_flight_requests(manager):
+    manager.try_swap(_loaded(0, "1"))
+    in_flight = manager.current
+
+    assert manager.try_swap(_loaded(1, "2"))
+    # A request that took its snapshot before the swap still uses the old model
+    assert in_flight.model.predict([[0, 0]]) == [0]
+    assert manager.current.model.predict([[0, 0]]) == [1]
+    assert manager.model_version == "2"
+
+
+def test_swap_rejects_unknown_features(manager):
+    manager.try_swap(_loaded(0, "1"))
+    assert not manager.try_swap(_loaded(1, "2", features=["Flow Duration", "Not A Feature"]))
+    assert manager.model_version == "1"
+
+
+def test_candidate_warmed_up_before_swap(manager, monkeypatch):
+    monkeypatch.setenv("MODEL_WARMUP_ROWS", "16")
+    monkeypatch.setenv("MODEL_WARMUP_ITERATIONS", "2")
+    candidate = _loaded(1, "2")
+    assert not manager.ready
+    manager.try_swap(candidate)
+    # One single-row and one batch prediction per iteration
+    assert candidate.model.calls == 4
+    assert manager.ready
+    assert manager.warmup["rows"] == 16
+    assert len(manager.warmup["single_row_ms"]) == 2
+
+
+def test_failed_warm_up_is_not_ready(manager):
+    class Broken(ConstantModel):
+        def predict(self, X):
+            raise RuntimeError("boom")
+
+    manager._activate(LoadedModel(model=Broken(0), features=FEATURES, source="cache"))
+    assert manager.initialized
+    assert not manager.ready
+    assert "boom" in manager.warmup["error"]
+
+
+def test_warm_up_can_be_disabled(manager, monkeypatch):
+    monkeypatch.setenv("MODEL_WARMUP_ITERATIONS", "0")
+    candidate = _loaded(1, "2")
+    manager.try_swap(candidate)
+    assert candidate.model.calls == 0
+    assert manager.ready
+
+
+def test_registry_poll_loads_new_version(manager):
+    manager.try_swap(_loaded(0, "1"))
+    with patch.object(ModelManager, "_resolve_registry_version", return_value="2"), \
+         patch("mlflow.set_tracking_uri"), \
+         patch("mlflow.sklearn.load_model", return_value=ConstantModel(1)) as mock_load:
+        assert manager.check_for_update()
+        mock_load.assert_called_once_with("models:/ML_IDS_Model_v1/2")
+        # Same version on the next poll: nothing to do
+        assert not manager.check_for_update()
+    assert manager.model_version == "2"
+
+
+def test_cache_change_picked_up(manager, tmp_path):
+    writer = ModelManager()
+    writer._save_to_cache(_loaded(1, "7"))
+
+    with patch.object(ModelManager, "_resolve_registry_version", side_effect=Exception("down")), \
+         patch("mlflow.set_tracking_uri"):
+        assert manager.check_for_update()
+        assert manager.model_version == "7"
+        assert manager.model_source == "cache"
+        assert not manager.check_for_update()
+
+
+def _wait_for_load(manager):
+    manager._load_thread.join(timeout=5)
+    assert not manager.loading
+
+
+def test_background_load_serves_cache_then_mlflow(manager):
+    ModelManager()._save_to_cache(_loaded(0, "1"))
+    states = []
+
+    def slow_mlflow(uri):
+        states.append((manager.state, manager.model_source))
+        return ConstantModel(1)
+
+    with patch.object(ModelManager, "_resolve_registry_version", return_value="2"), \
+         patch("mlflow.set_tracking_uri"), \
+         patch("mlflow.sklearn.load_model", side_effect=slow_mlflow):
+        manager.start_background_load()
+        _wait_for_load(manager)
+
+    # While MLflow was loading, the cached model was already serving
+    assert states == [("refreshing", "cache")]
+    assert manager.state == "serving_mlflow"
+    assert manager.model_version == "2"
+
+
+def test_background_load_skips_download_when_cache_current(manager):
+    ModelManager()._save_to_cache(_loaded(0, "3"))
+    with patch.object(ModelManager, "_resolve_registry_version", return_value="3"), \
+         patch("mlflow.set_tracking_uri"), \
+         patch("mlflow.sklearn.load_model") as mock_load:
+        manager.start_background_load()
+        _wait_for_load(manager)
+    mock_load.assert_not_called()
+    assert manager.state == "serving_cache"
+
+
+def test_background_load_keeps_cache_when_mlflow_fails(manager):
+    ModelManager()._save_to_cache(_loaded(0, "1"))
+    with patch.object(ModelManager, "_resolve_registry_version", side_effect=Exception("down")), \
+         patch("mlflow.set_tracking_uri"), \
+         patch("mlflow.sklearn.load_model", side_effect=Exception("S3 unreachable")):
+        manager.start_background_load()
+        _wait_for_load(manager)
+    assert manager.state == "serving_cache"
+    assert manager.initialized
+
+
+def test_background_load_without_any_model(manager, monkeypatch):
+    monkeypatch.delenv("MLFLOW_TRACKING_URI")
+    manager.start_background_load()
+    _wait_for_load(manager)
+    assert manager.state == "unavailable"
+    assert not manager.initialized
+
+
+def test_concurrent_loads_share_one_load(manager):
+    started = threading.Event()
+    calls = []
+
+    def slow_mlflow(name, version=None):
+        calls.append(name)
+        started.set()
+        time.sleep(0.1)
+        return _loaded(0, "1")
+
+    with patch.object(ModelManager, "_load_from_mlflow", side_effect=slow_mlflow), \
+         patch("mlflow.set_tracking_uri"):
+        threads = [threading.Thread(target=manager.load_model) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+    assert started.is_set()
+    assert len(calls) == 1
+    assert manager.model_version == "1"
+
+
+def test_request_model_covers_only_model_features(manager):
+    manager._activate(_loaded(0, "1"))
+    assert manager.current.input_fields == {"flow_duration", "tot_fwd_pkts"}
+    assert set(manager.request_model.model_fields) == {"src_ip", "flow_duration", "tot_fwd_pkts"}
+
+    manager._activate(LoadedModel(model=ConstantModel(0), features=None, source="mlflow"))
+    assert manager.request_model is PredictionRequest
@@ -0,0 +1,108 @@
+"""Tests for the streaming NDJSON prediction endpoint."""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.tree import DecisionTreeClassifier
+
+from src.inference_server.main import app
+from src.inference_server.ndjson_stream import PredictionStreamer
+from src.inference_server.overload import AdaptiveConcurrencyLimiter, overload_guard
+from src.inference_server.rate_limit import RateLimit, RateLimiter
+
+client = TestClient(app)
+
+
+class CountingTree(DecisionTreeClassifier):
+    calls = 0
+
+    def predict(self, X):
+        type(self).calls += 1
+        return super().predict(X)
+
+
+class FakeRequest:
+    def __init__(self, chunks, key_id="key-x"):
+        self.chunks = chunks
+        self.scope = {"type": "http", "path": "/predict/stream", "state": {"api_key_id": key_id}}
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def _collect(streamer, chunks):
+    async def main():
+        return b"".join([part async for part in streamer.stream(FakeRequest(chunks))])
+    return [json.loads(line) for line in asyncio.run(main()).splitlines()]
+
+
+@pytest.fixture(autouse=True)
+def served(serve_tree):
+    serve_tree([0, 2], model_class=CountingTree)
+    CountingTree.calls = 0
+
+
+def test_stream_returns_results_in_order():
+    flows = [
+        {"flow_duration": 10.0, "tot_fwd_pkts": 3.0},
+        {"flow_duration": 10.0, "tot_fwd_pkts": 800.0, "src_ip": "10.0.0.9"},
+        "not json",
+        {"flow_duration": -1.0, "tot_fwd_pkts": 1.0},
+    ]
+    body = "\n".join(f if isinstance(f, str) else json.dumps(f) for f in flows) + "\n\n"
+    response = client.post("/predict/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r.get("prediction") for r in results] == [0, 2, None, 0]
+    assert results[2]["error"].startswith("invalid flow")
+    assert results[3]["validation_warnings"] == ["flow_duration: negative value -1.0 clamped to 0"]
+    assert 'mlids_batch_flows_total{source="stream"}' in client.get("/metrics").text
+
+
+def test_micro_batches_follow_arrival():
+    streamer = PredictionStreamer(batch_size=2)
+    # Five flows arriving in two chunks, the third split across them
+    lines = [json.dumps({"tot_fwd_pkts": 800.0 if i % 2 else 1.0}) for i in range(5)]
+    body = ("\n".join(lines)).encode()
+    cut = body.index(lines[2].encode()) + 5
+    results = _collect(streamer, [body[:cut], body[cut:]])
+
+    assert [r["prediction"] for r in results] == [0, 2, 0, 2, 0]
+    # [0, 1] from the first chunk, then [2, 3] and [4] from the second
+    assert CountingTree.calls == 3
+
+
+def test_overlong_line_ends_stream():
+    streamer = PredictionStreamer(max_line_bytes=16)
+    results = _collect(streamer, [b'{"tot_fwd_pkts": 1}\n{"flow_duration": 1000000000000', b"0}\n"])
+    assert results[0] == {"prediction": 0}
+    assert "PREDICT_STREAM_MAX_LINE_BYTES" in results[1]["error"]
+    assert len(results) == 2
+
+
+def test_micro_batches_counted_by_overload_protection(monkeypatch):
+    monkeypatch.setattr(overload_guard, "enabled", True)
+    monkeypatch.setattr(overload_guard, "limiter", AdaptiveConcurrencyLimiter(initial=10))
+    lines = "".join(json.dumps({"tot_fwd_pkts": 1.0}) + "\n" for _ in range(6)).encode()
+    _collect(PredictionStreamer(batch_size=2), [lines])
+
+    # Three fast micro-batches released their slots and raised the limit
+    assert overload_guard.limiter.inflight == 0
+    assert overload_guard.limiter.limit > 10.2
+
+
+def test_micro_batches_charged_to_rate_limit(monkeypatch):
+    monkeypatch.setenv("ML_IDS_RATE_LIMIT_ENABLED", "true")
+    limiter = RateLimiter(RateLimit(rate=0.0, burst=2.0, concurrency=1), clock=lambda: 1000.0)
+    lines = "".join(json.dumps({"tot_fwd_pkts": 1.0}) + "\n" for _ in range(6)).encode()
+    results = _collect(PredictionStreamer(batch_size=2, limiter=limiter), [lines])
+
+    # Two micro-batches fit in the key's bucket; the third is throttled, flow by flow
+    assert [r.get("prediction") for r in results] == [0, 0, 0, 0, None, None]
+    assert results[4]["error"] == "Rate limit exceeded (rate), flow not scored"
+    assert limiter.inflight("key-x") == 0
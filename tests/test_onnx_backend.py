@@ -0,0 +1,182 @@
+"""Tests for the ONNX Runtime backend."""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("skl2onnx")
+
+from src.inference_server import onnx_backend
+from src.inference_server.model_manager import LoadedModel, ModelManager, synthetic_frame
+from src.inference_server.onnx_backend import OnnxPredictor
+
+FEATURES = ["Flow Duration", "Total Fwd Packet", "Total Bwd packets"]
+
+
+def _forest(seed=0):
+    X = synthetic_frame(FEATURES, 2000, seed=seed)
+    y = (X["Flow Duration"] > 120).astype(int) + 2 * (X["Total Bwd packets"] > 200)
+    return RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "onnx")
+    monkeypatch.setattr(ModelManager, "MODEL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ModelManager, "LOCAL_MODEL_PATH", str(tmp_path / "model.joblib"))
+    monkeypatch.setattr(ModelManager, "LOCAL_META_PATH", str(tmp_path / "model_meta.json"))
+    monkeypatch.setattr(ModelManager, "LOCAL_ONNX_PATH", str(tmp_path / "model.onnx"))
+    return ModelManager()
+
+
+def test_sklearn_parity():
+    forest = _forest()
+    predictor = OnnxPredictor.from_estimator(forest, FEATURES)
+    sample = synthetic_frame(FEATURES, 1000, seed=5)
+    agreement = np.mean(predictor.predict(sample) == forest.predict(sample))
+    assert agreement >= 0.999
+    assert predictor.session.get_session_options().intra_op_num_threads == 1
+
+
+def test_xgboost_parity():
+    xgb = pytest.importorskip("xgboost")
+    pytest.importorskip("onnxmltools")
+    X = synthetic_frame(FEATURES, 2000)
+    y = (X["Flow Duration"] > 120).astype(int) + 2 * (X["Total Bwd packets"] > 200)
+    model = xgb.XGBClassifier(n_estimators=20, max_depth=4).fit(X.values, y)
+    predictor = OnnxPredictor.from_estimator(model, FEATURES)
+    sample = synthetic_frame(FEATURES, 1000, seed=5).values
+    assert np.mean(predictor.predict(sample) == model.predict(sample)) >= 0.999
+
+
+def test_logits_graph_decoded_with_argmax():
+    """Graphs without a label output (e.g. exported networks) are argmax-decoded."""
+    from onnx import TensorProto, helper
+
+    node = helper.make_node("Identity", ["x"], ["logits"])
+    graph = helper.make_graph(
+        [node], "logits",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [None, 3])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, [None, 3])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    predictor = OnnxPredictor(model.SerializeToString(), classes=["benign", "dos", "scan"])
+    assert list(predictor.predict([[0.1, 0.9, 0.0], [3.0, 1.0, 2.0]])) == ["dos", "benign"]
+
+
+def test_model_manager_exports_and_reuses_cached_onnx(manager, monkeypatch):
+    manager._activate(LoadedModel(model=_forest(), features=FEATURES, source="mlflow"))
+    assert manager.model_backend == "onnx"
+    manager._save_to_cache(manager.current)
+
+    # Loading from the cache uses model.onnx without exporting again
+    def no_export(*args, **kwargs):
+        raise AssertionError("cached ONNX model should be reused")
+
+    monkeypatch.setattr(onnx_backend, "export_onnx", no_export)
+    restarted = ModelManager()
+    assert restarted._load_from_cache()
+    assert restarted.model_backend == "onnx"
+    assert restarted.ready
+
+
+def test_stale_onnx_removed_when_backend_changes(manager, monkeypatch, tmp_path):
+    manager._activate(LoadedModel(model=_forest(), features=FEATURES, source="mlflow"))
+    manager._save_to_cache(manager.current)
+    assert (tmp_path / "model.onnx").exists()
+
+    monkeypatch.setenv("MODEL_BACKEND", "sklearn")
+    manager._activate(LoadedModel(model=_forest(seed=1), features=FEATURES, source="mlflow"))
+    manager._save_to_cache(manager.current)
+    assert not (tmp_path / "model.onnx").exists()
+
+
+def test_unconvertible_model_falls_back(manager):
+    class Opaque:
+        feature_names_in_ = np.asarray(FEATURES, dtype=object)
+
+        def predict(self, X):
+            return np.zeros(len(X), dtype=int)
+
+    manager._activate(LoadedModel(model=Opaque(), features=FEATURES, source="mlflow"))
+    assert manager.model_backend == "sklearn"
+    assert manager.ready
+
+
+def _logits_model(weights) -> bytes:
+    """A linear ``input @ weights -> logits`` graph, like an exported network."""
+    from onnx import TensorProto, helper, numpy_helper
+
+    weights = np.asarray(weights, dtype=np.float32)
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["input", "w"], ["logits"])], "linear",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [None, weights.shape[0]])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, [None, weights.shape[1]])],
+        initializer=[numpy_helper.from_array(weights, "w")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    return model.SerializeToString()
+
+
+def _write_standalone(path, weights, version):
+    import json
+
+    path.write_bytes(_logits_model(weights))
+    sidecar = {"feature_names": FEATURES, "classes": [0, 3], "version": version}
+    path.with_suffix(".json").write_text(json.dumps(sidecar))
+
+
+def test_batches_use_separate_multithreaded_session():
+    predictor = OnnxPredictor(_logits_model(np.eye(3)[:, :2]), batch_threads=2, batch_min_rows=4)
+    sample = synthetic_frame(FEATURES, 8, seed=2)
+
+    single = predictor.predict(sample.iloc[:1])
+    assert predictor._batch_session is None
+    batch = predictor.predict(sample)
+    assert predictor._batch_session.get_session_options().intra_op_num_threads == 2
+    assert single[0] == batch[0]
+    assert predictor.session.get_session_options().intra_op_num_threads == 1
+
+
+def test_load_onnx_reads_sidecar(tmp_path):
+    _write_standalone(tmp_path / "ft.onnx", [[1, 0], [0, 1], [0, 0]], "ft-48")
+    predictor = onnx_backend.load_onnx(str(tmp_path / "ft.onnx"))
+    assert list(predictor.feature_names_in_) == FEATURES
+    assert list(predictor.predict([[5.0, 1.0, 0.0], [0.0, 2.0, 9.0]])) == [0, 3]
+
+
+def test_model_manager_serves_onnx_file_and_reloads_it(manager, monkeypatch, tmp_path):
+    import os
+
+    path = tmp_path / "ft.int8.onnx"
+    _write_standalone(path, [[1, 0], [0, 1], [0, 0]], "ft-1")
+    monkeypatch.setenv("MODEL_ONNX_PATH", str(path))
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", "http://unused")
+
+    manager._background_load()
+    assert manager.state == "serving_file"
+    assert (manager.model_backend, manager.model_version) == ("onnx", "ft-1")
+    assert manager.ready
+    assert not manager.check_for_update()
+
+    _write_standalone(path, [[0, 1], [1, 0], [0, 0]], "ft-2")
+    os.utime(path, (manager._file_mtime + 10, manager._file_mtime + 10))
+    assert manager.check_for_update()
+    assert manager.model_version == "ft-2"
+    assert manager.state == "serving_file"
+
+
+def test_onnx_file_with_unknown_features_is_not_served(manager, monkeypatch, tmp_path):
+    import json
+
+    path = tmp_path / "ft.onnx"
+    path.write_bytes(_logits_model(np.eye(3)[:, :2]))
+    path.with_suffix(".json").write_text(json.dumps({"feature_names": ["a", "b", "c"]}))
+    monkeypatch.setenv("MODEL_ONNX_PATH", str(path))
+
+    manager._background_load()
+    assert manager.state == "unavailable"
+    assert not manager.initialized
@@ -0,0 +1,153 @@
+"""Tests for adaptive overload protection and load shedding."""
+
+import asyncio
+import random
+
+from src.inference_server.overload import (
+    AdaptiveConcurrencyLimiter, LoadLevel, OverloadGuard, OverloadProtectionMiddleware,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _guard(limit=10, **kwargs):
+    limiter = AdaptiveConcurrencyLimiter(initial=limit, min_limit=2, max_limit=100,
+                                         latency_target=0.1, clock=FakeClock())
+    return OverloadGuard(limiter, rng=random.Random(0), **kwargs)
+
+
+class TestAdaptiveConcurrencyLimiter:
+    def test_additive_increase_when_fast(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=10, latency_target=0.1, clock=FakeClock())
+        limiter.on_start()
+        limiter.on_complete(0.01)
+        assert limiter.limit == 10.1
+        assert limiter.inflight == 0
+
+    def test_multiplicative_decrease_once_per_interval(self):
+        clock = FakeClock()
+        limiter = AdaptiveConcurrencyLimiter(initial=10, min_limit=1, latency_target=0.1,
+                                             backoff=0.5, clock=clock)
+        for _ in range(3):
+            limiter.on_start()
+            limiter.on_complete(1.0)
+        assert limiter.limit == 5.0
+        clock.now = 0.2
+        limiter.on_start()
+        limiter.on_complete(1.0)
+        assert limiter.limit == 2.5
+
+    def test_limit_bounds(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=4, min_limit=4, max_limit=4.1,
+                                             latency_target=0.1, clock=FakeClock())
+        limiter.on_complete(1.0)
+        assert limiter.limit == 4
+        for _ in range(10):
+            limiter.on_complete(0.0)
+        assert limiter.limit == 4.1
+
+
+class TestOverloadGuard:
+    def test_levels_follow_utilisation(self):
+        guard = _guard(limit=10)
+        assert guard.current_level() == LoadLevel.NORMAL
+        guard.limiter.inflight = 5
+        assert guard.current_level() == LoadLevel.SHED_LOGGING
+        guard.limiter.inflight = 8
+        assert guard.current_level() == LoadLevel.SAMPLE_BENIGN
+        guard.limiter.inflight = 11
+        assert guard.current_level() == LoadLevel.REJECT
+        assert not guard.over_hard_limit()
+        guard.limiter.inflight = 13
+        assert guard.over_hard_limit()
+
+    def test_negative_logging_shed_first(self):
+        guard = _guard()
+        assert guard.should_log_negative(LoadLevel.NORMAL)
+        assert not guard.should_log_negative(LoadLevel.SHED_LOGGING)
+
+    def test_benign_flows_sampled(self):
+        guard = _guard(benign_sample_rate=0.2)
+        admitted = sum(guard.admit_flow(LoadLevel.SAMPLE_BENIGN, "10.0.0.1") for _ in range(1000))
+        assert 100 < admitted < 300
+        assert guard.admit_flow(LoadLevel.SHED_LOGGING, "10.0.0.1")
+
+    def test_recent_attackers_always_admitted(self):
+        guard = _guard(benign_sample_rate=0.0)
+        guard.mark_attacker("10.6.6.6")
+        assert guard.admit_flow(LoadLevel.SAMPLE_BENIGN, "10.6.6.6")
+        assert guard.admit_flow(LoadLevel.REJECT, "10.6.6.6")
+        assert not guard.admit_flow(LoadLevel.REJECT, "10.0.0.1")
+        assert not guard.admit_flow(LoadLevel.SAMPLE_BENIGN, None)
+
+    def test_attacker_tracking_is_bounded(self):
+        guard = _guard(max_tracked_attackers=2)
+        for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+            guard.mark_attacker(ip)
+        assert not guard.is_recent_attacker("10.0.0.1")
+        assert guard.is_recent_attacker("10.0.0.3")
+
+
+class TestMiddleware:
+    def _run(self, middleware, path="/predict"):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(middleware({"type": "http", "path": path}, None, send))
+        return sent
+
+    def test_fast_503_over_hard_limit(self):
+        guard = _guard(limit=2)
+        guard.limiter.inflight = 10
+        called = []
+
+        async def app(scope, receive, send):
+            called.append(scope)
+
+        sent = self._run(OverloadProtectionMiddleware(app, guard=guard))
+        assert not called
+        assert sent[0]["status"] == 503
+
+    def test_level_passed_to_route_and_slot_released(self):
+        guard = _guard(limit=10)
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(scope["state"]["load_level"])
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        self._run(OverloadProtectionMiddleware(app, guard=guard))
+        assert seen == [LoadLevel.NORMAL]
+        assert guard.limiter.inflight == 0
+        assert guard.limiter.limit > 10
+
+    def test_other_paths_untouched(self):
+        guard = _guard(limit=2)
+        guard.limiter.inflight = 10
+        called = []
+
+        async def app(scope, receive, send):
+            called.append(scope)
+
+        self._run(OverloadProtectionMiddleware(app, guard=guard), path="/api/alerts")
+        assert called
+
+    def test_stream_connections_not_held_in_flight(self):
+        guard = _guard(limit=2)
+        guard.limiter.inflight = 10
+        called = []
+
+        async def app(scope, receive, send):
+            called.append(scope)
+
+        self._run(OverloadProtectionMiddleware(app, guard=guard), path="/predict/stream")
+        assert called
+        assert guard.limiter.inflight == 10
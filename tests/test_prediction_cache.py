@@ -0,0 +1,52 @@
+"""Tests for the prediction result cache."""
+
+from src.inference_server.prediction_cache import PredictionCache
+
+
+def test_hit_after_put_for_same_model():
+    cache = PredictionCache(max_entries=4)
+    model = object()
+    cache.invalidate(model)
+    key = cache.key([1.0, 2.0, 0.0])
+
+    assert cache.get(model, key) is None
+    cache.put(model, key, [3])
+    assert cache.get(model, cache.key([1.0, 2.0, 0.0])) == [3]
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_least_recently_used_evicted():
+    cache = PredictionCache(max_entries=2)
+    model = object()
+    cache.invalidate(model)
+    a, b, c = (cache.key([float(i)]) for i in range(3))
+    cache.put(model, a, [0])
+    cache.put(model, b, [1])
+    cache.get(model, a)
+    cache.put(model, c, [2])
+
+    assert cache.get(model, b) is None
+    assert cache.get(model, a) == [0]
+    assert cache.stats()["entries"] == 2
+
+
+def test_invalidate_drops_entries_and_ignores_previous_model():
+    cache = PredictionCache(max_entries=4)
+    old, new = object(), object()
+    cache.invalidate(old)
+    key = cache.key([1.0])
+    cache.put(old, key, [0])
+
+    cache.invalidate(new)
+    assert cache.get(new, key) is None
+    # A request still finishing on the old model must not populate the new cache
+    cache.put(old, key, [0])
+    assert cache.get(new, key) is None
+    assert cache.get(old, key) is None
+
+
+def test_quantized_keys():
+    exact = PredictionCache(max_entries=4)
+    rounded = PredictionCache(max_entries=4, decimals=2)
+    assert exact.key([1.0001]) != exact.key([1.0002])
+    assert rounded.key([1.0001]) == rounded.key([1.0002])
@@ -0,0 +1,86 @@
+"""Tests for the sampling profiler and the admin profiling endpoint."""
+
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.inference_server.auth import APIKeyMiddleware
+from src.inference_server.profiler import StackSampler
+from src.inference_server.routers import admin
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def _make_app():
+    app = FastAPI()
+    app.add_middleware(APIKeyMiddleware)
+    app.include_router(admin.router)
+    return app
+
+
+class TestStackSampler:
+    def test_samples_other_threads(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker")
+        worker.start()
+        try:
+            result = StackSampler(interval=0.005).run(0.2)
+        finally:
+            stop.set()
+            worker.join()
+
+        assert result.samples > 5
+        collapsed = result.to_collapsed()
+        assert any(line.startswith("busy-worker;") and "_busy_loop" in line
+                   for line in collapsed.splitlines())
+        # The sampler never records its own thread
+        assert "StackSampler" not in collapsed and "in run (" not in collapsed
+
+    def test_speedscope_format(self):
+        result = StackSampler(interval=0.005).run(0.05)
+        doc = result.to_speedscope()
+        assert doc["$schema"].endswith("file-format-schema.json")
+        frames = doc["shared"]["frames"]
+        for prof in doc["profiles"]:
+            assert prof["type"] == "sampled"
+            assert len(prof["samples"]) == len(prof["weights"])
+            assert all(0 <= i < len(frames) for sample in prof["samples"] for i in sample)
+
+
+class TestProfileEndpoint:
+    def test_requires_admin_key(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_AUTH_ENABLED", "true")
+        monkeypatch.setenv("ML_IDS_API_KEYS", "sensor-key")
+        monkeypatch.setenv("ML_IDS_ADMIN_API_KEYS", "admin-key")
+        client = TestClient(_make_app())
+        resp = client.get("/api/admin/profile?seconds=0.05", headers={"X-API-Key": "sensor-key"})
+        assert resp.status_code == 403
+
+    def test_admin_gets_collapsed_profile(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_AUTH_ENABLED", "true")
+        monkeypatch.setenv("ML_IDS_API_KEYS", "sensor-key")
+        monkeypatch.setenv("ML_IDS_ADMIN_API_KEYS", "admin-key")
+        client = TestClient(_make_app())
+        resp = client.get("/api/admin/profile?seconds=0.1&interval_ms=5",
+                          headers={"X-API-Key": "admin-key"})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert int(resp.headers["X-Profile-Samples"]) > 0
+        assert float(resp.headers["X-Profile-Overhead"]) < 0.5
+
+    def test_speedscope_download(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_AUTH_ENABLED", "false")
+        client = TestClient(_make_app())
+        resp = client.get("/api/admin/profile?seconds=0.05&format=speedscope")
+        assert resp.status_code == 200
+        assert "speedscope" in resp.headers["Content-Disposition"]
+        assert "profiles" in resp.json()
+
+    def test_rejects_unknown_format(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_AUTH_ENABLED", "false")
+        client = TestClient(_make_app())
+        assert client.get("/api/admin/profile?format=pprof").status_code == 422
@@ -0,0 +1,151 @@
+"""Tests for per-API-key rate limiting."""
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.inference_server.auth import APIKeyMiddleware, hash_api_key, key_id_for_digest
+from src.inference_server.rate_limit import (
+    RateLimit, RateLimiter, RateLimitMiddleware, TokenBucket, _parse_overrides,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _make_app(limiter):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    app.add_middleware(APIKeyMiddleware)
+
+    @app.get("/predict")
+    async def predict():
+        return {"prediction": [0]}
+
+    @app.get("/api/alerts")
+    async def alerts():
+        return []
+
+    return app
+
+
+class TestTokenBucket:
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(rate=2.0, capacity=2.0, now=0.0)
+        assert bucket.try_acquire(0.0) == 0.0
+        assert bucket.try_acquire(0.0) == 0.0
+        assert bucket.try_acquire(0.0) == 0.5
+        assert bucket.try_acquire(0.5) == 0.0
+
+    def test_zero_rate_never_refills(self):
+        bucket = TokenBucket(rate=0.0, capacity=1.0, now=0.0)
+        assert bucket.try_acquire(0.0) == 0.0
+        assert bucket.try_acquire(100.0) == float("inf")
+
+
+class TestRateLimiter:
+    def test_keys_are_independent(self):
+        clock = FakeClock()
+        limiter = RateLimiter(RateLimit(rate=1.0, burst=1.0, concurrency=10), clock=clock)
+        assert limiter.acquire("key-a") == (None, 0.0)
+        assert limiter.acquire("key-a")[0] == "rate"
+        assert limiter.acquire("key-b") == (None, 0.0)
+
+    def test_concurrency_cap(self):
+        limiter = RateLimiter(RateLimit(rate=100.0, burst=100.0, concurrency=2), clock=FakeClock())
+        assert limiter.acquire("key-a")[0] is None
+        assert limiter.acquire("key-a")[0] is None
+        assert limiter.acquire("key-a")[0] == "concurrency"
+        limiter.release("key-a")
+        assert limiter.acquire("key-a")[0] is None
+
+    def test_override(self):
+        limiter = RateLimiter(
+            RateLimit(rate=1.0, burst=1.0, concurrency=1),
+            overrides={"key-big": RateLimit(rate=10.0, burst=10.0, concurrency=5)},
+            clock=FakeClock(),
+        )
+        assert limiter.limit_for("key-big").concurrency == 5
+        assert limiter.limit_for("key-other").concurrency == 1
+
+    def test_parse_overrides(self):
+        parsed = _parse_overrides("key-a=5:10:2, anonymous=1, bad=x:y")
+        assert parsed == {"key-a": (5.0, 10.0, 2), "anonymous": (1.0, 2.0, None)}
+
+
+class TestMiddleware:
+    def test_rejects_with_retry_after(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_AUTH_ENABLED", "true")
+        monkeypatch.setenv("ML_IDS_API_KEYS", "sensor-1")
+        monkeypatch.setenv("ML_IDS_RATE_LIMIT_ENABLED", "true")
+        limiter = RateLimiter(RateLimit(rate=0.5, burst=1.0, concurrency=10), clock=FakeClock())
+        client = TestClient(_make_app(limiter))
+        headers = {"X-API-Key": "sensor-1"}
+
+        assert client.get("/predict", headers=headers).status_code == 200
+        resp = client.get("/predict", headers=headers)
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "2"
+
+    def test_limits_per_key(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_AUTH_ENABLED", "true")
+        monkeypatch.setenv("ML_IDS_API_KEYS", "sensor-1,sensor-2")
+        monkeypatch.setenv("ML_IDS_RATE_LIMIT_ENABLED", "true")
+        limiter = RateLimiter(RateLimit(rate=1.0, burst=1.0, concurrency=10), clock=FakeClock())
+        client = TestClient(_make_app(limiter))
+
+        assert client.get("/predict", headers={"X-API-Key": "sensor-1"}).status_code == 200
+        assert client.get("/predict", headers={"X-API-Key": "sensor-1"}).status_code == 429
+        assert client.get("/predict", headers={"X-API-Key": "sensor-2"}).status_code == 200
+        sensor_1 = key_id_for_digest(hash_api_key("sensor-1"))
+        assert limiter.inflight(sensor_1) == 0
+
+    def test_other_paths_not_limited(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_AUTH_ENABLED", "false")
+        monkeypatch.setenv("ML_IDS_RATE_LIMIT_ENABLED", "true")
+        limiter = RateLimiter(RateLimit(rate=0.0, burst=0.0, concurrency=10), clock=FakeClock())
+        client = TestClient(_make_app(limiter))
+        assert client.get("/api/alerts").status_code == 200
+        assert client.get("/predict").status_code == 429
+
+    def test_stream_connections_not_limited(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_RATE_LIMIT_ENABLED", "true")
+        limiter = RateLimiter(RateLimit(rate=0.0, burst=0.0, concurrency=0), clock=FakeClock())
+        called = []
+
+        async def app(scope, receive, send):
+            called.append(scope)
+
+        middleware = RateLimitMiddleware(app, limiter=limiter)
+        scope = {"type": "http", "path": "/predict/stream", "state": {"api_key_id": "key-x"}}
+        asyncio.run(middleware(scope, None, None))
+        assert called
+        assert limiter.inflight("key-x") == 0
+
+    def test_disabled_by_default(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_AUTH_ENABLED", "false")
+        monkeypatch.delenv("ML_IDS_RATE_LIMIT_ENABLED", raising=False)
+        limiter = RateLimiter(RateLimit(rate=0.0, burst=0.0, concurrency=0), clock=FakeClock())
+        client = TestClient(_make_app(limiter))
+        assert client.get("/predict").status_code == 200
+
+    def test_concurrency_released_on_error(self, monkeypatch):
+        monkeypatch.setenv("ML_IDS_RATE_LIMIT_ENABLED", "true")
+        limiter = RateLimiter(RateLimit(rate=100.0, burst=100.0, concurrency=1), clock=FakeClock())
+
+        async def failing_app(scope, receive, send):
+            raise RuntimeError("boom")
+
+        middleware = RateLimitMiddleware(failing_app, limiter=limiter)
+        scope = {"type": "http", "path": "/predict", "state": {"api_key_id": "key-x"}}
+        try:
+            asyncio.run(middleware(scope, None, None))
+        except RuntimeError:
+            pass
+        assert limiter.inflight("key-x") == 0
@@ -0,0 +1,74 @@
+"""Tests for offline replay with batch scoring."""
+
+import asyncio
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from src.inference_server import database
+from src.inference_server.models import Alert
+from src.inference_server.replay import frame_to_chunk, replay
+from sqlalchemy import func, select
+
+@pytest.fixture
+def served(serve_tree):
+    # Class 3 for flows with 500 forward packets, 0 for the others
+    serve_tree([0, 3])
+
+
+@pytest.fixture
+def capture(tmp_path):
+    # CICFlowMeter-style headers with leading spaces and an Infinity cell
+    path = tmp_path / "flows.csv"
+    rows = ["Src IP, Dst IP, Flow Duration, Total Fwd Packet, Flow Bytes/s"]
+    rows += [f"10.0.0.{i % 5},10.0.1.1,{i},{500 if i % 4 == 0 else 3},Infinity" for i in range(40)]
+    path.write_text("\n".join(rows) + "\n")
+    return str(path)
+
+
+def test_frame_to_chunk_accepts_feature_and_field_names():
+    chunk = frame_to_chunk(pd.DataFrame({" Flow Duration": [1.0], "tot_fwd_pkts": [2.0], "Src IP": ["10.0.0.1"]}))
+    assert chunk.fields == ["flow_duration", "tot_fwd_pkts"]
+    assert chunk.ids.columns.tolist() == ["Src IP"]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_replay_writes_predictions(served, capture, tmp_path, workers):
+    output = tmp_path / "predictions.parquet"
+    stats = asyncio.run(replay(capture, str(output), chunksize=16, workers=workers))
+
+    assert (stats["flows"], stats["attacks"]) == (40, 10)
+    assert stats["flows_per_second"] > 0
+    result = pq.read_table(output).to_pandas()
+    assert result.columns.tolist() == ["Src IP", "Dst IP", "prediction"]
+    # Order is preserved across chunks and workers
+    assert result["prediction"].tolist() == [3 if i % 4 == 0 else 0 for i in range(40)]
+
+
+def test_replay_creates_deduplicated_alerts(served, capture, tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'replay.db'}")
+    # Restore the connection globals init_db replaces
+    for name in ("engine", "async_session_maker", "db_available"):
+        monkeypatch.setattr(database, name, getattr(database, name))
+    stats = asyncio.run(replay(capture, chunksize=16, workers=0, alerts=True))
+
+    # Ten attack rows from five sources: one alert per (source, attack type)
+    sources = {f"10.0.0.{i % 5}" for i in range(40) if i % 4 == 0}
+    assert stats["alerts"] == len(sources)
+
+    async def stored():
+        await database.init_db()
+        async with database.async_session_maker() as db:
+            count = (await db.execute(select(func.count(Alert.id)))).scalar()
+        await database.close_db()
+        return count
+
+    assert asyncio.run(stored()) == len(sources)
+
+
+def test_replay_header_only_csv(served, tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("Src IP,Flow Duration,Total Fwd Packet\n")
+    stats = asyncio.run(replay(str(path), str(tmp_path / "out.parquet"), chunksize=16, workers=0))
+    assert stats["flows"] == 0
@@ -0,0 +1,177 @@
+"""Tests for asynchronous batch scoring jobs."""
+
+import asyncio
+import io
+import os
+import socket
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from src.inference_server.main import app
+from src.inference_server.routers import jobs as jobs_router
+from src.inference_server.scoring_jobs import ScoringJobManager
+
+
+
+def _flows(rows=25):
+    return pd.DataFrame({
+        "Src IP": [f"10.0.0.{i}" for i in range(rows)],
+        "Flow Duration": [float(i) for i in range(rows)],
+        "Total Fwd Packet": [500.0 if i % 5 == 0 else 2.0 for i in range(rows)],
+    })
+
+
+async def _body(data: bytes, chunk=7):
+    for start in range(0, len(data), chunk):
+        yield data[start:start + chunk]
+
+
+def _upload(name, data: bytes):
+    return name, _body(data)
+
+
+def _run(manager, upload):
+    async def main():
+        job = await manager.submit(*upload)
+        await asyncio.gather(*manager._tasks)
+        return manager.get(job["job_id"])
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch, serve_tree):
+    serve_tree([0, 5], version="7")
+    manager = ScoringJobManager(str(tmp_path / "jobs"), chunk_rows=10)
+    monkeypatch.setattr(jobs_router, "scoring_jobs", manager)
+    return manager
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_job_scores_file_in_chunks(manager, tmp_path, fmt):
+    if fmt == "csv":
+        data = _flows().to_csv(index=False).encode()
+    else:
+        _flows().to_parquet(tmp_path / "flows.parquet")
+        data = (tmp_path / "flows.parquet").read_bytes()
+
+    job = _run(manager, _upload(f"flows.{fmt}", data))
+    assert job["status"] == "completed"
+    assert (job["rows_scored"], job["attacks"], job["progress"]) == (25, 5, 1.0)
+    assert job["model_version"] == "7"
+
+    result = pq.read_table(manager.result_path(job["job_id"])).to_pandas()
+    assert result["Src IP"].tolist() == [f"10.0.0.{i}" for i in range(25)]
+    assert result["prediction"].tolist() == [5 if i % 5 == 0 else 0 for i in range(25)]
+    # Only the result is kept
+    assert sorted(p.name for p in (tmp_path / "jobs" / job["job_id"]).iterdir()) == ["job.json", "predictions.parquet"]
+
+
+def test_unusable_input_fails_job(manager):
+    job = _run(manager, _upload("flows.csv", b"a,b\n1,2\n"))
+    assert job["status"] == "failed"
+    assert "FEATURE_MAPPING" in job["error"]
+
+
+def test_header_only_file_completes_empty(manager):
+    job = _run(manager, _upload("flows.csv", b"Src IP,Flow Duration,Total Fwd Packet\n"))
+    assert (job["status"], job["rows_scored"], job["error"]) == ("completed", 0, None)
+
+
+def test_rejected_uploads(manager):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(manager.submit(*_upload("flows.xlsx", b"x")))
+    assert exc.value.status_code == 400
+
+    manager.max_upload_bytes = 10
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(manager.submit(*_upload("flows.csv", b"x" * 100)))
+    assert exc.value.status_code == 413
+    assert manager.list_jobs() == []
+
+
+def test_declared_oversize_upload_not_read(manager):
+    manager.max_upload_bytes = 10
+    read = []
+
+    async def body():
+        read.append(True)
+        yield b"x" * 100
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(manager.submit("flows.csv", body(), content_length=100))
+    assert exc.value.status_code == 413
+    assert read == []
+
+
+def test_api_reports_and_serves_result(manager):
+    job = _run(manager, _upload("flows.csv", _flows().to_csv(index=False).encode()))
+    client = TestClient(app)
+
+    response = client.get(f"/api/jobs/{job['job_id']}")
+    assert response.status_code == 200
+    assert response.json()["result_url"] == f"/api/jobs/{job['job_id']}/result"
+    assert [j["job_id"] for j in client.get("/api/jobs").json()] == [job["job_id"]]
+
+    result = client.get(f"/api/jobs/{job['job_id']}/result")
+    assert result.status_code == 200
+    assert len(pq.read_table(io.BytesIO(result.content))) == 25
+
+    assert client.delete(f"/api/jobs/{job['job_id']}").status_code == 200
+    assert client.get(f"/api/jobs/{job['job_id']}").status_code == 404
+    assert client.get("/api/jobs/../../etc").status_code == 404
+
+
+def test_upload_through_api(manager):
+    client = TestClient(app)
+    response = client.post("/api/jobs/score", params={"filename": "flows.csv"},
+                           content=_flows().to_csv(index=False).encode())
+    assert response.status_code == 202
+    body = response.json()
+    assert body["filename"] == "flows.csv"
+    assert body["input_bytes"] == len(_flows().to_csv(index=False).encode())
+    assert manager.get(body["job_id"]) is not None
+
+    manager.max_upload_bytes = 10
+    response = client.post("/api/jobs/score", params={"filename": "flows.csv"}, content=b"x" * 100)
+    assert response.status_code == 413
+
+
+def test_cancelled_while_queued_is_dropped(manager):
+    async def main():
+        job = await manager.submit(*_upload("flows.csv", _flows().to_csv(index=False).encode()))
+        # Cancelled before the task got to run: the job directory is already gone
+        manager.cancel(job["job_id"])
+        manager._score(job, os.path.join(manager._job_dir(job["job_id"]), "input.csv"))
+        await asyncio.gather(*manager._tasks)
+        return job
+    job = asyncio.run(main())
+    assert job["status"] == "cancelled"
+    assert manager.list_jobs() == []
+
+
+def test_recover_fails_jobs_of_exited_workers(manager, monkeypatch):
+    job = _run(manager, _upload("flows.csv", _flows().to_csv(index=False).encode()))
+    # A job this worker was never running, and one whose worker (on this host) is gone
+    stranded = dict(job, job_id="a" * 32, status="running")
+    dead = dict(job, job_id="b" * 32, status="queued", worker=f"{socket.gethostname()}:999999999")
+    elsewhere = dict(job, job_id="c" * 32, status="queued", worker="other-host:1")
+    for stale in (stranded, dead, elsewhere):
+        os.makedirs(manager._job_dir(stale["job_id"]))
+        open(os.path.join(manager._job_dir(stale["job_id"]), "input.csv"), "w").close()
+        manager._save(stale)
+
+    assert manager.recover() == 2
+    assert manager.get("a" * 32)["status"] == manager.get("b" * 32)["status"] == "failed"
+    assert os.listdir(manager._job_dir("a" * 32)) == ["job.json"]
+    assert manager.get("c" * 32)["status"] == "queued"
+    assert manager.get(job["job_id"])["status"] == "completed"
+
+    # Its state has not been written for longer than SCORING_JOBS_STALE_HOURS
+    old = os.path.getmtime(os.path.join(manager._job_dir("c" * 32), "job.json")) - manager.stale_after - 60
+    os.utime(os.path.join(manager._job_dir("c" * 32), "job.json"), (old, old))
+    assert manager.recover() == 1
+    assert manager.get("c" * 32)["status"] == "failed"
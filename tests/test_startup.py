@@ -0,0 +1,56 @@
+"""Cold-start benchmark: import the server and answer /health in a fresh interpreter.
+
+Fails if heavy optional dependencies are imported eagerly or if the time to
+the first /health response exceeds ML_IDS_STARTUP_BUDGET_SECONDS (default 3s).
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must stay out of sys.modules until a model load or notification needs them
+LAZY_MODULES = ["mlflow", "pandas", "joblib", "yaml", "aiohttp", "aiosmtplib"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from src.inference_server.main import app
+imported = time.perf_counter() - start
+loaded_at_import = [m for m in {lazy!r} if m in sys.modules]
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    status = client.get("/health").status_code
+    total = time.perf_counter() - start
+print(json.dumps({{"import": imported, "total": total, "status": status, "loaded": loaded_at_import}}))
+"""
+
+
+def _probe(tmp_path):
+    env = dict(os.environ)
+    env.pop("MLFLOW_TRACKING_URI", None)
+    env.update({
+        "MODEL_CACHE_DIR": str(tmp_path / "cache"),
+        "LOG_DIR": str(tmp_path / "logs"),
+        "DATABASE_URL": f"sqlite+aiosqlite:///{tmp_path / 'startup.db'}",
+    })
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(lazy=LAZY_MODULES)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_cold_start(tmp_path):
+    result = _probe(tmp_path)
+    budget = float(os.getenv("ML_IDS_STARTUP_BUDGET_SECONDS", "3.0"))
+
+    assert result["status"] == 200
+    assert result["loaded"] == []
+    assert result["total"] < budget, (
+        f"import {result['import']:.2f}s, first /health after {result['total']:.2f}s "
+        f"(budget {budget:.1f}s)"
+    )
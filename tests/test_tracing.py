@@ -0,0 +1,73 @@
+"""Tests for tail-based trace sampling and span export."""
+
+import json
+import random
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode, set_span_in_context
+
+from src.inference_server.tracing import JsonLinesSpanExporter, TailSamplingSpanProcessor
+
+MS = 1_000_000
+
+
+def _setup(sample_rate=0.0, slow_ms=500):
+    exporter = InMemorySpanExporter()
+    processor = TailSamplingSpanProcessor(
+        SimpleSpanProcessor(exporter), slow_threshold_ms=slow_ms,
+        sample_rate=sample_rate, rng=random.Random(0),
+    )
+    provider = TracerProvider()
+    provider.add_span_processor(processor)
+    return provider.get_tracer("test"), exporter
+
+
+def _trace(tracer, duration_ms, child_error=False):
+    root = tracer.start_span("predict", start_time=0)
+    ctx = set_span_in_context(root)
+    child = tracer.start_span("notification.channel", context=ctx, start_time=MS)
+    if child_error:
+        child.set_status(Status(StatusCode.ERROR, "send failed"))
+    child.end(end_time=2 * MS)
+    root.end(end_time=duration_ms * MS)
+
+
+class TestTailSampling:
+    def test_fast_traces_dropped(self):
+        tracer, exporter = _setup()
+        _trace(tracer, duration_ms=10)
+        assert exporter.get_finished_spans() == ()
+
+    def test_slow_traces_kept_whole(self):
+        tracer, exporter = _setup()
+        _trace(tracer, duration_ms=800)
+        names = sorted(s.name for s in exporter.get_finished_spans())
+        assert names == ["notification.channel", "predict"]
+
+    def test_error_traces_kept(self):
+        tracer, exporter = _setup()
+        _trace(tracer, duration_ms=10, child_error=True)
+        assert len(exporter.get_finished_spans()) == 2
+
+    def test_baseline_sample_rate(self):
+        tracer, exporter = _setup(sample_rate=0.2)
+        for _ in range(500):
+            _trace(tracer, duration_ms=10)
+        kept_roots = [s for s in exporter.get_finished_spans() if s.name == "predict"]
+        assert 50 < len(kept_roots) < 150
+
+
+def test_json_lines_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    with provider.get_tracer("test").start_as_current_span("predict"):
+        pass
+
+    JsonLinesSpanExporter(str(path)).export(exporter.get_finished_spans())
+    lines = path.read_text().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["name"] == "predict"
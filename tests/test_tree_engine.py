@@ -0,0 +1,96 @@
+"""Tests for the compiled tree-ensemble backend."""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from src.inference_server.model_manager import LoadedModel, ModelManager
+from src.inference_server.tree_engine import (
+    CompiledTreeEnsemble, UnsupportedModelError, check_parity,
+)
+
+
+def _data(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.exponential(100.0, size=(n, 12)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] > 200).astype(int) + 2 * (X[:, 2] > 150)
+    return X, y
+
+
+def _with_nans(X, fraction=0.05, seed=1):
+    X = X.copy()
+    X[np.random.default_rng(seed).random(X.shape) < fraction] = np.nan
+    return X
+
+
+@pytest.mark.parametrize("estimator", [
+    DecisionTreeClassifier(max_depth=10, random_state=0),
+    RandomForestClassifier(n_estimators=25, random_state=0),
+    ExtraTreesClassifier(n_estimators=15, random_state=0),
+])
+def test_sklearn_parity(estimator):
+    X, y = _data()
+    estimator.fit(_with_nans(X, seed=2), y)
+    compiled = CompiledTreeEnsemble.from_estimator(estimator)
+    X_test, _ = _data(seed=3)
+
+    assert check_parity(compiled, X_test) == 1.0
+    assert check_parity(compiled, _with_nans(X_test)) == 1.0
+    if hasattr(estimator, "estimators_"):
+        np.testing.assert_allclose(compiled.predict_proba(X_test), estimator.predict_proba(X_test))
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+def test_xgboost_parity(n_classes):
+    xgb = pytest.importorskip("xgboost")
+    X, y = _data()
+    y = y % n_classes
+    estimator = xgb.XGBClassifier(n_estimators=30, max_depth=5).fit(X, y)
+    compiled = CompiledTreeEnsemble.from_estimator(estimator)
+    X_test, _ = _data(seed=3)
+    assert check_parity(compiled, X_test) == 1.0
+    assert check_parity(compiled, _with_nans(X_test)) == 1.0
+
+
+def test_unsupported_estimator():
+    with pytest.raises(UnsupportedModelError):
+        CompiledTreeEnsemble.from_estimator(LogisticRegression())
+
+
+def test_large_batches_delegated_to_estimator():
+    X, y = _data()
+    compiled = CompiledTreeEnsemble.from_estimator(RandomForestClassifier(n_estimators=5).fit(X, y))
+    compiled.max_batch = 10
+    calls = []
+    original = compiled.estimator.predict
+    compiled.estimator.predict = lambda X: calls.append(len(X)) or original(X)
+
+    compiled.predict(X[:10])
+    compiled.predict(X[:11])
+    assert calls == [11]
+
+
+def test_model_manager_selects_compiled_backend(tmp_path, monkeypatch):
+    import pandas as pd
+
+    monkeypatch.setenv("MODEL_BACKEND", "compiled")
+    monkeypatch.setattr(ModelManager, "MODEL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ModelManager, "LOCAL_MODEL_PATH", str(tmp_path / "model.joblib"))
+    monkeypatch.setattr(ModelManager, "LOCAL_META_PATH", str(tmp_path / "model_meta.json"))
+    features = ["Flow Duration", "Total Fwd Packet"]
+    X, y = _data()
+    frame = pd.DataFrame(X[:, :2], columns=features)
+    forest = RandomForestClassifier(n_estimators=5, random_state=0).fit(frame, y)
+
+    manager = ModelManager()
+    manager._activate(LoadedModel(model=forest, features=features, source="mlflow"))
+    assert manager.model_backend == "compiled"
+    assert isinstance(manager.model, CompiledTreeEnsemble)
+    assert manager.ready
+
+    # The cache keeps the original estimator, not the compiled arrays
+    manager._save_to_cache(manager.current)
+    cached = manager._read_cache()
+    assert isinstance(cached.model, RandomForestClassifier)
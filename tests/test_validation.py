@@ -1,8 +1,14 @@
 """Tests for feature validation in PredictionRequest schema."""
 
 import math
+import numpy as np
 import pytest
-from src.inference_server.schemas import PredictionRequest
+from src.inference_server.schemas import (
+    WARNING_FIELDS,
+    PredictionRequest,
+    request_model_for,
+    validate_feature_matrix,
+)
 
 
 class TestNaNInfReplacement:
@@ -79,3 +85,57 @@ class TestSrcIpNotAffected:
     def test_src_ip_none(self):
         req = PredictionRequest()
         assert req.src_ip is None
+
+
+class TestReducedFeatureRequests:
+    def test_only_declared_fields_parsed(self):
+        model = request_model_for(frozenset({"flow_duration", "tot_fwd_pkts"}))
+        req = model.model_validate_json(
+            '{"flow_duration": 5.0, "tot_fwd_pkts": -1.0, "fin_flag_cnt": 7.0, "src_ip": "10.0.0.1"}'
+        )
+        assert req.model_dump(by_alias=True) == {"src_ip": "10.0.0.1", "flow_duration": 5.0, "tot_fwd_pkts": 0.0}
+        assert req._validation_warnings == ["tot_fwd_pkts: negative value -1.0 clamped to 0"]
+
+    def test_nan_still_replaced(self):
+        model = request_model_for(frozenset({"flow_duration"}))
+        assert model(flow_duration=float("nan")).flow_duration == 0.0
+
+    def test_variants_cached_and_full_set_is_prediction_request(self):
+        subset = frozenset({"flow_duration"})
+        assert request_model_for(subset) is request_model_for(frozenset(subset))
+        full = frozenset(PredictionRequest.model_fields) - {"src_ip"}
+        assert request_model_for(full) is PredictionRequest
+
+
+class TestMatrixValidation:
+    FIELDS = ["flow_duration", "tot_fwd_pkts", "syn_flag_cnt", "fin_flag_cnt", "flow_iat_min"]
+    ROWS = [
+        [100.0, 10.0, 1.0, 0.0, -3.0],
+        [-100.0, float("nan"), 5.0, -1.0, 2.0],
+        [float("inf"), -0.1, 0.5, 0.0, 0.0],
+    ]
+
+    def test_same_values_and_warnings_as_prediction_request(self):
+        X = np.array(self.ROWS, dtype=np.float32)
+        warnings = validate_feature_matrix(X, self.FIELDS)
+        for i, row in enumerate(self.ROWS):
+            req = PredictionRequest(**dict(zip(self.FIELDS, row)))
+            assert X[i].tolist() == [getattr(req, f) for f in self.FIELDS]
+            assert sorted(warnings.messages(i)) == sorted(req._validation_warnings)
+
+    def test_row_bitmasks(self):
+        X = np.array(self.ROWS, dtype=np.float32)
+        warnings = validate_feature_matrix(X, self.FIELDS)
+        bit = {f: 1 << WARNING_FIELDS.index(f) for f in self.FIELDS if f in WARNING_FIELDS}
+        assert warnings.masks.tolist() == [
+            0,
+            bit["flow_duration"] | bit["syn_flag_cnt"] | bit["fin_flag_cnt"],
+            bit["tot_fwd_pkts"],
+        ]
+        assert warnings.to_lists()[0] == []
+
+    def test_clean_matrix_has_no_warnings(self):
+        X = np.ones((4, 2), dtype=np.float32)
+        warnings = validate_feature_matrix(X, ["flow_duration", "syn_flag_cnt"])
+        assert not warnings
+        assert validate_feature_matrix(X, ["flow_iat_min"]).masks.tolist() == [0, 0, 0, 0]